@@ -1,129 +1,109 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
-import csv
 import os
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from collections import defaultdict
-
-pdfmetrics.registerFont(TTFont('THSarabun', 'fonts/THSarabunNew/THSarabunNew.ttf'))
-pdfmetrics.registerFont(TTFont('THSarabun-Bold', 'fonts/THSarabunNew/THSarabunNew Bold.ttf'))
-REPORT_DIR = "reports"
+import time
+import multiprocessing
+import sys
+import dates
+import diagnostics
+from virtual_table import VirtualTable
+from search_index import SearchIndex
+import report_core
+from report_core import REPORT_DIR, DATED_HEADER, CATEGORY_OPTIONS, create_report, iter_report
+from pdf_report import generate_pdf
+from report_catalog import cached_catalog, list_catalog, query
+from batch_export import pending_reports, make_executor, submit_all
+from io_worker import IOExecutor
+from money import normalize, format_satang, to_satang
+from ledger import Entry, Ledger, split_category
+from edit_journal import EditSession, JournalInUse, discard_journal, pending_journal
+from report_merge import load_versioned, save_session
+from report_formats import available_formats, export_report, export_rows
+from budgets import load_budgets, save_budgets
+from charts import chart_height, dashboard_totals, draw_tk, summary_charts
+
 os.makedirs(REPORT_DIR, exist_ok=True)
 
-# บันทึกข้อมูลลง CSV
-def save_to_csv(report_name, data):
-    csv_path = os.path.join(REPORT_DIR, report_name + ".csv")
-    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
-        writer = csv.writer(f)
-        writer.writerow(["ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"])
-        writer.writerows(data)
-    return csv_path
-
-# อ่านรายงานทั้งหมด
-def list_all_reports():
-    return [f for f in os.listdir(REPORT_DIR) if f.endswith(".csv")]
-
-# สร้าง PDF จาก CSV
-def generate_pdf_from_csv(csv_path, report_title):
-    income = defaultdict(list)
-    expense = defaultdict(list)
-
-    with open(csv_path, newline='', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            entry = (row["รายละเอียด"], float(row["จำนวนเงิน"]))
-            if row["ประเภท"] == "รายรับ":
-                income[row["หมวดหมู่"]].append(entry)
-            else:
-                expense[row["หมวดหมู่"]].append(entry)
-
-    pdf_path = os.path.join(REPORT_DIR, report_title + ".pdf")
-    c = canvas.Canvas(pdf_path, pagesize=A4)
-    width, height = A4
-    c.setFont("THSarabun", 16)
-    x_income = 40
-    x_expense = 320
-    y = height - 50
-
-    def draw_section(items, x, y_start):
-        y = y_start
-        total = 0
-        current_main = ""
-
-        for section, entries in items.items():
-            parts = [s.strip() for s in section.split(">")]
-            main_cat = parts[0]
-            sub_cat = parts[1] if len(parts) > 1 else None
-
-            # วาดหมวดหมู่หลัก ถ้ายังไม่เคยวาด
-            if current_main != main_cat:
-                current_main = main_cat
-                c.setFont("THSarabun-Bold", 16)
-                c.drawString(x, y, main_cat)
-                y -= 20
-
-            # วาดหมวดย่อย (ถ้ามี)
-            if sub_cat:
-                c.setFont("THSarabun-Bold", 15)
-                c.drawString(x + 20, y, sub_cat)
-                y -= 18
-
-            # วาดรายละเอียด
-            for name, amount in entries:
-                c.setFont("THSarabun", 15)
-                c.drawString(x + 20, y, name)
-                c.drawRightString(x + 200, y, f"{amount:,.2f}")
-                total += amount
-                y -= 18
-
-            y -= 10
-        return y, total
-
-    # หัวข้อ
-    c.setFont("THSarabun-Bold", 18)
-    c.drawString(x_income, y, "รายรับ")
-    c.drawString(x_expense, y, "รายจ่าย")
-    y -= 25
-
-    # แสดงรายการรายรับ-รายจ่าย
-    y_income, total_income = draw_section(income, x_income, y)
-    y_expense, total_expense = draw_section(expense, x_expense, y)
-
-    # ส่วนรวมยอด
-    y_total = min(y_income, y_expense) - 30
-    c.setFont("THSarabun-Bold", 16)
-
-    c.drawString(x_income, y_total, "รวมรายรับ")
-    c.drawRightString(x_income + 200, y_total, f"{total_income:,.2f}")
-
-    c.drawString(x_expense, y_total, "รวมรายจ่าย")
-    c.drawRightString(x_expense + 200, y_total, f"{total_expense:,.2f}")
-
-    # รายรับสูง/ต่ำกว่ารายจ่าย
-    y_total -= 20
-    diff = total_income - total_expense
-
-    if diff > 0:
-        c.drawString(x_expense, y_total, "รายรับ สูง กว่า รายจ่าย")
-        c.drawRightString(x_expense + 200, y_total, f"({abs(diff):,.2f})")
-    elif diff < 0:
-        c.drawString(x_expense, y_total, "รายรับ ต่ำ กว่า รายจ่าย")
-        c.drawRightString(x_expense + 200, y_total, f"({abs(diff):,.2f})")
-    else:
-        c.drawString(x_expense, y_total, "รายรับ เท่ากับ รายจ่าย")
-        c.drawRightString(x_expense + 200, y_total, f"{0:,.2f}")
-
-    c.save()
-    return pdf_path
+# คอลัมน์ของตารางรายการ: ค่าในแถวเรียงตาม DATED_HEADER (วันที่อยู่ท้าย) แต่แสดงวันที่เป็นคอลัมน์แรก
+ENTRY_DISPLAY = [DATED_HEADER[-1]] + DATED_HEADER[:-1]
 
-# === สร้าง UI หลัก ===
-root = tk.Tk()
-root.title("📊 ระบบรายรับรายจ่าย")
-root.geometry("400x550")
+def entry_columns(tree, width=140):
+    tree["displaycolumns"] = ENTRY_DISPLAY
+    for col in DATED_HEADER:
+        tree.heading(col, text=col)
+        tree.column(col, width=100 if col == DATED_HEADER[-1] else width)
+
+# ช่วงวันที่จากช่อง "ตั้งแต่"/"ถึง" (ว่างทั้งคู่ = None) ค่าที่อ่านไม่ได้ ValueError
+def read_period(start_var, end_var):
+    start, end = start_var.get().strip(), end_var.get().strip()
+    if not start and not end:
+        return None
+    return dates.period(start or None, end or None)
+
+# ===== ใช้รายงานผ่าน api_server แทนการเปิดไฟล์ใน REPORT_DIR โดยตรง =====
+# LEDGER_SERVER=http://host:8765 หรือ python UI.py --server http://host:8765
+# แทนฟังก์ชันระดับโมดูลที่หน้าจอเรียกด้วยของ ApiClient หน้าสร้าง/ดู/แก้ไข/PDF จึงทำงานผ่านเซิร์ฟเวอร์โดยไม่ต้องแก้
+# (แปลงทุกรายงาน, สรุปหลายรายงาน และนำเข้ารายการเดินบัญชี ยังใช้ได้เฉพาะรายงานในเครื่อง)
+# store = ที่เก็บที่หน้าแก้ไขใช้อ่านรุ่น/รวมการแก้ไขตอนบันทึก (report_merge) report_core หรือ ApiClient
+server_url = None
+store = report_core
+
+def use_server(url):
+    global server_url, store, create_report, iter_report, generate_pdf
+    global cached_catalog, list_catalog
+    from api_client import ApiClient
+    client = ApiClient(url)
+    server_url = client.base_url
+    store = client
+    create_report, iter_report, generate_pdf = client.create_report, client.iter_report, client.generate_pdf
+    cached_catalog = list_catalog = client.list_catalog
+    return client
+
+# ===== แนะนำหมวดหมู่ขณะพิมพ์รายละเอียด =====
+categorizer = None
+
+# เรียนรู้จากรายงานที่มีอยู่ใน worker (ครั้งต่อไปใช้แคช ถ้ารายงานไม่เปลี่ยนจะเสร็จทันที)
+def load_categorizer():
+    from categorizer import get_categorizer
+
+    def loaded(result):
+        global categorizer
+        categorizer = result
+
+    io_executor.submit(lambda task: get_categorizer(), on_done=loaded, on_error=lambda e: None,
+                       message="กำลังเรียนรู้หมวดหมู่จากรายงานเดิม...")
+
+# ปุ่มแนะนำหมวดหมู่ในฟอร์มเพิ่มรายการ คืนฟังก์ชันที่เรียกเมื่อรายละเอียดเปลี่ยน
+def attach_category_suggestion(frame, row, type_var, cat_var, use_subcat_var, subcat_var, subcat_entry):
+    suggested = [None]
+    button = tk.Button(frame, text="", font=("TH Sarabun New", 14), relief="flat", fg="blue")
+    button.grid(row=row, column=0, columnspan=2, sticky="w")
+
+    def apply():
+        if suggested[0] is None:
+            return
+        main, sub = split_category(suggested[0])
+        cat_var.set(main)
+        use_subcat_var.set(bool(sub))
+        subcat_var.set(sub)
+        if sub:
+            subcat_entry.grid()
+        else:
+            subcat_entry.grid_remove()
+
+    def on_detail(text):
+        category = None
+        if categorizer is not None and text.strip():
+            category = categorizer.suggest(text, type_var.get())
+            if category and split_category(category)[0] not in CATEGORY_OPTIONS[type_var.get()]:
+                category = None
+        suggested[0] = category
+        button.config(text=f"แนะนำ: {category} (คลิกเพื่อใช้)" if category else "")
 
+    button.config(command=apply)
+    return on_detail
+
+# === สร้าง UI หลัก ===
 def create_report_ui():
     win = tk.Toplevel(root)
     win.title("สร้างรายงานใหม่")
@@ -133,7 +113,7 @@ def create_report_ui():
     name_var = tk.StringVar()
     tk.Entry(win, textvariable=name_var, font=("TH Sarabun New", 16)).pack(pady=5)
 
-    data = []
+    data = Ledger()
 
     style = ttk.Style()
     style.configure("Treeview", font=("TH Sarabun New", 16), rowheight=28)
@@ -145,30 +125,14 @@ def create_report_ui():
     tree_scroll = tk.Scrollbar(tree_frame)
     tree_scroll.pack(side="right", fill="y")
 
-    tree = ttk.Treeview(tree_frame, columns=("ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"),
-                        show="headings", yscrollcommand=tree_scroll.set)
+    tree = ttk.Treeview(tree_frame, columns=DATED_HEADER, show="headings", yscrollcommand=tree_scroll.set)
     tree_scroll.config(command=tree.yview)
 
-    for col in ("ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"):
-        tree.heading(col, text=col)
-        tree.column(col, width=140)
+    entry_columns(tree)
     tree.pack(fill="both", expand=True)
 
     def add_entry():
-        CATEGORY_OPTIONS = {
-            "รายรับ": [
-                "กองทุนกรรมการ", "กองทุนการศึกษา", "งานไหว้บรรพบุรุษ (ตรุษจีน)",
-                "งานไหว้พระจันทร์", "สนับสนุนหนังสือทำเนียบ", "ค่าทำป้ายแกะสลัก",
-                "ค่าตั้งป้ายบรรพบุรุษ", "ดอกเบี้ยรับ", "รับบริจาคทั่วไป",
-                "รับบริจาคสนับสนุนโครงการ", "อื่นๆ"
-            ],
-            "รายจ่าย": [
-                "เงินเดือน", "ค่ารถ ค่าล่วงเวลาผจก.", "การดำเนินงานและกิจกรรม",
-                "การศึกษา และเยาวชน", "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง",
-                "ซ่อมแซม ค่าจ้างและค่าแรง", "ค่าสาธารณูปโภค", "อื่นๆ"
-            ]
-        }
-
+        load_categorizer()
         top = tk.Toplevel(win)
         top.title("เพิ่มข้อมูล")
         top.geometry("600x600")
@@ -217,12 +181,14 @@ def create_report_ui():
         details_frame.grid(row=4, column=0, columnspan=3, pady=5, sticky="w")
 
         detail_entries = []
+        on_detail = attach_category_suggestion(form_frame, 6, type_var, cat_var, use_subcat_var, subcat_var, subcat_entry)
 
         def add_detail_row():
             row_frame = tk.Frame(details_frame)
             row_frame.pack(pady=2, anchor="w")
             d_var = tk.StringVar()
             a_var = tk.StringVar()
+            d_var.trace("w", lambda *args: on_detail(d_var.get()))
             tk.Entry(row_frame, textvariable=d_var, font=("TH Sarabun New", 16), width=30).pack(side="left", padx=5)
             tk.Entry(row_frame, textvariable=a_var, font=("TH Sarabun New", 16), width=10).pack(side="left", padx=5)
             detail_entries.append((d_var, a_var))
@@ -231,12 +197,17 @@ def create_report_ui():
 
         tk.Button(form_frame, text="+ เพิ่มแถว", font=("TH Sarabun New", 14), command=add_detail_row).grid(row=5, column=0, columnspan=2, pady=5)
 
+        # วันที่ของทุกแถวในฟอร์มนี้ (เว้นว่างได้)
+        tk.Label(form_frame, text="วันที่ (YYYY-MM-DD หรือ วัน/เดือน/ปี):", font=("TH Sarabun New", 16)).grid(row=7, column=0, sticky="w")
+        date_var = tk.StringVar(value=dates.today())
+        tk.Entry(form_frame, textvariable=date_var, font=("TH Sarabun New", 16), width=12).grid(row=7, column=1, sticky="w")
+
         def confirm_add_all():
             valid_rows = []
             for d_var, a_var in detail_entries:
                 desc = d_var.get().strip()
                 try:
-                    amt = float(a_var.get())
+                    amt = normalize(a_var.get())
                     if desc:
                         valid_rows.append((desc, amt))
                 except:
@@ -245,6 +216,11 @@ def create_report_ui():
             if not valid_rows:
                 messagebox.showwarning("ยังไม่มีรายการ", "กรุณากรอกรายละเอียดพร้อมจำนวนเงินอย่างน้อย 1 รายการ")
                 return
+            try:
+                date = dates.normalize(date_var.get())
+            except ValueError:
+                messagebox.showwarning("คำเตือน", "วันที่ไม่ถูกต้อง", parent=top)
+                return
 
             category = cat_var.get()
             if use_subcat_var.get():
@@ -253,7 +229,7 @@ def create_report_ui():
                     category = f"{category} > {sub}"
 
             for desc, amt in valid_rows:
-                data.append([type_var.get(), category, desc, amt])
+                data.append(Entry(type_var.get(), category, desc, amt, date))
 
             refresh()
             top.destroy()
@@ -275,142 +251,359 @@ def create_report_ui():
             messagebox.showwarning("คำเตือน", "ไม่มีข้อมูลให้บันทึก")
             return
 
-        file_path = os.path.join(REPORT_DIR, name + ".csv")
-        if os.path.exists(file_path):
-            messagebox.showerror("ชื่อซ้ำ", f"มีรายงานชื่อ '{name}.csv' อยู่แล้ว กรุณาใช้ชื่ออื่น")
-            return
+        rows = data.copy()
 
-        save_to_csv(name, data)
-        messagebox.showinfo("สำเร็จ", f"บันทึก {name}.csv สำเร็จแล้ว")
-        win.destroy()
+        # ตรวจชื่อซ้ำและเขียนใต้ล็อกเดียวกัน (สองเครื่องบันทึกชื่อเดียวกันพร้อมกัน เครื่องหลังได้ FileExistsError)
+        def write(task):
+            return create_report(name, rows)
+
+        def saved(result):
+            messagebox.showinfo("สำเร็จ", f"บันทึก {name}.csv สำเร็จแล้ว")
+            win.destroy()
+
+        def failed(error):
+            if isinstance(error, FileExistsError):
+                messagebox.showerror("ชื่อซ้ำ", f"มีรายงานชื่อ '{name}.csv' อยู่แล้ว กรุณาใช้ชื่ออื่น")
+            else:
+                messagebox.showerror("ผิดพลาด", str(error))
+
+        io_executor.submit(write, on_done=saved, on_error=failed, message="กำลังบันทึกรายงาน...", parent=win)
 
     button_frame = tk.Frame(win)
     button_frame.pack(pady=10)
     tk.Button(button_frame, text="เพิ่มข้อมูล", command=add_entry, font=("TH Sarabun New", 16), width=20).pack(pady=5)
     tk.Button(button_frame, text="บันทึกทั้งหมด", command=save, font=("TH Sarabun New", 16), width=20).pack(pady=5)
 
+# ===== แถวที่ชนกันตอนบันทึก (report_merge) =====
+# ดับเบิลคลิกสลับ ของฉัน/ของอีกฝ่าย ทีละแถว ค่าเริ่มต้นคงการแก้ไขของอีกฝ่ายไว้
+# ตกลง: ใส่ตัวเลือกลง choices ({row_id: (choice, แถวของอีกฝ่าย)}) แล้วเรียก on_done, ยกเลิก: กลับไปแก้ไขต่อ
+CHOICE_TEXT = {"ours": "ของฉัน", "theirs": "ของอีกฝ่าย"}
+
+def conflict_text(row):
+    if row is None:
+        return "(ลบแถวนี้)"
+    return f"{row[4]} {row[0]} {row[1]} {row[2]} {row[3]}"
+
+def resolve_conflicts(parent, conflicts, choices, on_done):
+    top = tk.Toplevel(parent)
+    top.title("การแก้ไขชนกัน")
+    top.geometry("900x450")
+    top.transient(parent)
+    tk.Label(top, text=f"มีผู้อื่นบันทึกรายงานนี้ระหว่างที่คุณแก้ไข และแก้แถวเดียวกัน {len(conflicts):,} แถว\n"
+                       "ดับเบิลคลิกเพื่อเลือกว่าจะใช้ของใคร", font=("TH Sarabun New", 16)).pack(pady=5)
+
+    columns = ("row", "ours", "theirs", "use")
+    frame = tk.Frame(top)
+    frame.pack(expand=True, fill="both", padx=10)
+    scroll = tk.Scrollbar(frame)
+    scroll.pack(side="right", fill="y")
+    tree = ttk.Treeview(frame, columns=columns, show="headings", yscrollcommand=scroll.set)
+    scroll.config(command=tree.yview)
+    for col, text, width in zip(columns, ("แถว", "ของฉัน", "ของอีกฝ่าย", "ใช้"), (60, 330, 330, 90)):
+        tree.heading(col, text=text)
+        tree.column(col, width=width)
+    tree.pack(expand=True, fill="both")
+
+    chosen = {}
+
+    def show(i):
+        tree.set(str(i), "use", CHOICE_TEXT[chosen[i]])
+
+    for i, c in enumerate(conflicts):
+        chosen[i] = "theirs"
+        tree.insert('', 'end', iid=str(i), values=(c.row_id + 1, conflict_text(c.ours), conflict_text(c.theirs), ""))
+        show(i)
+
+    def toggle(event=None):
+        for item in tree.selection():
+            i = int(item)
+            chosen[i] = "ours" if chosen[i] == "theirs" else "theirs"
+            show(i)
+
+    def choose_all(choice):
+        for i in chosen:
+            chosen[i] = choice
+            show(i)
+
+    def confirm():
+        for i, c in enumerate(conflicts):
+            choices[c.row_id] = (chosen[i], c.theirs)
+        top.destroy()
+        on_done()
+
+    tree.bind("<Double-1>", toggle)
+    buttons = tk.Frame(top)
+    buttons.pack(pady=10)
+    tk.Button(buttons, text="ใช้ของฉันทั้งหมด", command=lambda: choose_all("ours"),
+              font=("TH Sarabun New", 16)).pack(side="left", padx=5)
+    tk.Button(buttons, text="ใช้ของอีกฝ่ายทั้งหมด", command=lambda: choose_all("theirs"),
+              font=("TH Sarabun New", 16)).pack(side="left", padx=5)
+    tk.Button(buttons, text="บันทึก", command=confirm, font=("TH Sarabun New", 16)).pack(side="left", padx=5)
+    tk.Button(buttons, text="ยกเลิก", command=top.destroy, font=("TH Sarabun New", 16)).pack(side="left", padx=5)
+
+# ===== รายการรายงานสำหรับหน้าเลือก (ค้นชื่อ / เรียงตามคอลัมน์ / แสดงเฉพาะแถวที่มองเห็น) =====
+# ขึ้นจากสมุดรายชื่อที่บันทึกไว้ทันที แล้ว refresh ใน worker (อ่านใหม่เฉพาะไฟล์ที่เปลี่ยน) ค่อยอัปเดตตาราง
+PICKER_COLUMNS = [("name", "ชื่อรายงาน", 200), ("rows", "รายการ", 70), ("date", "ช่วงวันที่", 170),
+                  ("balance", "คงเหลือ", 110), ("modified", "แก้ไขล่าสุด", 130)]
+
+def picker_row(info):
+    dates = f"{info.first_date} - {info.last_date}" if info.first_date else ""
+    balance = format_satang(info.balance) if info.balance is not None else "อ่านไม่ได้"
+    modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(info.mtime)) if info.mtime_ns else ""
+    rows = f"{info.rows:,}" if info.rows is not None else ""
+    return (info.name, rows, dates, balance, modified)
+
+def report_picker(window, reports, on_choose):
+    state = {"reports": reports, "shown": [], "sort": "name", "descending": False, "pending": None}
+
+    top = tk.Frame(window)
+    top.pack(fill="x", padx=10, pady=(10, 0))
+    tk.Label(top, text="ค้นหา:", font=("TH Sarabun New", 16)).pack(side="left")
+    filter_var = tk.StringVar()
+    tk.Entry(top, textvariable=filter_var, font=("TH Sarabun New", 16)).pack(side="left", fill="x", expand=True)
+    count_label = tk.Label(window, text="", font=("TH Sarabun New", 14))
+    count_label.pack(anchor="w", padx=10)
+
+    frame = tk.Frame(window)
+    frame.pack(fill="both", expand=True, padx=10, pady=5)
+    scrollbar = tk.Scrollbar(frame)
+    scrollbar.pack(side="right", fill="y")
+    tree = ttk.Treeview(frame, columns=[key for key, _, _ in PICKER_COLUMNS], show="headings", selectmode="browse")
+    for key, title, width in PICKER_COLUMNS:
+        tree.heading(key, text=title, command=lambda k=key: sort_by(k))
+        tree.column(key, width=width, anchor="w" if key in ("name", "date") else "e")
+    tree.pack(side="left", fill="both", expand=True)
+    table = VirtualTable(tree, scrollbar)
+
+    def apply():
+        state["pending"] = None
+        if not window.winfo_exists():
+            return
+        total, shown = query(state["reports"], filter_var.get(), state["sort"], state["descending"])
+        state["shown"] = shown
+        table.set_rows([picker_row(info) for info in shown])
+        count_label.config(text=f"แสดง {total:,} จาก {len(state['reports']):,} รายงาน")
+
+    # พิมพ์ค้นหาต่อเนื่อง กรองครั้งเดียวหลังหยุดพิมพ์
+    def schedule(*_):
+        if state["pending"] is not None:
+            window.after_cancel(state["pending"])
+        state["pending"] = window.after(150, apply)
+
+    def sort_by(key):
+        state["descending"] = not state["descending"] if state["sort"] == key else key != "name"
+        state["sort"] = key
+        apply()
+
+    def choose(event=None):
+        selected = table.selection()
+        if not selected:
+            return
+        name = state["shown"][selected[0]].name
+        window.destroy()
+        on_choose(name)
+
+    def refreshed(result):
+        state["reports"] = result
+        apply()
+
+    filter_var.trace_add("write", schedule)
+    tree.bind("<Double-1>", choose)
+    tree.bind("<Return>", choose)
+    apply()
+    io_executor.submit(lambda task: list_catalog(task), on_done=refreshed, on_error=lambda e: None,
+                       message="กำลังตรวจรายงานที่เปลี่ยน...", parent=window)
+    return choose
+
 # ==== ดูรายงานและแปลงเป็น PDF (placeholder) ====
 def view_report_ui():
-    reports = list_all_reports()
+    io_executor.submit(lambda task: cached_catalog(task), on_done=show_view_selector,
+                       message="กำลังอ่านรายชื่อรายงาน...")
+
+def show_view_selector(reports):
     if not reports:
         messagebox.showinfo("ไม่มีรายงาน", "ยังไม่มีรายงานในระบบ")
         return
 
-    def open_and_generate(report_file):
-        csv_path = os.path.join(REPORT_DIR, report_file)
-        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
-            reader = list(csv.reader(f))
+    def open_and_generate(report_name):
+        def show_report(rows):
             view_win = tk.Toplevel(root)
-            view_win.title(f"ดูรายงาน: {report_file}")
-            view_win.geometry("800x400")
+            view_win.title(f"ดูรายงาน: {report_name}")
+            view_win.geometry("900x450")
+
+            tree_frame = tk.Frame(view_win)
+            tree_frame.pack(expand=True, fill="both", padx=10, pady=10)
 
-            tree = ttk.Treeview(view_win, columns=reader[0], show="headings")
-            for col in reader[0]:
-                tree.heading(col, text=col)
-                tree.column(col, width=150)
-            for row in reader[1:]:
-                tree.insert('', 'end', values=row)
-            tree.pack(expand=True, fill="both", padx=10, pady=10)
+            tree_scroll = tk.Scrollbar(tree_frame)
+            tree_scroll.pack(side="right", fill="y")
+
+            tree = ttk.Treeview(tree_frame, columns=DATED_HEADER, show="headings")
+            entry_columns(tree, 150)
+            tree.pack(expand=True, fill="both")
+
+            # สร้าง item เฉพาะแถวที่มองเห็น ไฟล์ใหญ่แค่ไหนก็เปิดได้ทันที
+            table = VirtualTable(tree, tree_scroll)
+            table.set_rows(rows)
+
+            # ช่วงวันที่ของ PDF (ว่าง = ทั้งรายงาน) เช่น 2024-01 ถึง 2024-03
+            period_frame = tk.Frame(view_win)
+            period_frame.pack()
+            start_var, end_var = tk.StringVar(), tk.StringVar()
+            tk.Label(period_frame, text="ตั้งแต่").pack(side="left")
+            tk.Entry(period_frame, textvariable=start_var, width=12).pack(side="left", padx=5)
+            tk.Label(period_frame, text="ถึง").pack(side="left")
+            tk.Entry(period_frame, textvariable=end_var, width=12).pack(side="left", padx=5)
 
             def export_pdf():
-                pdf_path = generate_pdf_from_csv(csv_path, report_file.replace(".csv", ""))
-                os.startfile(pdf_path)
-                view_win.destroy()
-                messagebox.showinfo("สำเร็จ", f"แปลงเป็น PDF สำเร็จแล้วบันทึกที่: {pdf_path}")
+                try:
+                    period = read_period(start_var, end_var)
+                except ValueError as e:
+                    messagebox.showwarning("ช่วงวันที่ไม่ถูกต้อง", str(e), parent=view_win)
+                    return
 
-            tk.Button(view_win, text="แปลงเป็น PDF", command=export_pdf).pack(pady=10)
+                def exported(pdf_path):
+                    os.startfile(pdf_path)
+                    view_win.destroy()
+                    messagebox.showinfo("สำเร็จ", f"แปลงเป็น PDF สำเร็จแล้วบันทึกที่: {pdf_path}")
 
-    selector = tk.Toplevel(root)
-    selector.title("เลือกไฟล์รายงานเพื่อดู")
-    selector.geometry("400x550")
+                io_executor.submit(lambda task: generate_pdf(report_name, period),
+                                   on_done=exported, message="กำลังสร้าง PDF...", parent=view_win)
 
-    tk.Label(selector, text="รายงานทั้งหมด", font=("TH Sarabun New", 16, "bold")).pack(pady=5)
+            # ส่งออก XLSX/JSON lines/Parquet/CSV ทีละก้อน ทั้งรายงานใช้แถวที่เปิดอยู่แล้ว มีช่วงวันที่อ่านเฉพาะช่วงนั้น
+            def export_file():
+                try:
+                    period = read_period(start_var, end_var)
+                except ValueError as e:
+                    messagebox.showwarning("ช่วงวันที่ไม่ถูกต้อง", str(e), parent=view_win)
+                    return
+                formats = available_formats()
+                path = filedialog.asksaveasfilename(parent=view_win, defaultextension=".xlsx",
+                                                    filetypes=[(fmt.label, "*" + fmt.extension) for fmt in formats],
+                                                    initialfile=report_name + ".xlsx")
+                if not path:
+                    return
 
-    # ✅ เพิ่ม Scrollbar
-    frame = tk.Frame(selector)
-    frame.pack(fill="both", expand=True, padx=10, pady=10)
+                def work(task):
+                    if period is None:
+                        return export_rows(rows, path, task=task)
+                    if server_url:
+                        return export_rows(iter_report(report_name, period), path, task=task)
+                    return export_report(report_name, path, period=period, task=task)
 
-    scrollbar = tk.Scrollbar(frame)
-    scrollbar.pack(side="right", fill="y")
+                io_executor.submit(work, message="กำลังส่งออก...", parent=view_win,
+                                   on_done=lambda n: messagebox.showinfo("สำเร็จ", f"ส่งออก {n:,} รายการที่ {path}",
+                                                                         parent=view_win))
 
-    listbox = tk.Listbox(frame, font=("TH Sarabun New", 16), height=10, yscrollcommand=scrollbar.set)
-    for r in reports:
-        listbox.insert(tk.END, r)
-    listbox.pack(side="left", fill="both", expand=True)
+            buttons = tk.Frame(view_win)
+            buttons.pack(pady=10)
+            tk.Button(buttons, text="แปลงเป็น PDF", command=export_pdf).pack(side="left", padx=5)
+            tk.Button(buttons, text="ส่งออกไฟล์", command=export_file).pack(side="left", padx=5)
 
-    scrollbar.config(command=listbox.yview)
+        io_executor.submit(lambda task: Ledger(iter_report(report_name), task), on_done=show_report,
+                           message=f"กำลังเปิด {report_name}...")
 
-    def on_select():
-        selected = listbox.curselection()
-        if not selected:
-            return
-        selector.destroy()
-        open_and_generate(reports[selected[0]])
-
-    tk.Button(selector, text="ดูรายงาน", command=on_select, font=("TH Sarabun New", 16)).pack(pady=10)
-
-CATEGORY_OPTIONS = {
-    "รายรับ": [
-        "กองทุนกรรมการ", "กองทุนการศึกษา", "งานไหว้บรรพบุรุษ (ตรุษจีน)",
-        "งานไหว้พระจันทร์", "สนับสนุนหนังสือทำเนียบ", "ค่าทำป้ายแกะสลัก",
-        "ค่าตั้งป้ายบรรพบุรุษ", "ดอกเบี้ยรับ", "รับบริจาคทั่วไป",
-        "รับบริจาคสนับสนุนโครงการ", "อื่นๆ"
-    ],
-    "รายจ่าย": [
-        "เงินเดือน", "ค่ารถ ค่าล่วงเวลาผจก.", "การดำเนินงานและกิจกรรม",
-        "การศึกษา และเยาวชน", "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง",
-        "ซ่อมแซม ค่าจ้างและค่าแรง", "ค่าสาธารณูปโภค", "อื่นๆ"
-    ]
-}
+    selector = tk.Toplevel(root)
+    selector.title("เลือกไฟล์รายงานเพื่อดู")
+    selector.geometry("720x550")
+
+    choose = report_picker(selector, reports, open_and_generate)
+    tk.Button(selector, text="ดูรายงาน", command=choose, font=("TH Sarabun New", 16)).pack(pady=10)
 
 # ===== ฟังก์ชันแก้ไขรายงาน =====
 def edit_report_ui():
-    reports = list_all_reports()
+    io_executor.submit(lambda task: cached_catalog(task), on_done=show_edit_selector,
+                       message="กำลังอ่านรายชื่อรายงาน...")
+
+def show_edit_selector(reports):
     if not reports:
         messagebox.showinfo("ไม่มีรายงาน", "ยังไม่มีรายงานในระบบ")
         return
 
-    def open_report_editor(report_file):
-        data = []
+    def open_report_editor(report_name):
+        # ทุกการแก้ไขผ่าน session: รหัสแถวไม่เลื่อน, เลิกทำ/ทำซ้ำได้, และบันทึกลง journal ก่อน (กู้คืนได้ถ้าโปรแกรมปิดไป)
+        # ก่อนอ่านรายงานเสร็จใช้ session ว่างที่ไม่แตะไฟล์ (ใส่ version เอง ไม่ต้อง stat รายงาน)
+        session = EditSession(report_name, journal=False, version=0)
 
         def load_selected_report():
-            path = os.path.join(REPORT_DIR, report_file)
-            with open(path, newline='', encoding='utf-8-sig') as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-                data.clear()
-                data.extend(rows[1:])
+            # อ่านรายงาน สร้างดัชนีค้นหา เปิด journal และเล่น journal ที่ค้างอยู่ใน worker thread ทั้งหมด
+            # journal ของรายงานรุ่นอื่น หรือเสียหาย: ทิ้งแล้วเปิดรายงานใหม่ (data อาจถูกเล่นไปบางส่วนแล้ว)
+            # journal ที่ session อื่นรับไปกู้แล้ว (JournalInUse ก่อนเล่น op ใด ๆ): เปิดรายงานตามปกติ
+            # ไม่กู้คืน (หรือ journal ว่าง): ทิ้ง journal ค้างนั้น ไม่ต้องถามซ้ำทุกครั้งที่เปิด
+            def read(task, pending, recover):
+                if pending is not None and not recover:
+                    discard_journal(pending[0])
+                version, rows = load_versioned(store, report_name, task)
+                index = SearchIndex(rows)
+                try:
+                    return EditSession(report_name, rows, index, recover=recover and pending[0],
+                                       version=version), False
+                except JournalInUse:
+                    return EditSession(report_name, rows, index, version=version), False
+                except (ValueError, KeyError, TypeError, IndexError, OSError):
+                    if not recover:
+                        raise
+                    discard_journal(pending[0])
+                version, rows = load_versioned(store, report_name, task)
+                return EditSession(report_name, rows, SearchIndex(rows), version=version), True
+
+            def loaded(result):
+                nonlocal session
+                session, failed = result
+                if failed:
+                    messagebox.showwarning("กู้คืนไม่ได้", "รายงานถูกแก้ไขจากที่อื่นหลังจากนั้น "
+                                                            "จึงกู้คืนการแก้ไขที่ค้างอยู่ไม่ได้", parent=win)
                 refresh_table()
 
-        def refresh_table():
-            for row in tree.get_children():
-                tree.delete(row)
-            for i, row in enumerate(data):
-                if search_var.get().lower() in str(row).lower():
-                    tree.insert('', 'end', iid=i, values=row)
+            def checked(pending):
+                recover = pending is not None and pending[2] > 0 and messagebox.askyesno(
+                    "กู้คืนการแก้ไข", f"พบการแก้ไข {report_name} ที่ยังไม่ได้บันทึก ({pending[2]:,} รายการ)\n"
+                                     "ต้องการกู้คืนหรือไม่?", parent=win)
+                io_executor.submit(read, pending, recover, on_done=loaded, message=f"กำลังเปิด {report_name}...",
+                                   parent=win)
+
+            io_executor.submit(lambda task: pending_journal(report_name), on_done=checked,
+                               message=f"กำลังเปิด {report_name}...", parent=win)
+
+        def refresh_table(keep_offset=False):
+            try:
+                period = read_period(start_var, end_var)
+            except ValueError:
+                # ยังพิมพ์วันที่ไม่ครบ: ยังไม่กรองตามวันที่
+                period = None
+            with diagnostics.span("refresh_table"):
+                keys = session.search(search_var.get(), period)
+                table.set_rows(session.data.view(keys), keys, keep_offset=keep_offset)
+            undo_button.config(state="normal" if session.can_undo else "disabled")
+            redo_button.config(state="normal" if session.can_redo else "disabled")
+
+        def undo(event=None):
+            if session.undo():
+                refresh_table(keep_offset=True)
+
+        def redo(event=None):
+            if session.redo():
+                refresh_table(keep_offset=True)
 
         def delete_selected():
-            selected = tree.selection()
+            selected = table.selection()
             if not selected:
                 return
             confirm = messagebox.askyesno("ยืนยันการลบ", "คุณแน่ใจหรือไม่ว่าต้องการลบรายการที่เลือก?")
             if not confirm:
                 return
-            for item in selected:
-                tree.delete(item)
-                del data[int(item)]
-            refresh_table()
+            session.delete(selected)
+            refresh_table(keep_offset=True)
 
         def update_selected():
-            selected = tree.selection()
+            selected = table.selection()
             if not selected:
                 return
             item = selected[0]
-            values = tree.item(item, 'values')
+            values = session.data[item]
 
             update_win = tk.Toplevel(win)
             update_win.title("แก้ไขรายการ")
-            update_win.geometry("400x370")
+            update_win.geometry("400x430")
 
             tk.Label(update_win, text="ประเภท:", font=("TH Sarabun New", 16)).pack()
             type_var = tk.StringVar(value=values[0])
@@ -461,24 +654,33 @@ def edit_report_ui():
             amount_var = tk.StringVar(value=values[3])
             tk.Entry(update_win, textvariable=amount_var, font=("TH Sarabun New", 16)).pack()
 
+            tk.Label(update_win, text="วันที่:", font=("TH Sarabun New", 16)).pack()
+            date_var = tk.StringVar(value=values[4])
+            tk.Entry(update_win, textvariable=date_var, font=("TH Sarabun New", 16)).pack()
+
             def save_changes():
                 try:
-                    amount = float(amount_var.get())
+                    amount = normalize(amount_var.get())
                 except ValueError:
                     messagebox.showwarning("คำเตือน", "จำนวนเงินต้องเป็นตัวเลข")
                     return
+                try:
+                    date = dates.normalize(date_var.get())
+                except ValueError:
+                    messagebox.showwarning("คำเตือน", "วันที่ไม่ถูกต้อง", parent=update_win)
+                    return
                 category = cat_var.get()
                 if use_subcat_var.get() and subcat_var.get().strip():
                     category += f" > {subcat_var.get().strip()}"
-                new_row = [type_var.get(), category, detail_var.get(), amount]
-                data[int(item)] = new_row
-                refresh_table()
+                session.update(item, Entry(type_var.get(), category, detail_var.get(), amount, date))
+                refresh_table(keep_offset=True)
                 update_win.destroy()
 
             tk.Button(update_win, text="บันทึก", command=save_changes,
                       font=("TH Sarabun New", 16)).pack(pady=10)
 
         def add_new_entry():
+            load_categorizer()
             top = tk.Toplevel(win)
             top.title("เพิ่มรายการใหม่")
             top.geometry("600x500")
@@ -519,11 +721,14 @@ def edit_report_ui():
             details_frame.grid(row=4, column=0, columnspan=2, pady=5, sticky="w")
 
             detail_entries = []
+            on_detail = attach_category_suggestion(form_frame, 6, type_var, cat_var, use_subcat_var, subcat_var, subcat_entry)
+
             def add_detail_row():
                 row = tk.Frame(details_frame)
                 row.pack(pady=2, anchor="w")
                 d_var = tk.StringVar()
                 a_var = tk.StringVar()
+                d_var.trace("w", lambda *args: on_detail(d_var.get()))
                 tk.Entry(row, textvariable=d_var, font=("TH Sarabun New", 16), width=30).pack(side="left", padx=5)
                 tk.Entry(row, textvariable=a_var, font=("TH Sarabun New", 16), width=10).pack(side="left", padx=5)
                 detail_entries.append((d_var, a_var))
@@ -531,12 +736,16 @@ def edit_report_ui():
             add_detail_row()
             tk.Button(form_frame, text="+ เพิ่มแถว", font=("TH Sarabun New", 14), command=add_detail_row).grid(row=5, column=0, columnspan=2)
 
+            tk.Label(form_frame, text="วันที่ (YYYY-MM-DD หรือ วัน/เดือน/ปี):", font=("TH Sarabun New", 16)).grid(row=7, column=0, sticky="w")
+            date_var = tk.StringVar(value=dates.today())
+            tk.Entry(form_frame, textvariable=date_var, font=("TH Sarabun New", 16), width=12).grid(row=7, column=1, sticky="w")
+
             def confirm_add():
                 valid_rows = []
                 for d_var, a_var in detail_entries:
                     desc = d_var.get().strip()
                     try:
-                        amt = float(a_var.get())
+                        amt = normalize(a_var.get())
                         if desc:
                             valid_rows.append((desc, amt))
                     except:
@@ -545,89 +754,552 @@ def edit_report_ui():
                 if not valid_rows:
                     messagebox.showwarning("เตือน", "กรุณากรอกรายละเอียดและจำนวนเงิน")
                     return
+                try:
+                    date = dates.normalize(date_var.get())
+                except ValueError:
+                    messagebox.showwarning("เตือน", "วันที่ไม่ถูกต้อง", parent=top)
+                    return
 
                 category = cat_var.get()
                 if use_subcat_var.get() and subcat_var.get().strip():
                     category += f" > {subcat_var.get().strip()}"
 
-                for desc, amt in valid_rows:
-                    data.append([type_var.get(), category, desc, amt])
-                refresh_table()
+                session.add([Entry(type_var.get(), category, desc, amt, date) for desc, amt in valid_rows])
+                refresh_table(keep_offset=True)
                 top.destroy()
 
             tk.Button(top, text="เพิ่มทั้งหมด", command=confirm_add, font=("TH Sarabun New", 16)).pack(pady=10)
 
         def save_changes_to_file():
-            path = os.path.join(REPORT_DIR, report_file)
-            save_to_csv(report_file.replace(".csv", ""), data)
-            messagebox.showinfo("สำเร็จ", f"บันทึกเรียบร้อยที่ {path}")
-            win.destroy()
+            # เพิ่มอย่างเดียว -> ต่อท้ายไฟล์, มีแก้/ลบ -> เขียนใหม่ทั้งไฟล์ผ่านไฟล์ชั่วคราว
+            # มีคนบันทึกรายงานนี้ไปก่อน -> รวมการแก้ไขทั้งสองฝั่ง แถวที่ชนกันให้ผู้ใช้เลือก แล้วบันทึกอีกรอบ
+            choices = {}
+
+            # บันทึกสำเร็จแล้วปิด session (รอ journal แล้วลบทิ้ง) ใน worker เดียวกัน
+            def save(task):
+                path, merged = save_session(store, session, choices, task)
+                if path is not None:
+                    session.close()
+                return path, merged
+
+            def attempt():
+                io_executor.submit(save, on_done=saved, message="กำลังบันทึก...", parent=win)
+
+            def saved(result):
+                path, merged = result
+                if path is None:
+                    resolve_conflicts(win, merged.unresolved, choices, attempt)
+                    return
+                note = "\n(รวมกับการแก้ไขที่บันทึกจากที่อื่นระหว่างนี้แล้ว)" if merged is not None else ""
+                messagebox.showinfo("สำเร็จ", f"บันทึกเรียบร้อยที่ {path}{note}")
+                win.destroy()
+
+            attempt()
 
         win = tk.Toplevel(root)
-        win.title(f"แก้ไข: {report_file}")
-        win.geometry("800x550")
+        win.title(f"แก้ไข: {report_name}")
+        win.geometry("900x550")
 
+        # ค้นหา + ช่วงวันที่ (YYYY, YYYY-MM หรือ YYYY-MM-DD ว่าง = ไม่จำกัด)
+        filter_frame = tk.Frame(win)
+        filter_frame.pack(fill="x", padx=10)
         search_var = tk.StringVar()
-        tk.Entry(win, textvariable=search_var, font=("TH Sarabun New", 16)).pack(fill="x", padx=10)
-        search_var.trace("w", lambda *args: refresh_table())
+        start_var, end_var = tk.StringVar(), tk.StringVar()
+        tk.Entry(filter_frame, textvariable=search_var, font=("TH Sarabun New", 16)).pack(side="left", fill="x", expand=True)
+        tk.Label(filter_frame, text="ตั้งแต่", font=("TH Sarabun New", 16)).pack(side="left", padx=5)
+        tk.Entry(filter_frame, textvariable=start_var, font=("TH Sarabun New", 16), width=11).pack(side="left")
+        tk.Label(filter_frame, text="ถึง", font=("TH Sarabun New", 16)).pack(side="left", padx=5)
+        tk.Entry(filter_frame, textvariable=end_var, font=("TH Sarabun New", 16), width=11).pack(side="left")
+        for var in (search_var, start_var, end_var):
+            var.trace("w", lambda *args: refresh_table())
 
         style = ttk.Style()
         style.configure("Treeview", font=("TH Sarabun New", 16), rowheight=28)
         style.configure("Treeview.Heading", font=("TH Sarabun New", 16, "bold"))
 
-        tree = ttk.Treeview(win, columns=("ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"), show="headings")
-        for col in ("ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"):
-            tree.heading(col, text=col)
-            tree.column(col, width=150)
-        tree.pack(expand=True, fill="both", padx=10, pady=10)
+        tree_frame = tk.Frame(win)
+        tree_frame.pack(expand=True, fill="both", padx=10, pady=10)
+
+        tree_scroll = tk.Scrollbar(tree_frame)
+        tree_scroll.pack(side="right", fill="y")
+
+        tree = ttk.Treeview(tree_frame, columns=DATED_HEADER, show="headings")
+        entry_columns(tree, 150)
+        tree.pack(expand=True, fill="both")
+        table = VirtualTable(tree, tree_scroll)
 
         btn_frame = tk.Frame(win)
         btn_frame.pack(pady=5)
         tk.Button(btn_frame, text="เพิ่มรายการใหม่", command=add_new_entry, font=("TH Sarabun New", 16)).grid(row=0, column=0, padx=5)
         tk.Button(btn_frame, text="ลบรายการที่เลือก", command=delete_selected, font=("TH Sarabun New", 16)).grid(row=0, column=1, padx=5)
         tk.Button(btn_frame, text="แก้ไขรายการที่เลือก", command=update_selected, font=("TH Sarabun New", 16)).grid(row=0, column=2, padx=5)
+        undo_button = tk.Button(btn_frame, text="เลิกทำ", command=undo, font=("TH Sarabun New", 16), state="disabled")
+        undo_button.grid(row=0, column=3, padx=5)
+        redo_button = tk.Button(btn_frame, text="ทำซ้ำ", command=redo, font=("TH Sarabun New", 16), state="disabled")
+        redo_button.grid(row=0, column=4, padx=5)
         tk.Button(win, text="บันทึกการเปลี่ยนแปลง", command=save_changes_to_file, font=("TH Sarabun New", 16)).pack(pady=10)
+        win.bind("<Control-z>", undo)
+        win.bind("<Control-y>", redo)
+
+        # ปิดหน้าต่างโดยไม่บันทึก = ทิ้งการแก้ไข (journal ถูกลบ) ปิดโปรแกรมผิดปกติ journal ยังอยู่ให้กู้คืน
+        def close_editor():
+            if session.dirty and not messagebox.askyesno(
+                    "ยังไม่ได้บันทึก", "ปิดโดยไม่บันทึกการเปลี่ยนแปลงหรือไม่?", parent=win):
+                return
+            io_executor.submit(lambda task: session.close(), on_done=lambda _: win.destroy(),
+                               message="กำลังปิด...", parent=win)
+
+        win.protocol("WM_DELETE_WINDOW", close_editor)
 
         load_selected_report()
 
     selector = tk.Toplevel(root)
     selector.title("เลือกไฟล์รายงานที่จะแก้ไข")
-    selector.geometry("400x550")
+    selector.geometry("720x550")
 
-    tk.Label(selector, text="รายงานทั้งหมด", font=("TH Sarabun New", 16, "bold")).pack(pady=5)
+    choose = report_picker(selector, reports, open_report_editor)
+    tk.Button(selector, text="ตกลง", command=choose, font=("TH Sarabun New", 16)).pack(pady=10)
 
-    frame = tk.Frame(selector)
-    frame.pack(fill="both", expand=True, padx=10, pady=10)
+# ===== แปลงทุกรายงานเป็น PDF (หลาย process) =====
+def batch_export_ui():
+    io_executor.submit(lambda task: pending_reports(), on_done=start_batch_export,
+                       message="กำลังตรวจรายงานที่ต้องแปลง...")
 
-    scrollbar = tk.Scrollbar(frame)
-    scrollbar.pack(side="right", fill="y")
+def start_batch_export(jobs):
+    if not jobs:
+        messagebox.showinfo("ไม่มีงาน", "PDF ของทุกรายงานเป็นปัจจุบันแล้ว")
+        return
+
+    win = tk.Toplevel(root)
+    win.title("แปลงทุกรายงานเป็น PDF")
+    win.geometry("400x180")
+
+    status = tk.Label(win, text=f"กำลังแปลง 0/{len(jobs)}", font=("TH Sarabun New", 16))
+    status.pack(pady=10)
+    bar = ttk.Progressbar(win, maximum=len(jobs), length=320)
+    bar.pack(pady=5)
+
+    executor = make_executor()
+    futures = submit_all(executor, jobs)
+    failed = []
+
+    def poll():
+        for future in [f for f in futures if f.done()]:
+            csv_path, _ = futures.pop(future)
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                failed.append(os.path.basename(csv_path))
+        done = len(jobs) - len(futures)
+        bar['value'] = done
+        status.config(text=f"กำลังแปลง {done}/{len(jobs)}")
+        if futures:
+            win.after(200, poll)
+            return
+        executor.shutdown(wait=False)
+        win.destroy()
+        if failed:
+            messagebox.showerror("ผิดพลาด", "แปลงไม่สำเร็จ: " + ", ".join(failed))
+        else:
+            messagebox.showinfo("สำเร็จ", f"แปลงเป็น PDF สำเร็จ {len(jobs)} รายงาน")
+
+    def cancel():
+        executor.shutdown(wait=False, cancel_futures=True)
+        futures.clear()
+        win.destroy()
+
+    tk.Button(win, text="ยกเลิก", command=cancel, font=("TH Sarabun New", 16)).pack(pady=10)
+    win.protocol("WM_DELETE_WINDOW", cancel)
+    poll()
+
+# ===== สรุปหลายรายงาน (ต้องมี numpy) =====
+def multi_report_ui():
+    io_executor.submit(lambda task: list_catalog(task), on_done=show_multi_report,
+                       message="กำลังอ่านรายชื่อรายงาน...")
+
+def show_multi_report(reports):
+    try:
+        import analytics
+    except ImportError:
+        messagebox.showerror("ผิดพลาด", "หน้าสรุปหลายรายงานต้องติดตั้ง numpy ก่อน")
+        return
+    if not reports:
+        messagebox.showinfo("ไม่มีรายงาน", "ยังไม่มีรายงานในระบบ")
+        return
 
-    listbox = tk.Listbox(frame, font=("TH Sarabun New", 16), yscrollcommand=scrollbar.set, height=12)
-    for r in reports:
-        listbox.insert(tk.END, r)
+    win = tk.Toplevel(root)
+    win.title("สรุปหลายรายงาน")
+    win.geometry("1100x650")
+
+    left = tk.Frame(win)
+    left.pack(side="left", fill="y", padx=10, pady=10)
+    tk.Label(left, text="เลือกรายงาน (ตามลำดับเดือน)", font=("TH Sarabun New", 16, "bold")).pack()
+
+    list_frame = tk.Frame(left)
+    list_frame.pack(fill="both", expand=True)
+    list_scroll = tk.Scrollbar(list_frame)
+    list_scroll.pack(side="right", fill="y")
+    listbox = tk.Listbox(list_frame, font=("TH Sarabun New", 16), selectmode=tk.EXTENDED,
+                         yscrollcommand=list_scroll.set, width=28)
+    for info in reports:
+        listbox.insert(tk.END, info.name)
     listbox.pack(side="left", fill="both", expand=True)
+    list_scroll.config(command=listbox.yview)
 
-    scrollbar.config(command=listbox.yview)
+    level_var = tk.StringVar(value="main")
+    tk.Radiobutton(left, text="หมวดหมู่หลัก", variable=level_var, value="main",
+                   font=("TH Sarabun New", 14)).pack(anchor="w")
+    tk.Radiobutton(left, text="หมวดหมู่ย่อย", variable=level_var, value="category",
+                   font=("TH Sarabun New", 14)).pack(anchor="w")
 
-    def on_select():
-        selected = listbox.curselection()
-        if not selected:
+    right = tk.Frame(win)
+    right.pack(side="left", fill="both", expand=True, padx=10, pady=10)
+    top_label = tk.Label(right, text="", font=("TH Sarabun New", 14), justify="left", anchor="w")
+    top_label.pack(fill="x")
+
+    tree_frame = tk.Frame(right)
+    tree_frame.pack(fill="both", expand=True)
+    tree_scroll = tk.Scrollbar(tree_frame)
+    tree_scroll.pack(side="right", fill="y")
+    columns = ("รายงาน", "ประเภท", "หมวดหมู่", "ยอดรวม", "เปลี่ยนแปลง")
+    tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=140)
+    tree.pack(fill="both", expand=True)
+    table = VirtualTable(tree, tree_scroll)
+
+    state = {"result": None, "level": "main"}
+
+    def summarize():
+        names = [reports[i].name for i in listbox.curselection()]
+        if not names:
+            messagebox.showwarning("คำเตือน", "กรุณาเลือกรายงานอย่างน้อย 1 รายงาน", parent=win)
             return
-        selector.destroy()
-        open_report_editor(reports[selected[0]])
+        level = level_var.get()
+
+        def work(task):
+            result = analytics.MultiReport(names)
+            return result, result.summary_rows(level), result.top_n(5, "รายจ่าย", level)
 
-    tk.Button(selector, text="ตกลง", command=on_select, font=("TH Sarabun New", 16)).pack(pady=10)
+        def done(result):
+            multi, rows, top = result
+            state["result"], state["level"] = multi, level
+            table.set_rows([[r, t, g, f"{total:,.2f}", f"{delta:+,.2f}"] for r, t, g, total, delta in rows])
+            top_label.config(text="รายจ่ายสูงสุด: " + ",  ".join(f"{g} {v:,.2f}" for g, v in top))
 
+        io_executor.submit(work, on_done=done, message="กำลังสรุปรายงาน...", parent=win)
 
+    def export():
+        multi = state["result"]
+        if multi is None:
+            messagebox.showwarning("คำเตือน", "กรุณากดสรุปก่อนส่งออก", parent=win)
+            return
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv")], initialfile="สรุปหลายรายงาน.csv")
+        if not path:
+            return
+        level = state["level"]
+        io_executor.submit(lambda task: multi.export_csv(path, level), parent=win, message="กำลังส่งออก...",
+                           on_done=lambda p: messagebox.showinfo("สำเร็จ", f"ส่งออกแล้วที่ {p}", parent=win))
+
+    tk.Button(left, text="สรุป", command=summarize, font=("TH Sarabun New", 16), width=14).pack(pady=5)
+    tk.Button(left, text="ส่งออก CSV", command=export, font=("TH Sarabun New", 16), width=14).pack(pady=5)
+
+# ===== แดชบอร์ด: กราฟตามหมวดหลักและงบประมาณเทียบยอดจริงของหลายรายงาน =====
+DASHBOARD_WIDTH = 760
+
+def dashboard_ui():
+    io_executor.submit(lambda task: list_catalog(task), on_done=show_dashboard,
+                       message="กำลังอ่านรายชื่อรายงาน...")
+
+def show_dashboard(reports):
+    win = tk.Toplevel(root)
+    win.title("แดชบอร์ดงบประมาณ")
+    win.geometry("1100x750")
+
+    left = tk.Frame(win)
+    left.pack(side="left", fill="y", padx=10, pady=10)
+    tk.Label(left, text="เลือกรายงาน (ไม่เลือก = ทุกรายงาน)", font=("TH Sarabun New", 16, "bold")).pack()
+
+    list_frame = tk.Frame(left)
+    list_frame.pack(fill="both", expand=True)
+    list_scroll = tk.Scrollbar(list_frame)
+    list_scroll.pack(side="right", fill="y")
+    listbox = tk.Listbox(list_frame, font=("TH Sarabun New", 16), selectmode=tk.EXTENDED,
+                         yscrollcommand=list_scroll.set, width=28, exportselection=False)
+    for info in reports:
+        listbox.insert(tk.END, info.name)
+    listbox.pack(side="left", fill="both", expand=True)
+    list_scroll.config(command=listbox.yview)
+
+    right = tk.Frame(win)
+    right.pack(side="left", fill="both", expand=True, padx=10, pady=10)
+    canvas_scroll = tk.Scrollbar(right)
+    canvas_scroll.pack(side="right", fill="y")
+    canvas = tk.Canvas(right, bg="white", yscrollcommand=canvas_scroll.set)
+    canvas.pack(side="left", fill="both", expand=True)
+    canvas_scroll.config(command=canvas.yview)
+
+    def refresh():
+        names = [reports[i].name for i in listbox.curselection()] or None
+
+        # รวมยอดและอ่านงบใน worker วาดกราฟจากข้อมูลที่ได้บน thread ของ Tk (ไม่กี่ร้อยชิ้น)
+        def work(task):
+            return summary_charts(dashboard_totals(names, task), load_budgets())
+
+        def done(charts):
+            if not win.winfo_exists():
+                return
+            canvas.delete("chart")
+            y = 10
+            for name, data in charts:
+                height = chart_height(name, data)
+                draw_tk(name, data, canvas, 10, y, DASHBOARD_WIDTH, height)
+                y += height + 20
+            canvas.config(scrollregion=(0, 0, DASHBOARD_WIDTH + 20, y))
+
+        io_executor.submit(work, on_done=done, message="กำลังสรุปยอด...", parent=win)
+
+    tk.Button(left, text="รีเฟรช", command=refresh, font=("TH Sarabun New", 16), width=14).pack(pady=5)
+    tk.Button(left, text="ตั้งงบประมาณ", command=lambda: budget_editor(win, refresh),
+              font=("TH Sarabun New", 16), width=14).pack(pady=5)
+    refresh()
+
+# งบประมาณต่อหมวดหลักใน CATEGORY_OPTIONS (ช่องว่าง = ไม่มีงบ) บันทึกแล้วเรียก on_saved
+# อ่านไฟล์งบประมาณใน worker แล้วค่อยเปิดหน้าต่าง (โฟลเดอร์รายงานอาจอยู่บน network drive)
+def budget_editor(parent, on_saved):
+    io_executor.submit(lambda task: load_budgets(),
+                       on_done=lambda budgets: show_budget_editor(parent, on_saved, budgets),
+                       message="กำลังอ่านงบประมาณ...", parent=parent)
+
+def show_budget_editor(parent, on_saved, budgets):
+    if not parent.winfo_exists():
+        return
+    top = tk.Toplevel(parent)
+    top.title("ตั้งงบประมาณ")
+    top.geometry("520x600")
+
+    frame = tk.Frame(top)
+    frame.pack(fill="both", expand=True, padx=10, pady=10)
+    scroll = tk.Scrollbar(frame)
+    scroll.pack(side="right", fill="y")
+    columns = ("ประเภท", "หมวดหลัก", "งบประมาณ")
+    tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode="browse", yscrollcommand=scroll.set)
+    scroll.config(command=tree.yview)
+    for col, width in zip(columns, (90, 260, 120)):
+        tree.heading(col, text=col)
+        tree.column(col, width=width, anchor="e" if col == "งบประมาณ" else "w")
+    tree.pack(fill="both", expand=True)
+
+    for kind, mains in CATEGORY_OPTIONS.items():
+        for main in mains:
+            budget = budgets.get(kind, {}).get(main)
+            tree.insert('', 'end', values=(kind, main, format_satang(budget) if budget else ""))
+
+    form = tk.Frame(top)
+    form.pack(pady=5)
+    selected_label = tk.Label(form, text="", font=("TH Sarabun New", 14), width=30, anchor="w")
+    selected_label.grid(row=0, column=0, columnspan=2)
+    amount_var = tk.StringVar()
+    amount_entry = tk.Entry(form, textvariable=amount_var, font=("TH Sarabun New", 16), width=15)
+    amount_entry.grid(row=1, column=0, padx=5)
+
+    def on_select(event=None):
+        item = tree.focus()
+        if not item:
+            return
+        kind, main, amount = tree.item(item, "values")
+        selected_label.config(text=f"{kind}: {main}")
+        amount_var.set(amount)
+        amount_entry.focus_set()
+
+    def apply(event=None):
+        item = tree.focus()
+        if not item:
+            return
+        text = amount_var.get().strip()
+        try:
+            satang = to_satang(text) if text else 0
+        except ValueError:
+            messagebox.showerror("ผิดพลาด", "จำนวนเงินไม่ถูกต้อง", parent=top)
+            return
+        kind, main, _ = tree.item(item, "values")
+        tree.item(item, values=(kind, main, format_satang(satang) if satang else ""))
+
+    def save():
+        stored = {}
+        for item in tree.get_children():
+            kind, main, amount = tree.item(item, "values")
+            if amount:
+                stored.setdefault(kind, {})[main] = to_satang(amount)
+
+        def saved(path):
+            top.destroy()
+            on_saved()
+
+        io_executor.submit(lambda task: save_budgets(stored), on_done=saved, message="กำลังบันทึกงบประมาณ...",
+                           parent=top)
+
+    tree.bind("<<TreeviewSelect>>", on_select)
+    amount_entry.bind("<Return>", apply)
+    tk.Button(form, text="ตั้งงบ", command=apply, font=("TH Sarabun New", 14)).grid(row=1, column=1, padx=5)
+    tk.Button(top, text="บันทึก", command=save, font=("TH Sarabun New", 16), width=15).pack(pady=10)
+
+# ===== นำเข้ารายการเดินบัญชีจากธนาคาร =====
+def import_statement_ui():
+    path = filedialog.askopenfilename(title="เลือกไฟล์รายการเดินบัญชี",
+                                      filetypes=[("Statement", "*.csv *.ofx *.qfx *.qif"), ("ทุกไฟล์", "*.*")])
+    if not path:
+        return
+
+    win = tk.Toplevel(root)
+    win.title("นำเข้ารายการเดินบัญชี")
+    win.geometry("450x340")
+
+    tk.Label(win, text=os.path.basename(path), font=("TH Sarabun New", 16, "bold")).pack(pady=5)
+    tk.Label(win, text="นำเข้าไปยังรายงาน (สร้างใหม่ถ้ายังไม่มี)", font=("TH Sarabun New", 16)).pack()
+    name_var = tk.StringVar(value=os.path.splitext(os.path.basename(path))[0])
+    tk.Entry(win, textvariable=name_var, font=("TH Sarabun New", 16)).pack(pady=5)
+
+    order_var = tk.StringVar(value="dmy")
+    tk.Radiobutton(win, text="วัน/เดือน/ปี", variable=order_var, value="dmy",
+                   font=("TH Sarabun New", 14)).pack(anchor="w", padx=40)
+    tk.Radiobutton(win, text="เดือน/วัน/ปี", variable=order_var, value="mdy",
+                   font=("TH Sarabun New", 14)).pack(anchor="w", padx=40)
+    learn_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(win, text="รายการที่ไม่ตรงกฎ ใช้หมวดที่เรียนรู้จากรายงานเดิม", variable=learn_var,
+                   font=("TH Sarabun New", 14)).pack(anchor="w", padx=40)
+
+    def start():
+        from statement_import import import_statement
+        name = name_var.get().strip()
+        if not name:
+            messagebox.showwarning("คำเตือน", "กรุณากรอกชื่อรายงาน", parent=win)
+            return
+        order, learn = order_var.get(), learn_var.get()
+
+        def done(stats):
+            win.destroy()
+            messagebox.showinfo("สำเร็จ", f"อ่าน {stats['read']:,} รายการ\n"
+                                          f"นำเข้า {stats['imported']:,} รายการ\n"
+                                          f"ซ้ำกับที่มีอยู่ {stats['duplicates']:,} รายการ")
+
+        io_executor.submit(lambda task: import_statement(name, path, order=order, task=task, learn=learn),
+                           on_done=done, message="กำลังนำเข้า...", parent=win)
+
+    tk.Button(win, text="นำเข้า", command=start, font=("TH Sarabun New", 16), width=15).pack(pady=10)
+
+# ===== หน้าต่างวินิจฉัย: เวลาที่ใช้ในแต่ละส่วน ตัวนับ และ profile =====
+def diagnostics_ui():
+    win = tk.Toplevel(root)
+    win.title("การวินิจฉัยประสิทธิภาพ")
+    win.geometry("820x620")
+
+    top = tk.Frame(win)
+    top.pack(fill="x", padx=10, pady=5)
+    enabled_var = tk.BooleanVar(value=diagnostics.ENABLED)
+
+    # ปิดการจับเวลาปิดไฟล์ JSON-lines ที่เปิดอยู่ด้วย จึงทำใน worker
+    def toggle():
+        if enabled_var.get():
+            diagnostics.enable()
+        else:
+            io_executor.submit(lambda task: diagnostics.disable(), parent=win)
+
+    tk.Checkbutton(top, text="เปิดการจับเวลา", variable=enabled_var, command=toggle,
+                   font=("TH Sarabun New", 16)).pack(side="left")
+
+    columns = ("ชื่อ", "ครั้ง", "รวม (ms)", "เฉลี่ย (ms)", "สูงสุด (ms)")
+    tree = ttk.Treeview(win, columns=columns, show="headings", height=10)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=140 if col == "ชื่อ" else 110, anchor="w" if col == "ชื่อ" else "e")
+    tree.pack(fill="x", padx=10)
+
+    output = tk.Text(win, font=("Courier New", 10), height=14)
+    output.pack(fill="both", expand=True, padx=10, pady=5)
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        snap = diagnostics.snapshot()
+        tree.delete(*tree.get_children())
+        for name, stat in sorted(snap["spans"].items()):
+            tree.insert('', 'end', values=(name, f"{stat['count']:,}", f"{stat['total_ms']:,.1f}",
+                                           f"{stat['mean_ms']:,.2f}", f"{stat['max_ms']:,.1f}"))
+        for name, value in sorted(snap["counters"].items()):
+            tree.insert('', 'end', values=(name, f"{value:,}", "", "", ""))
+        win.after(1000, refresh)
+
+    def save_jsonl():
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".jsonl",
+                                            filetypes=[("JSON lines", "*.jsonl")])
+        if not path:
+            return
+
+        # ต่อจากนี้ทุก span ที่จบถูกเขียนต่อท้ายไฟล์เดียวกัน
+        def write(task):
+            diagnostics.write_snapshot(path)
+            diagnostics.enable(path)
+
+        io_executor.submit(write, on_done=lambda _: enabled_var.set(True), message="กำลังบันทึก...", parent=win)
+
+    def toggle_capture():
+        if not diagnostics.capturing():
+            diagnostics.start_capture()
+            capture_button.config(text="หยุดจับ profile")
+            return
+        # หยุด profiler ใน thread ของ Tk (thread ที่เริ่มจับ) แล้วสรุปผลและเขียน .prof ใน worker
+        prof_path = os.path.join(REPORT_DIR, "diagnostics.prof")
+        capture = diagnostics.end_capture()
+        capture_button.config(text="เริ่มจับ profile (cProfile + tracemalloc)")
+
+        def show(text):
+            output.delete("1.0", tk.END)
+            output.insert(tk.END, f"บันทึก profile ที่ {prof_path}\n\n{text}")
+
+        io_executor.submit(lambda task: diagnostics.capture_report(capture, prof_path), on_done=show,
+                           message="กำลังสรุป profile...", parent=win)
+
+    buttons = tk.Frame(win)
+    buttons.pack(pady=5)
+    tk.Button(buttons, text="ล้างค่า", command=diagnostics.reset, font=("TH Sarabun New", 14)).pack(side="left", padx=5)
+    tk.Button(buttons, text="บันทึกเป็น JSON-lines...", command=save_jsonl,
+              font=("TH Sarabun New", 14)).pack(side="left", padx=5)
+    capture_button = tk.Button(buttons, text="หยุดจับ profile" if diagnostics.capturing()
+                               else "เริ่มจับ profile (cProfile + tracemalloc)",
+                               command=toggle_capture, font=("TH Sarabun New", 14))
+    capture_button.pack(side="left", padx=5)
+    refresh()
 
 # ===== เมนูหลัก =====
 def main_menu():
     tk.Label(root, text="ระบบจัดการรายงานรายรับรายจ่าย", font=("TH Sarabun New", 20, "bold")).pack(pady=20)
+    if server_url:
+        tk.Label(root, text=f"เซิร์ฟเวอร์: {server_url}", font=("TH Sarabun New", 14)).pack()
+    local_only = "disabled" if server_url else "normal"
     tk.Button(root, text="1) สร้างรายงานใหม่", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=create_report_ui).pack(pady=5)
     tk.Button(root, text="2) ดูรายงาน และแปลงเป็น PDF", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=view_report_ui).pack(pady=5)
     tk.Button(root, text="3) แก้ไข/ลบ รายการ", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=edit_report_ui).pack(pady=5)
-    tk.Button(root, text="4) ออกจากโปรแกรม", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=root.quit).pack(pady=20)
-
-
-main_menu()
-root.mainloop()
+    tk.Button(root, text="4) แปลงทุกรายงานเป็น PDF", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=batch_export_ui, state=local_only).pack(pady=5)
+    tk.Button(root, text="5) สรุปหลายรายงาน", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=multi_report_ui, state=local_only).pack(pady=5)
+    tk.Button(root, text="6) นำเข้ารายการเดินบัญชี", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=import_statement_ui, state=local_only).pack(pady=5)
+    tk.Button(root, text="7) แดชบอร์ดงบประมาณ", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=dashboard_ui, state=local_only).pack(pady=5)
+    tk.Button(root, text="8) การวินิจฉัยประสิทธิภาพ", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=diagnostics_ui).pack(pady=5)
+    tk.Button(root, text="9) ออกจากโปรแกรม", font=("TH Sarabun New", 14, "bold"), width=35, height=2, command=root.quit).pack(pady=20)
+
+
+# process ลูกของ ProcessPoolExecutor import ไฟล์นี้ซ้ำ จึงต้องสร้างหน้าต่างเฉพาะตอนรันตรง ๆ
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if "--server" in sys.argv[1:-1]:
+        use_server(sys.argv[sys.argv.index("--server") + 1])
+    elif os.environ.get("LEDGER_SERVER"):
+        use_server(os.environ["LEDGER_SERVER"])
+    root = tk.Tk()
+    root.title("📊 ระบบรายรับรายจ่าย")
+    root.geometry("400x900" if server_url else "400x860")
+    io_executor = IOExecutor(root)
+    main_menu()
+    root.mainloop()
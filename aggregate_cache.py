@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import report_core
+from money import to_baht, to_satang
+
+# แคชยอดรวมต่อรายงาน ใช้ (path, mtime_ns, size) เป็นตัวตรวจว่าไฟล์เปลี่ยนหรือยัง
+# เก็บในหน่วยความจำแบบ LRU และบันทึกลงไฟล์ข้าง ๆ รายงาน (.aggregates.json) ให้ใช้ข้ามการเปิดโปรแกรม
+#
+# ยอดรวมหนึ่งรายงาน:
+#   {"rows": จำนวนแถว,
+#    "category": {ประเภท: {"หลัก > ย่อย": ยอด}},
+#    "main": {ประเภท: {"หลัก": ยอด}}}
+
+SIDECAR_NAME = ".aggregates.json"
+MAX_ENTRIES = 4096
+
+# ยอดใน totals เป็นบาทที่ปัดเป็นสตางค์แล้ว รวมต่อเป็นสตางค์เพื่อไม่ให้คลาด
+def build_aggregates(totals, count):
+    main = {t: {} for t in report_core.TYPES}
+    for kind, categories in totals.items():
+        for category, amount in categories.items():
+            name = category.split(">")[0].strip()
+            main[kind][name] = main[kind].get(name, 0) + to_satang(amount)
+    main = {kind: {name: to_baht(v) for name, v in groups.items()} for kind, groups in main.items()}
+    return {"rows": count, "category": totals, "main": main}
+
+# ยอดรวมหลังเพิ่มแถว rows (แถวจากไฟล์) เข้ากับ aggregates เดิม ไม่ต้องอ่านรายงานทั้งไฟล์ใหม่
+def add_rows(aggregates, rows):
+    income, expense = report_core.TYPES
+    totals = {kind: {category: to_satang(v) for category, v in groups.items()}
+              for kind, groups in aggregates["category"].items()}
+    count = aggregates["rows"]
+    for row in rows:
+        groups = totals[income if row[0] == income else expense]
+        groups[row[1]] = groups.get(row[1], 0) + to_satang(row[3])
+        count += 1
+    return build_aggregates({kind: {category: to_baht(v) for category, v in groups.items()}
+                             for kind, groups in totals.items()}, count)
+
+def net_balance(aggregates):
+    income = sum(map(to_satang, aggregates["main"]["รายรับ"].values()))
+    expense = sum(map(to_satang, aggregates["main"]["รายจ่าย"].values()))
+    return to_baht(income - expense)
+
+class AggregateCache:
+    def __init__(self, sidecar_path, max_entries=MAX_ENTRIES):
+        self.sidecar_path = sidecar_path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.sidecar_path, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        for path, (mtime_ns, size, aggregates) in stored.items():
+            self.entries[path] = (mtime_ns, size, aggregates)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            stored = {path: list(entry) for path, entry in self.entries.items()}
+            self._dirty = False
+        # ชื่อไฟล์ชั่วคราวไม่ซ้ำกันต่อ process/thread: save พร้อมกันหลายที่ไม่เขียนทับไฟล์ของกันและกัน
+        tmp_path = f"{self.sidecar_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_path, self.sidecar_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # ไล่อ่านทุกรายงานในโฟลเดอร์ที่มีรายงานมากกว่าขนาด LRU ทุกครั้งจะไม่มีรายการไหนอยู่รอดถึงรอบถัดไป
+    # ผู้ที่อ่านทั้งโฟลเดอร์ (เช่น dashboard) ขยายให้พอกับจำนวนรายงานก่อน
+    def fit(self, n):
+        with self._lock:
+            self.max_entries = max(self.max_entries, n)
+
+    # ยอดรวมของไฟล์ CSV (คำนวณใหม่เฉพาะเมื่อ mtime/ขนาดไฟล์เปลี่ยน) st: ผล stat ที่มีอยู่แล้ว (เช่นจาก scandir)
+    def get(self, csv_path, st=None):
+        key = os.path.abspath(csv_path)
+        st = st or os.stat(csv_path)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self.entries.move_to_end(key)
+                return entry[2]
+
+        aggregates = build_aggregates(*report_core.summarize(csv_path))
+        with self._lock:
+            self.entries[key] = (st.st_mtime_ns, st.st_size, aggregates)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._dirty = True
+        return aggregates
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(report_dir=None):
+    report_dir = report_dir or report_core.REPORT_DIR
+    with _caches_lock:
+        cache = _caches.get(report_dir)
+        if cache is None:
+            cache = _caches[report_dir] = AggregateCache(os.path.join(report_dir, SIDECAR_NAME))
+        return cache
+
+# ยอดรวมของรายงานในที่เก็บปัจจุบัน (SQLite คำนวณด้วย GROUP BY ที่มี index อยู่แล้ว ไม่ต้องแคช)
+def report_aggregates(report_name):
+    if report_core.STORAGE == "sqlite":
+        return build_aggregates(*report_core._db().summarize(report_name))
+    return get_cache().get(report_core.report_path(report_name))
@@ -0,0 +1,136 @@
+import csv
+import os
+import numpy as np
+import report_core
+from money import SCALE, to_satang
+
+# วิเคราะห์ข้ามหลายรายงานด้วย NumPy
+# ทุกแถวของทุกรายงานอยู่ในอาร์เรย์ชุดเดียว:
+#   report  : ลำดับรายงาน (int32)
+#   type    : 0 = รายรับ, 1 = รายจ่าย (uint8)
+#   category: รหัสหมวดหมู่เต็ม "หลัก > ย่อย" (int32) -> main_of[category] = รหัสหมวดหลัก
+#   amount  : int64 หน่วยสตางค์
+# การรวมยอดทั้งหมดใช้ np.bincount บนดัชนีรวม (report, type, หมวดหมู่) ไม่มี loop ต่อแถวใน Python
+# bincount รวมเป็น float64 ของจำนวนเต็มสตางค์ (ตรงทุกหลักจนถึง 2**53) แล้วค่อยหาร 100 ตอนคืนค่าเป็นบาท
+
+LEVELS = ("main", "category")
+
+# คอลัมน์ของรายงานหนึ่งฉบับ: (types, รหัสหมวดหมู่ภายในรายงาน, amounts, รายชื่อหมวดหมู่)
+def _report_columns(report_name):
+    if report_core.STORAGE != "sqlite":
+        from columnar import open_report
+        with open_report(report_core.report_path(report_name)) as report:
+            return (np.frombuffer(report.types, dtype=np.uint8).copy(),
+                    np.frombuffer(report.cats, dtype=np.uint32).astype(np.int64),
+                    np.frombuffer(report.amounts, dtype=np.int64).copy(),
+                    list(report.categories))
+
+    codes = {}
+    types, cats, amounts = [], [], []
+    for kind, category, _, amount, *_ in report_core.iter_report(report_name):
+        types.append(0 if kind == "รายรับ" else 1)
+        cats.append(codes.setdefault(category, len(codes)))
+        amounts.append(to_satang(amount))
+    return (np.array(types, dtype=np.uint8), np.array(cats, dtype=np.int64),
+            np.array(amounts, dtype=np.int64), list(codes))
+
+class MultiReport:
+    def __init__(self, names):
+        self.names = list(names)
+        self.categories = []
+        self.mains = []
+        category_ids = {}
+        main_ids = {}
+        main_of = []
+        parts = {"report": [], "type": [], "category": [], "amount": []}
+
+        for r, name in enumerate(self.names):
+            types, cats, amounts, local_names = _report_columns(name)
+            # รหัสหมวดหมู่ภายในรายงาน -> รหัสรวมทุกรายงาน (แปลงทั้งคอลัมน์ทีเดียว)
+            mapping = np.empty(len(local_names), dtype=np.int32)
+            for i, category in enumerate(local_names):
+                cid = category_ids.get(category)
+                if cid is None:
+                    cid = category_ids[category] = len(self.categories)
+                    self.categories.append(category)
+                    main = category.split(">")[0].strip()
+                    mid = main_ids.get(main)
+                    if mid is None:
+                        mid = main_ids[main] = len(self.mains)
+                        self.mains.append(main)
+                    main_of.append(mid)
+                mapping[i] = cid
+            parts["report"].append(np.full(len(types), r, dtype=np.int32))
+            parts["type"].append(types)
+            parts["category"].append(mapping[cats] if len(cats) else np.empty(0, dtype=np.int32))
+            parts["amount"].append(amounts)
+
+        def join(key, dtype):
+            return np.concatenate(parts[key]).astype(dtype, copy=False) if parts[key] else np.empty(0, dtype)
+
+        self.report = join("report", np.int32)
+        self.type = join("type", np.uint8)
+        self.category = join("category", np.int32)
+        self.amount = join("amount", np.int64)
+        self.main_of = np.array(main_of, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.amount)
+
+    def groups(self, level="main"):
+        return self.mains if level == "main" else self.categories
+
+    def _group_codes(self, level):
+        if level == "main":
+            return self.main_of[self.category] if len(self.category) else self.category
+        return self.category
+
+    def _satang_totals(self, level):
+        g = len(self.groups(level))
+        r = len(self.names)
+        index = (self.report.astype(np.int64) * 2 + self.type) * g + self._group_codes(level)
+        sums = np.bincount(index, weights=self.amount, minlength=r * 2 * g)
+        return sums.reshape(r, 2, g)
+
+    # ยอดรวม (บาท) รูป (จำนวนรายงาน, 2 ประเภท, จำนวนกลุ่ม)
+    def totals(self, level="main"):
+        return self._satang_totals(level) / SCALE
+
+    # ผลต่างเทียบรายงานก่อนหน้า (ตามลำดับ names) รายงานแรกเทียบกับ 0
+    def deltas(self, level="main"):
+        totals = self._satang_totals(level)
+        return np.diff(totals, axis=0, prepend=np.zeros((1,) + totals.shape[1:])) / SCALE
+
+    # n กลุ่มที่ยอดรวมทุกรายงานสูงสุด ของประเภทที่เลือก [(ชื่อกลุ่ม, ยอด)]
+    def top_n(self, n=5, kind="รายจ่าย", level="main"):
+        t = report_core.TYPES.index(kind)
+        sums = self.totals(level)[:, t, :].sum(axis=0)
+        order = np.argsort(sums)[::-1][:n]
+        groups = self.groups(level)
+        return [(groups[i], float(sums[i])) for i in order if sums[i]]
+
+    # แถวตารางสรุป: [รายงาน, ประเภท, กลุ่ม, ยอด, เปลี่ยนแปลง] เฉพาะกลุ่มที่มีรายการ
+    def summary_rows(self, level="main"):
+        totals = self.totals(level)
+        deltas = self.deltas(level)
+        g = len(self.groups(level))
+        r = len(self.names)
+        index = (self.report.astype(np.int64) * 2 + self.type) * g + self._group_codes(level)
+        present = np.bincount(index, minlength=r * 2 * g).reshape(r, 2, g) > 0
+        previous = np.zeros_like(present)
+        previous[1:] = present[:-1]
+        groups = self.groups(level)
+        rows = []
+        for ri, ti, gi in zip(*np.nonzero(present | previous)):
+            rows.append([self.names[ri], report_core.TYPES[ti], groups[gi],
+                         float(totals[ri, ti, gi]), float(deltas[ri, ti, gi])])
+        return rows
+
+    def export_csv(self, path, level="main"):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(["รายงาน", "ประเภท", "หมวดหมู่", "ยอดรวม", "เปลี่ยนแปลงจากรายงานก่อน"])
+            writer.writerows(self.summary_rows(level))
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,158 @@
+import json
+import os
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, unquote, urlencode
+from urllib.request import Request, urlopen
+import report_core
+from dates import MAX_DAY, to_text
+from money import to_satang
+from report_catalog import ReportInfo
+
+# client ของ api_server (urllib ล้วน) มีฟังก์ชันชื่อ/ผลลัพธ์เดียวกับที่ UI.py เรียกจาก report_core,
+# report_catalog และ pdf_report UI จึงสลับไปใช้เซิร์ฟเวอร์ได้โดยไม่ต้องแก้หน้าจอ (ดู UI.use_server)
+# PDF ที่ได้จากเซิร์ฟเวอร์บันทึกลง REPORT_DIR ของเครื่องนี้ แล้วคืน path แบบเดียวกับ pdf_report.generate_pdf
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ApiClient:
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _url(self, *parts, **query):
+        url = self.base_url + "/" + "/".join(quote(str(p), safe="") for p in parts)
+        query = {k: v for k, v in query.items() if v is not None}
+        return url + "?" + urlencode(query) if query else url
+
+    def _open(self, method, url, body=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else None
+        request = Request(url, data=data, method=method)
+        if data is not None:
+            request.add_header("Content-Type", "application/json; charset=utf-8")
+        try:
+            return urlopen(request, timeout=self.timeout)
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read())["error"]
+            except (ValueError, KeyError, TypeError):
+                message = str(e)
+            raise ApiError(e.code, message) from None
+        except URLError as e:
+            raise ConnectionError(f"ติดต่อเซิร์ฟเวอร์ {self.base_url} ไม่ได้: {e.reason}") from None
+
+    def _json(self, method, url, body=None):
+        with self._open(method, url, body) as response:
+            return json.loads(response.read())
+
+    @staticmethod
+    def _period(period):
+        if period is None:
+            return {}
+        start, end = period
+        return {"from": to_text(start) if start > 1 else None, "to": to_text(end) if end < MAX_DAY else None}
+
+    # ===== แทน report_catalog =====
+    def list_catalog(self, task=None):
+        reports = self._json("GET", self._url("reports"))["reports"]
+        # จำนวนเงินจากเซิร์ฟเวอร์เป็นข้อความบาท ReportInfo เก็บเป็นสตางค์
+        for info in reports:
+            for key in ("income", "expense"):
+                if info[key] is not None:
+                    info[key] = to_satang(info[key])
+        return [ReportInfo(**{k: v for k, v in info.items() if k in ReportInfo.__slots__}) for info in reports]
+
+    # เซิร์ฟเวอร์แคชรายชื่อไว้แล้ว ไม่ต้องแยกแบบที่บันทึกไว้/ล่าสุด
+    cached_catalog = list_catalog
+
+    # ===== แทน report_core =====
+    def current_version(self, report_name):
+        try:
+            return self._json("GET", self._url("reports", report_name, "version"))["version"]
+        except ApiError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def report_exists(self, report_name):
+        return self.current_version(report_name) is not None
+
+    # ทุกแถวแบบ stream (ไม่ต้องรอทั้งรายงานก่อนเริ่มสร้าง Ledger)
+    def iter_report(self, report_name, period=None):
+        with self._open("GET", self._url("reports", report_name, "stream", **self._period(period))) as response:
+            for line in response:
+                yield json.loads(line)
+
+    def page(self, report_name, offset=0, limit=100, period=None):
+        return self._json("GET", self._url("reports", report_name, offset=offset, limit=limit, **self._period(period)))
+
+    # เขียนทับทั้งรายงาน (หรือสร้างใหม่) แบบ report_core.store_report
+    def store_report(self, report_name, data):
+        self._json("PUT", self._url("reports", report_name, replace=1), {"rows": [list(row) for row in data]})
+        return report_name
+
+    def create_report(self, report_name, data):
+        try:
+            self._json("PUT", self._url("reports", report_name), {"rows": [list(row) for row in data]})
+        except ApiError as e:
+            if e.status == 409:
+                raise FileExistsError(report_name) from None
+            raise
+        return report_name
+
+    def append_report(self, report_name, data):
+        self._json("POST", self._url("reports", report_name, "rows"), {"rows": [list(row) for row in data]})
+        return report_name
+
+    def save_changes(self, report_name, data, mode, base):
+        if mode == "append":
+            return self.append_report(report_name, data[base:])
+        if mode == "rewrite":
+            return self.store_report(report_name, data)
+        return report_name
+
+    # แบบ report_core.save_if: เซิร์ฟเวอร์ตรวจรุ่นก่อนเขียน (?version=) รุ่นไม่ตรงได้ 409 -> VersionConflict
+    def save_if(self, report_name, data, mode, base, version):
+        expected = json.dumps(version)
+        try:
+            if mode == "append":
+                result = self._json("POST", self._url("reports", report_name, "rows", version=expected),
+                                    {"rows": [list(row) for row in data[base:]]})
+            elif mode == "rewrite":
+                result = self._json("PUT", self._url("reports", report_name, replace=1, version=expected),
+                                    {"rows": [list(row) for row in data]})
+            elif self.current_version(report_name) != version:
+                raise report_core.VersionConflict(report_name)
+            else:
+                return report_name, version
+        except ApiError as e:
+            if e.status == 409:
+                raise report_core.VersionConflict(report_name) from None
+            raise
+        return report_name, result["version"]
+
+    def update_row(self, report_name, row_id, row, old=None):
+        body = {"row": list(row)}
+        if old is not None:
+            body["old"] = list(old)
+        return self._json("PUT", self._url("reports", report_name, "rows", row_id), body)
+
+    def delete_rows(self, report_name, ids):
+        return self._json("DELETE", self._url("reports", report_name, "rows"), {"ids": list(ids)})
+
+    def summarize(self, report_name, period=None):
+        return self._json("GET", self._url("reports", report_name, "summary", **self._period(period)))
+
+    # ===== แทน pdf_report.generate_pdf =====
+    def generate_pdf(self, report_name, period=None):
+        with self._open("GET", self._url("reports", report_name, "pdf", **self._period(period))) as response:
+            disposition = response.headers.get("Content-Disposition", "")
+            filename = unquote(disposition.partition("filename*=UTF-8''")[2]) or report_name + ".pdf"
+            os.makedirs(report_core.REPORT_DIR, exist_ok=True)
+            pdf_path = os.path.join(report_core.REPORT_DIR, os.path.basename(filename))
+            with open(pdf_path, 'wb') as f:
+                while chunk := response.read(1 << 16):
+                    f.write(chunk)
+        return pdf_path
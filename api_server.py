@@ -0,0 +1,616 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+import dates
+import report_core
+from diagnostics import count, span
+from ledger import Entry, Ledger
+from aggregate_cache import add_rows, net_balance
+from money import normalize, to_satang, to_text
+
+# เซิร์ฟเวอร์ HTTP/JSON ในเครื่อง ให้หลายคนใช้รายงานชุดเดียวกันพร้อมกัน (UI.py เป็น client ได้ ดู api_client.py)
+# asyncio ล้วน ไม่ต้องติดตั้งอะไรเพิ่ม: HTTP/1.1 keep-alive ร่างคำขอ/คำตอบเป็น JSON UTF-8
+#
+#   GET    /reports                     รายชื่อรายงาน ?filter= &sort= &desc=1 &offset= &limit=
+#   GET    /reports/<ชื่อ>              แถวทีละหน้า ?offset=0&limit=100 (&from= &to= เฉพาะช่วงวันที่)
+#   GET    /reports/<ชื่อ>/version      รุ่นของรายงาน (report_core.report_version) โดยไม่อ่านแถว
+#   GET    /reports/<ชื่อ>/stream       ทุกแถว (หรือเฉพาะช่วงวันที่) เป็น JSON lines แบบ chunked
+#   PUT    /reports/<ชื่อ>              สร้างรายงาน {"rows": [...]} (?replace=1 เขียนทับรายงานเดิม)
+#   POST   /reports/<ชื่อ>/rows         ต่อท้าย {"rows": [...]}
+#   PUT/POST ข้างบนใส่ ?version=<รุ่นแบบ JSON> ได้: เขียนเฉพาะเมื่อรายงานยังเป็นรุ่นนั้น (null = ยังไม่มี) ไม่ตรง -> 409
+#   PUT    /reports/<ชื่อ>/rows/<i>     แก้แถว i {"row": [...], "old": [...]} (ใส่ old แล้วต้องตรงกับแถวปัจจุบัน)
+#   DELETE /reports/<ชื่อ>/rows/<i>     ลบแถว i (DELETE /reports/<ชื่อ>/rows {"ids": [...]} ลบหลายแถว)
+#   GET    /reports/<ชื่อ>/summary      ยอดรวมตามหมวด &from= &to= เฉพาะช่วงวันที่
+#   GET    /reports/<ชื่อ>/pdf          ไฟล์ PDF &from= &to= เฉพาะช่วงวันที่
+# แถว = [ประเภท, หมวดหมู่, รายละเอียด, "จำนวนเงิน", "YYYY-MM-DD"] แบบเดียวกับ CSV (ไม่ใส่วันที่ก็ได้)
+# จำนวนเงินทุกที่ (แถว, income/expense/balance ของ /reports, ยอดรวมของ summary) เป็นข้อความบาท "-1234.50"
+# (money.to_text) ไม่ใช่ float และไม่ใช่สตางค์ ยอดที่อ่านไม่ได้เป็น null
+# i = ลำดับแถวในรายงาน (เริ่มที่ 0) ผิดพลาดได้ {"error": ข้อความ} พร้อม status 400/404/409/413/503
+#
+# งานอ่าน/เขียนรายงานรันใน thread pool ให้ event loop รับคำขออื่นต่อได้ระหว่างรอดิสก์
+# การสร้าง PDF ใช้ CPU จึงรันใน process pool ของ batch_export (render context สร้างครั้งเดียวต่อ process)
+# แคช ตรวจกับ report_core.report_version ทุกคำขอ (รายงานที่ถูกเขียนจากที่อื่นเห็นทันที):
+#   Ledger ของ LEDGER_CACHE รายงานที่ใช้ล่าสุด (ต่อท้าย = ต่อ Ledger เดิม ไม่ต้องอ่านใหม่ทั้งไฟล์)
+#   ยอดรวมจาก aggregate_cache (ต่อท้าย = บวกยอดแถวใหม่เข้ากับยอดเดิม), PDF ล่าสุดต่อ (รายงาน, ช่วงวันที่), รายชื่อรายงานไม่เกิน CATALOG_TTL วินาที
+# การเขียนรายงานเดียวกันเรียงกันทีละคำขอ (lock ต่อรายงาน) แก้/ลบแถวเขียนรายงานใหม่ทั้งไฟล์แบบเดียวกับหน้าแก้ไข
+# และเขียนภายใต้ report_core.report_lock พร้อมตรวจรุ่น (โปรแกรมอื่นที่เปิดโฟลเดอร์เดียวกันเขียนแทรกไม่ได้)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LEDGER_CACHE = 8
+CATALOG_TTL = 1.0
+PAGE_LIMIT = 1000
+STREAM_BATCH = 2000
+MAX_HEADER = 64 << 10
+MAX_BODY = 256 << 20
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 409: "Conflict",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Response:
+    __slots__ = ("status", "body", "content_type", "headers")
+
+    # body: dict/list (JSON), bytes หรือ async iterator ของ bytes (ส่งแบบ chunked)
+    def __init__(self, status, body, content_type="application/json; charset=utf-8", headers=()):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers
+
+def _error(status, message):
+    return Response(status, {"error": message})
+
+# ===== ตรวจค่าจากคำขอ =====
+def _report_name(text):
+    name = unquote(text)
+    if not name or name.startswith(".") or any(c in name for c in "/\\\0"):
+        raise ApiError(400, f"ชื่อรายงานไม่ถูกต้อง: {name!r}")
+    return name
+
+def _clean_row(row):
+    if not isinstance(row, list) or len(row) not in (4, 5):
+        raise ApiError(400, f"แถวต้องมี 4 หรือ 5 ช่อง (ประเภท หมวดหมู่ รายละเอียด จำนวนเงิน [วันที่]): {row!r}")
+    kind, category, detail, amount = (str(value) for value in row[:4])
+    if kind not in report_core.TYPES:
+        raise ApiError(400, f"ประเภทต้องเป็น {' หรือ '.join(report_core.TYPES)}: {kind}")
+    try:
+        amount = normalize(amount)
+    except ValueError:
+        raise ApiError(400, f"จำนวนเงินต้องเป็นตัวเลข: {amount}") from None
+    try:
+        date = dates.normalize(row[4]) if len(row) > 4 else ""
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+    return [kind, category, detail, amount, date]
+
+def _rows(body):
+    rows = body.get("rows")
+    if not isinstance(rows, list):
+        raise ApiError(400, 'ต้องมี "rows" เป็นรายการของแถว')
+    return [_clean_row(row) for row in rows]
+
+def _int(query, key, default, high=None):
+    try:
+        value = int(query.get(key, default))
+    except ValueError:
+        raise ApiError(400, f"{key} ต้องเป็นตัวเลข") from None
+    if value < 0:
+        raise ApiError(400, f"{key} ต้องไม่ติดลบ")
+    return value if high is None else min(value, high)
+
+def _period(query):
+    start, end = query.get("from"), query.get("to")
+    if not start and not end:
+        return None
+    try:
+        return dates.period(start or None, end or None)
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+
+# ===== งานที่รันใน thread pool / process pool =====
+def _load(report_name):
+    return Ledger(report_core.iter_report(report_name))
+
+def _catalog():
+    from report_catalog import list_catalog
+    return list_catalog()
+
+def _money(satang):
+    return None if satang is None else to_text(satang)
+
+def _info(info):
+    return {**dict(zip(info.__slots__, info.dump())),
+            "income": _money(info.income), "expense": _money(info.expense), "balance": _money(info.balance)}
+
+# ยอดรวมจาก aggregate_cache (บาทแบบ float) -> ข้อความบาท
+def _totals(aggregates):
+    return {"rows": aggregates["rows"],
+            **{key: {kind: {name: to_text(to_satang(v)) for name, v in groups.items()}
+                     for kind, groups in aggregates[key].items()}
+               for key in ("category", "main")},
+            "balance": to_text(to_satang(net_balance(aggregates)))}
+
+def _summary(report_name):
+    from aggregate_cache import get_cache, report_aggregates
+    aggregates = report_aggregates(report_name)
+    if report_core.STORAGE != "sqlite":
+        get_cache().save()
+    return aggregates
+
+def _period_summary(report_name, period):
+    from aggregate_cache import add_rows, build_aggregates
+    from date_partitions import range_rows
+    return add_rows(build_aggregates({kind: {} for kind in report_core.TYPES}, 0), range_rows(report_name, *period))
+
+ANY_VERSION = object()
+
+def _expected(query):
+    if "version" not in query:
+        return ANY_VERSION
+    try:
+        return json.loads(query["version"])
+    except ValueError:
+        raise ApiError(400, "version ต้องเป็น JSON") from None
+
+# เขียนใต้ report_lock คืน (รุ่นก่อนเขียน, รุ่นหลังเขียน) รุ่นก่อนเขียนไม่ตรง expected -> VersionConflict
+# ต่อท้ายรายงานที่ไม่มีอยู่ -> FileNotFoundError
+def _write(report_name, rows, mode, expected=ANY_VERSION):
+    with report_core.report_lock(report_name):
+        before = report_core.current_version(report_name)
+        if expected is not ANY_VERSION and before != expected:
+            raise report_core.VersionConflict(report_name)
+        if mode == "append":
+            if before is None:
+                raise FileNotFoundError(f"ไม่พบรายงาน {report_name}")
+            report_core.append_report(report_name, rows)
+        else:
+            report_core.store_report(report_name, rows)
+        return before, report_core.current_version(report_name)
+
+def _open_rows(report_name, period):
+    if period is None:
+        return report_core.iter_report(report_name)
+    from date_partitions import range_rows
+    return range_rows(report_name, *period)
+
+# แถวจาก SQLite มีจำนวนเงินเป็นตัวเลข ส่งเป็นข้อความแบบเดียวกับแถวจาก CSV
+def _take(rows, n):
+    batch = list(islice(rows, n))
+    for row in batch:
+        if type(row[3]) is not str:
+            row[3] = to_text(to_satang(row[3]))
+    return batch
+
+def _close_rows(rows):
+    close = getattr(rows, "close", None)
+    if close is not None:
+        close()
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+# รันใน process ลูก (ตั้งค่าที่เก็บให้ตรงกับเซิร์ฟเวอร์ เพราะ process ที่ spawn ใหม่ไม่ได้ค่าที่ main ตั้งไว้)
+def _render_pdf(report_dir, storage, report_name, period):
+    from pdf_report import generate_pdf
+    report_core.REPORT_DIR, report_core.STORAGE = report_dir, storage
+    return generate_pdf(report_name, period)
+
+class ApiServer:
+    def __init__(self, workers=8, pdf_workers=2):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.pdf_workers = pdf_workers
+        self.pdf_pool = None
+        # ชื่อ -> (รุ่น, Ledger, {ช่วงวันที่: ลำดับแถวในช่วง})
+        self.ledgers = OrderedDict()
+        # ชื่อ -> (รุ่น, ยอดรวมแบบ aggregate_cache)
+        self.summaries = {}
+        # (ชื่อ, ช่วงวันที่) -> (รุ่น, path ของ PDF)
+        self.pdfs = {}
+        self.catalog = (0.0, None)
+        self.catalog_task = None
+        self.locks = {}
+        self.requests = 0
+        self.server = None
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    def lock(self, key):
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        return lock
+
+    async def version(self, report_name):
+        try:
+            return await self.run(report_core.report_version, report_name)
+        except (FileNotFoundError, KeyError):
+            raise ApiError(404, f"ไม่พบรายงาน {report_name}") from None
+
+    def _cache(self, report_name, version, data):
+        entry = self.ledgers[report_name] = (version, data, {})
+        self.ledgers.move_to_end(report_name)
+        while len(self.ledgers) > LEDGER_CACHE:
+            self.ledgers.popitem(last=False)
+        return entry
+
+    # Ledger ของรายงาน (อ่านใหม่เมื่อรุ่นเปลี่ยน) ผู้เรียกต้องถือ lock ของรายงานอยู่
+    async def _fresh(self, report_name):
+        version = await self.version(report_name)
+        entry = self.ledgers.get(report_name)
+        if entry is None or entry[0] != version:
+            entry = self._cache(report_name, version, await self.run(_load, report_name))
+        return entry
+
+    async def ledger(self, report_name):
+        version = await self.version(report_name)
+        entry = self.ledgers.get(report_name)
+        if entry is not None and entry[0] == version:
+            self.ledgers.move_to_end(report_name)
+            return entry
+        # หลายคำขอเปิดรายงานเดียวกันพร้อมกัน: อ่านไฟล์ครั้งเดียว
+        async with self.lock(report_name):
+            return await self._fresh(report_name)
+
+    # รายงานใหม่: รายชื่อรายงานครั้งถัดไปต้องรอ refresh (การแก้รายงานเดิมเห็นช้าได้ไม่เกิน CATALOG_TTL)
+    def _created(self):
+        self.catalog = (0.0, None)
+        # refresh ที่เริ่มก่อนสร้างรายงานอาจไม่เห็นรายงานใหม่ ให้เริ่มรอบใหม่
+        self.catalog_task = None
+
+    def _catalog_refresh(self):
+        if self.catalog_task is None:
+            self.catalog_task = asyncio.ensure_future(self._refresh_catalog())
+        return self.catalog_task
+
+    async def _refresh_catalog(self):
+        task = asyncio.current_task()
+        try:
+            entries = await self.run(_catalog)
+            if self.catalog_task is task:
+                self.catalog = (time.monotonic(), entries)
+        finally:
+            if self.catalog_task is task:
+                self.catalog_task = None
+
+    # ===== อ่าน =====
+    async def list_reports(self, query):
+        from report_catalog import SORT_KEYS, query as catalog_query
+        sort = query.get("sort", "name")
+        if sort not in SORT_KEYS:
+            raise ApiError(400, f"sort ต้องเป็น {', '.join(SORT_KEYS)}")
+        loaded, entries = self.catalog
+        if entries is None or time.monotonic() - loaded > CATALOG_TTL:
+            # refresh ครั้งเดียวพร้อมกันทุกคำขอ ระหว่างนั้นตอบจากรายชื่อเดิม (ยังไม่มีรายชื่อเลยค่อยรอ)
+            self._catalog_refresh()
+            while entries is None:
+                await asyncio.shield(self._catalog_refresh())
+                entries = self.catalog[1]
+        limit = _int(query, "limit", 0) or None
+        total, page = catalog_query(entries, query.get("filter", ""), sort, query.get("desc") == "1",
+                                    _int(query, "offset", 0), limit)
+        return Response(200, {"total": total, "reports": [_info(info) for info in page]})
+
+    async def read_page(self, report_name, query):
+        version, data, periods = await self.ledger(report_name)
+        offset = _int(query, "offset", 0)
+        limit = _int(query, "limit", 100, PAGE_LIMIT)
+        period = _period(query)
+        if period is None:
+            total = len(data)
+            ids = range(offset, min(offset + limit, total))
+        else:
+            keys = periods.get(period)
+            if keys is None:
+                keys = periods[period] = await self.run(data.in_period, range(len(data)), *period)
+            total = len(keys)
+            ids = keys[offset:offset + limit]
+        return Response(200, {"name": report_name, "version": version, "total": total, "offset": offset,
+                              "ids": list(ids), "rows": [data.row(i) for i in ids]})
+
+    async def report_version(self, report_name):
+        return Response(200, {"name": report_name, "version": await self.version(report_name)})
+
+    async def stream(self, report_name, query):
+        period = _period(query)
+        await self.version(report_name)
+        # SQLite ใช้ connection ต่อ thread: ทั้งการ query และการดึงทีละชุดต้องอยู่ใน thread เดียวกัน
+        own = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-stream")
+        loop = asyncio.get_running_loop()
+
+        async def chunks():
+            rows = None
+            try:
+                rows = await loop.run_in_executor(own, _open_rows, report_name, period)
+                while True:
+                    batch = await loop.run_in_executor(own, _take, rows, STREAM_BATCH)
+                    if not batch:
+                        break
+                    count("api_rows_streamed", len(batch))
+                    yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch).encode('utf-8')
+            finally:
+                if rows is not None:
+                    await loop.run_in_executor(own, _close_rows, rows)
+                own.shutdown(wait=False)
+
+        return Response(200, chunks(), "application/x-ndjson; charset=utf-8")
+
+    async def summary(self, report_name, query):
+        period = _period(query)
+        version = await self.version(report_name)
+        if period is not None:
+            aggregates = await self.run(_period_summary, report_name, period)
+        else:
+            cached = self.summaries.get(report_name)
+            if cached is None or cached[0] != version:
+                # lock เดียวกับการเขียน: ไม่คำนวณทั้งไฟล์ซ้ำระหว่างที่การต่อท้ายกำลังบวกยอดเพิ่มให้อยู่
+                async with self.lock(report_name):
+                    cached = self.summaries.get(report_name)
+                    version = await self.version(report_name)
+                    if cached is None or cached[0] != version:
+                        cached = self.summaries[report_name] = (version, await self.run(_summary, report_name))
+            version, aggregates = cached
+        return Response(200, {"name": report_name, "version": version, **_totals(aggregates)})
+
+    async def pdf(self, report_name, query):
+        period = _period(query)
+        key = (report_name, period)
+        async with self.lock(("pdf",) + key):
+            version = await self.version(report_name)
+            cached = self.pdfs.get(key)
+            if cached is None or cached[0] != version or not os.path.exists(cached[1]):
+                if self.pdf_pool is None:
+                    from batch_export import make_executor
+                    self.pdf_pool = make_executor(self.pdf_workers)
+                path = await asyncio.get_running_loop().run_in_executor(
+                    self.pdf_pool, _render_pdf, report_core.REPORT_DIR, report_core.STORAGE, report_name, period)
+                cached = self.pdfs[key] = (version, path)
+            data = await self.run(_read_file, cached[1])
+        filename = quote(os.path.basename(cached[1]))
+        return Response(200, data, "application/pdf",
+                        [("Content-Disposition", f"attachment; filename*=UTF-8''{filename}")])
+
+    # ===== เขียน =====
+    async def store(self, report_name, query, body):
+        rows = _rows(body)
+        expected = _expected(query)
+        if expected is ANY_VERSION and query.get("replace") != "1":
+            expected = None
+        async with self.lock(report_name):
+            try:
+                before, version = await self.run(_write, report_name, rows, "rewrite", expected)
+            except report_core.VersionConflict:
+                if expected is None:
+                    raise ApiError(409, f"มีรายงานชื่อ {report_name} อยู่แล้ว") from None
+                raise
+            self._cache(report_name, version, await self.run(Ledger, rows))
+        if before is None:
+            self._created()
+        return Response(201 if before is None else 200, {"name": report_name, "version": version, "rows": len(rows)})
+
+    async def append(self, report_name, query, body):
+        rows = _rows(body)
+        expected = _expected(query)
+        async with self.lock(report_name):
+            entry = self.ledgers.get(report_name)
+            summary = self.summaries.get(report_name)
+            version, new_version = await self.run(_write, report_name, rows, "append", expected)
+            if entry is not None and entry[0] == version:
+                # แถวใหม่ต่อท้าย Ledger ที่แคชไว้ใน thread ของ event loop (ไม่มีใครอ่านพร้อมกันระหว่างนี้)
+                entry[1].extend(rows)
+                self._cache(report_name, new_version, entry[1])
+            else:
+                self.ledgers.pop(report_name, None)
+            if summary is not None and summary[0] == version:
+                self.summaries[report_name] = (new_version, add_rows(summary[1], rows))
+        return Response(200, {"name": report_name, "version": new_version, "added": len(rows)})
+
+    async def update(self, report_name, row_id, body):
+        row = _clean_row(body.get("row"))
+        old = body.get("old")
+        async with self.lock(report_name):
+            version, data, _ = await self._fresh(report_name)
+            if not 0 <= row_id < len(data):
+                raise ApiError(404, f"ไม่มีแถว {row_id} (รายงานมี {len(data):,} แถว)")
+            if old is not None and _clean_row(old) != data.row(row_id):
+                raise ApiError(409, f"แถว {row_id} ถูกแก้ไขไปแล้ว: {data.row(row_id)}")
+            updated = await self.run(data.copy)
+            updated[row_id] = Entry(*row)
+            _, version = await self.run(_write, report_name, updated, "rewrite", version)
+            self._cache(report_name, version, updated)
+        return Response(200, {"name": report_name, "version": version, "row": updated.row(row_id)})
+
+    async def delete(self, report_name, ids):
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise ApiError(400, 'ต้องมี "ids" เป็นรายการเลขแถว')
+        async with self.lock(report_name):
+            version, data, _ = await self._fresh(report_name)
+            missing = [i for i in ids if not 0 <= i < len(data)]
+            if missing:
+                raise ApiError(404, f"ไม่มีแถว {missing[:10]} (รายงานมี {len(data):,} แถว)")
+            live = bytearray(b"\x01") * len(data)
+            for i in ids:
+                live[i] = 0
+            kept = await self.run(data.compress, live)
+            _, version = await self.run(_write, report_name, kept, "rewrite", version)
+            self._cache(report_name, version, kept)
+        return Response(200, {"name": report_name, "version": version, "deleted": len(data) - len(kept)})
+
+    # ===== HTTP =====
+    def route(self, method, parts, query, body):
+        if parts == ["reports"] and method == "GET":
+            return self.list_reports, (query,)
+        if parts[:1] != ["reports"] or len(parts) < 2:
+            return None
+        name, rest = _report_name(parts[1]), parts[2:]
+        if not rest:
+            if method == "GET":
+                return self.read_page, (name, query)
+            if method == "PUT":
+                return self.store, (name, query, body)
+        elif rest == ["version"] and method == "GET":
+            return self.report_version, (name,)
+        elif rest == ["stream"] and method == "GET":
+            return self.stream, (name, query)
+        elif rest == ["summary"] and method == "GET":
+            return self.summary, (name, query)
+        elif rest == ["pdf"] and method == "GET":
+            return self.pdf, (name, query)
+        elif rest == ["rows"]:
+            if method == "POST":
+                return self.append, (name, query, body)
+            if method == "DELETE":
+                return self.delete, (name, body.get("ids"))
+        elif len(rest) == 2 and rest[0] == "rows" and rest[1].isdigit():
+            if method == "PUT":
+                return self.update, (name, int(rest[1]), body)
+            if method == "DELETE":
+                return self.delete, (name, [int(rest[1])])
+        return None
+
+    async def respond(self, method, target, body):
+        self.requests += 1
+        count("api_requests")
+        try:
+            url = urlsplit(target)
+            try:
+                body = json.loads(body) if body else {}
+            except ValueError:
+                raise ApiError(400, "ร่างคำขอต้องเป็น JSON") from None
+            if not isinstance(body, dict):
+                raise ApiError(400, "ร่างคำขอต้องเป็น JSON object")
+            found = self.route(method, [p for p in url.path.split("/") if p], dict(parse_qsl(url.query)), body)
+            if found is None:
+                raise ApiError(404, f"ไม่มี {method} {url.path}")
+            handler, args = found
+            with span("api_" + handler.__name__):
+                return await handler(*args)
+        except ApiError as e:
+            return _error(e.status, str(e))
+        except FileNotFoundError as e:
+            return _error(404, str(e))
+        except report_core.VersionConflict:
+            return _error(409, "รายงานถูกแก้ไขจากที่อื่นแล้ว อ่านรุ่นล่าสุดแล้วลองใหม่")
+        except TimeoutError as e:
+            # รอ report_lock นานเกิน (มีโปรแกรมอื่นถือล็อกรายงานนี้อยู่)
+            return _error(503, str(e))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            return _error(500, f"{type(e).__name__}: {e}")
+
+    async def send(self, writer, response, keep_alive):
+        body = response.body
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        head = [f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}",
+                f"Content-Type: {response.content_type}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{key}: {value}" for key, value in response.headers]
+        if isinstance(body, bytes):
+            head.append(f"Content-Length: {len(body)}")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+            return
+        head.append("Transfer-Encoding: chunked")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1'))
+        try:
+            async for chunk in body:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                # รอให้ client อ่านทัน ไม่สะสมทั้งรายงานไว้ในหน่วยความจำ
+                await writer.drain()
+        finally:
+            await body.aclose()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, _error(431, "ส่วนหัวคำขอยาวเกินไป"), False)
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+                lines = head.decode('latin-1').split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                    headers = {}
+                    for line in lines[1:]:
+                        if line:
+                            key, value = line.split(":", 1)
+                            headers[key.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self.send(writer, _error(400, "คำขอ HTTP ไม่ถูกต้อง"), False)
+                    break
+                if length > MAX_BODY:
+                    await self.send(writer, _error(413, f"ร่างคำขอใหญ่เกิน {MAX_BODY >> 20} MB"), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                await self.send(writer, await self.respond(method, target, body), keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            # ผิดพลาดกลางการส่งแบบ chunked: ส่ง status ไปแล้ว ทำได้แค่ตัดการเชื่อมต่อ
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER)
+        address = self.server.sockets[0].getsockname()
+        # บรรทัดแรกที่พิมพ์ออก bench.py api อ่านหา URL (ใช้ --port 0 ได้)
+        print(f"เปิดบริการที่ http://{address[0]}:{address[1]} "
+              f"(รายงานใน {os.path.abspath(report_core.REPORT_DIR)}, {report_core.STORAGE})", flush=True)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.pdf_pool is not None:
+            self.pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="เซิร์ฟเวอร์ HTTP/JSON สำหรับใช้รายงานพร้อมกันหลายเครื่อง/หลายคน")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="0.0.0.0 = รับจากเครื่องอื่นในวงแลนด้วย")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 = เลือกพอร์ตว่างให้")
+    parser.add_argument("--dir", default=report_core.REPORT_DIR, help="โฟลเดอร์รายงาน")
+    parser.add_argument("--storage", choices=("csv", "sqlite"), default=report_core.STORAGE)
+    parser.add_argument("--workers", type=int, default=8, help="thread สำหรับอ่าน/เขียนรายงาน")
+    parser.add_argument("--pdf-workers", type=int, default=2, help="process สำหรับสร้าง PDF")
+    args = parser.parse_args(argv)
+
+    report_core.REPORT_DIR, report_core.STORAGE = args.dir, args.storage
+    os.makedirs(args.dir, exist_ok=True)
+    server = ApiServer(args.workers, args.pdf_workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from report_core import REPORT_DIR
+from pdf_report import get_context, render_pdf
+
+# แปลงทุกรายงานใน REPORT_DIR เป็น PDF พร้อมกันหลาย process
+# ข้ามรายงานที่ PDF ใหม่กว่า CSV อยู่แล้ว
+
+def pending_reports(report_dir=REPORT_DIR, force=False):
+    jobs = []
+    for entry in os.scandir(report_dir):
+        if not entry.name.endswith(".csv"):
+            continue
+        pdf_path = os.path.join(report_dir, entry.name[:-4] + ".pdf")
+        csv_stat = entry.stat()
+        if not force and os.path.exists(pdf_path) and os.path.getmtime(pdf_path) >= csv_stat.st_mtime:
+            continue
+        jobs.append((entry.path, pdf_path, csv_stat.st_size))
+    # ไฟล์ใหญ่ก่อน งานจะได้กระจายทุก process จนจบพร้อม ๆ กัน
+    jobs.sort(key=lambda job: job[2], reverse=True)
+    return [(csv_path, pdf_path) for csv_path, pdf_path, _ in jobs]
+
+# ฟอนต์และ render context สร้างครั้งเดียวต่อ process ใช้ซ้ำทุกรายงานที่ worker นั้นได้รับ
+def _init_worker():
+    get_context()
+
+def _export_one(csv_path, pdf_path):
+    render_pdf(csv_path, pdf_path)
+    return pdf_path
+
+# ส่งงานเข้า pool คืน dict future -> (csv_path, pdf_path) ให้ผู้เรียกรอผลเอง (ใช้กับ UI)
+def submit_all(executor, jobs):
+    return {executor.submit(_export_one, csv_path, pdf_path): (csv_path, pdf_path)
+            for csv_path, pdf_path in jobs}
+
+def make_executor(workers=None):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+# แปลงทั้งหมดแบบรอจนเสร็จ progress(done, total, csv_path, error) ถูกเรียกทุกครั้งที่งานหนึ่งจบ
+def export_all(report_dir=REPORT_DIR, workers=None, force=False, progress=None):
+    jobs = pending_reports(report_dir, force)
+    if not jobs:
+        return [], []
+    done, failed = [], []
+    with make_executor(workers) as executor:
+        futures = submit_all(executor, jobs)
+        for future in as_completed(futures):
+            csv_path, pdf_path = futures[future]
+            error = future.exception()
+            if error is None:
+                done.append(pdf_path)
+            else:
+                failed.append((csv_path, error))
+            if progress:
+                progress(len(done) + len(failed), len(jobs), csv_path, error)
+    return done, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="แปลงทุกรายงาน CSV เป็น PDF")
+    parser.add_argument("--dir", default=REPORT_DIR, help="โฟลเดอร์รายงาน")
+    parser.add_argument("--workers", type=int, default=None, help="จำนวน process (ค่าเริ่มต้น = จำนวน CPU)")
+    parser.add_argument("--force", action="store_true", help="แปลงใหม่ทั้งหมดแม้ PDF จะใหม่กว่า CSV")
+    args = parser.parse_args(argv)
+
+    def progress(done, total, csv_path, error):
+        status = "ผิดพลาด: " + str(error) if error else "สำเร็จ"
+        print(f"[{done}/{total}] {os.path.basename(csv_path)} {status}", flush=True)
+
+    t0 = time.perf_counter()
+    done, failed = export_all(args.dir, args.workers, args.force, progress)
+    print(f"แปลง {len(done)} ไฟล์ ผิดพลาด {len(failed)} ไฟล์ ใช้เวลา {time.perf_counter() - t0:.1f} วินาที")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
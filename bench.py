@@ -0,0 +1,1157 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+HEADER = ["ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"]
+
+# สร้างข้อมูลจำลอง (seed คงที่ ผลลัพธ์ซ้ำได้)
+def iter_rows(n, seed=0):
+    rng = random.Random(seed)
+    income = ["กองทุนกรรมการ", "กองทุนการศึกษา", "ดอกเบี้ยรับ", "รับบริจาคทั่วไป"]
+    expense = ["เงินเดือน", "การดำเนินงานและกิจกรรม", "ค่าสาธารณูปโภค", "อื่นๆ"]
+    for i in range(n):
+        if rng.random() < 0.4:
+            yield ["รายรับ", rng.choice(income), f"รายการรับ {i}", f"{rng.uniform(1, 50000):.2f}"]
+        else:
+            yield ["รายจ่าย", rng.choice(expense), f"รายการจ่าย {i}", f"{rng.uniform(1, 20000):.2f}"]
+
+def make_rows(n, seed=0):
+    return list(iter_rows(n, seed))
+
+def write_report(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return path
+
+# ===== ข้อมูลจำลองแบบสมจริงสำหรับ suite =====
+# หมวด "หลัก > ย่อย" ตาม CATEGORY_OPTIONS รายละเอียดภาษาไทยจากแม่แบบ จำนวนเงินแบบ log-normal ตามหมวด
+# วันที่ (คอลัมน์ที่ 5) กระจายตลอด years ปีตั้งแต่ START_YEAR เรียงตามลำดับแถว (คลาดกันได้ไม่กี่วัน)
+SUBCATEGORIES = {
+    "กองทุนการศึกษา": ["ทุนประถม", "ทุนมัธยม", "ทุนมหาวิทยาลัย"],
+    "งานไหว้บรรพบุรุษ (ตรุษจีน)": ["ค่าของไหว้", "เงินทำบุญ"],
+    "รับบริจาคทั่วไป": ["เงินสด", "โอนผ่านธนาคาร", "ตู้บริจาค"],
+    "รับบริจาคสนับสนุนโครงการ": ["โครงการอาหารกลางวัน", "โครงการซ่อมศาลเจ้า"],
+    "เงินเดือน": ["ผู้จัดการ", "เจ้าหน้าที่บัญชี", "แม่บ้าน", "ยาม"],
+    "การดำเนินงานและกิจกรรม": ["ประชุมกรรมการ", "งานเลี้ยงประจำปี", "ค่าอาหาร", "ค่าเดินทาง"],
+    "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง": ["กระดาษ", "หมึกพิมพ์", "อุปกรณ์ทำความสะอาด"],
+    "ซ่อมแซม ค่าจ้างและค่าแรง": ["ไฟฟ้า", "ประปา", "หลังคา", "ทาสี"],
+    "ค่าสาธารณูปโภค": ["ค่าไฟฟ้า", "ค่าน้ำประปา", "ค่าโทรศัพท์", "ค่าอินเทอร์เน็ต"],
+}
+# ยอดกลางของแต่ละหมวดหลัก (บาท) หมวดที่ไม่มีในนี้ใช้ 1,500
+AMOUNT_SCALE = {
+    "กองทุนกรรมการ": 20_000, "กองทุนการศึกษา": 5_000, "ดอกเบี้ยรับ": 300, "รับบริจาคทั่วไป": 1_000,
+    "เงินเดือน": 15_000, "ค่ารถ ค่าล่วงเวลาผจก.": 2_000, "ค่าสาธารณูปโภค": 2_500,
+    "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง": 800, "ซ่อมแซม ค่าจ้างและค่าแรง": 6_000,
+}
+THAI_MONTHS = ["มกราคม", "กุมภาพันธ์", "มีนาคม", "เมษายน", "พฤษภาคม", "มิถุนายน",
+               "กรกฎาคม", "สิงหาคม", "กันยายน", "ตุลาคม", "พฤศจิกายน", "ธันวาคม"]
+THAI_NAMES = ["สมชาย", "สมศรี", "วิชัย", "มาลี", "ประเสริฐ", "สุดา", "อำนาจ", "กาญจนา", "ธนพล", "นภา"]
+THAI_SHOPS = ["ร้านเจริญพาณิชย์", "ห้างโลตัส", "บิ๊กซี", "ร้านรุ่งเรืองวัสดุ", "ร้านป้าแดง", "แม็คโคร"]
+DETAIL_TEMPLATES = {
+    "รายรับ": ["รับจาก คุณ{name} {sub}", "บริจาคโดย คุณ{name} เดือน{month}", "{main} งวด{month} {year}",
+               "โอนเข้าบัญชี {sub} เลขที่ {ref}"],
+    "รายจ่าย": ["จ่าย{sub} เดือน{month} {year}", "ซื้อของที่{shop} ใบเสร็จ {ref}", "{main} {sub} คุณ{name}",
+                "ค่าใช้จ่าย{sub} {shop}"],
+}
+
+START_YEAR = 2020
+
+def iter_synthetic(n, seed=0, years=5):
+    import datetime
+    from dates import to_text
+    from report_core import CATEGORY_OPTIONS
+
+    rng = random.Random(seed)
+    random_, choice, lognormvariate = rng.random, rng.choice, rng.lognormvariate
+    categories = {}
+    for kind, mains in CATEGORY_OPTIONS.items():
+        categories[kind] = [(main, sub, AMOUNT_SCALE.get(main, 1_500))
+                            for main in mains for sub in SUBCATEGORIES.get(main, [""])]
+    first = datetime.date(START_YEAR, 1, 1).toordinal()
+    span = datetime.date(START_YEAR + years, 1, 1).toordinal() - first - 3
+    for i in range(n):
+        kind = "รายรับ" if random_() < 0.4 else "รายจ่าย"
+        main, sub, scale = choice(categories[kind])
+        detail = choice(DETAIL_TEMPLATES[kind]).format(
+            name=choice(THAI_NAMES), shop=choice(THAI_SHOPS), month=choice(THAI_MONTHS),
+            year=START_YEAR + 543 + i * years // max(n, 1), main=main, sub=sub or main,
+            ref=f"{rng.randrange(10**6):06d}")
+        amount = scale * lognormvariate(0, 0.8)
+        # รายการส่วนหนึ่งเป็นจำนวนเต็มบาท
+        amount = round(amount) if random_() < 0.3 else amount
+        date = to_text(first + i * span // max(n, 1) + rng.randrange(3))
+        yield [kind, f"{main} > {sub}" if sub else main, detail, f"{amount:.2f}", date]
+
+def write_synthetic(path, n, seed=0):
+    from report_core import DATED_HEADER
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(DATED_HEADER)
+        writer.writerows(iter_synthetic(n, seed))
+    return path
+
+# เวลาเปิดรายงานในตาราง virtual เทียบกับการ insert ทุกแถว
+def bench_virtual_table(sizes=(1_000, 10_000, 100_000, 500_000), full_limit=50_000):
+    import tkinter as tk
+    from tkinter import ttk
+    from virtual_table import VirtualTable
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"virtual_table: ข้าม (ไม่มีหน้าจอ: {e})")
+        return
+    root.geometry("800x400")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'rows':>10} {'virtual ms':>12} {'items':>7} {'full ms':>10}")
+        for n in sizes:
+            path = write_report(os.path.join(tmp, f"bench_{n}.csv"), make_rows(n))
+
+            tree = ttk.Treeview(root, columns=HEADER, show="headings")
+            tree.pack(fill="both", expand=True)
+            root.update()
+            t0 = time.perf_counter()
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                rows = list(csv.reader(f))[1:]
+            table = VirtualTable(tree)
+            table.set_rows(rows)
+            root.update()
+            virtual_ms = (time.perf_counter() - t0) * 1000
+            items = len(tree.get_children())
+            tree.destroy()
+
+            full_ms = float("nan")
+            if n <= full_limit:
+                tree = ttk.Treeview(root, columns=HEADER, show="headings")
+                tree.pack(fill="both", expand=True)
+                root.update()
+                t0 = time.perf_counter()
+                with open(path, newline='', encoding='utf-8-sig') as f:
+                    rows = list(csv.reader(f))[1:]
+                for row in rows:
+                    tree.insert('', 'end', values=row)
+                root.update()
+                full_ms = (time.perf_counter() - t0) * 1000
+                tree.destroy()
+
+            print(f"{n:>10} {virtual_ms:>12.1f} {items:>7} {full_ms:>10.1f}")
+    root.destroy()
+
+# เวลาต่อการกดแป้นหนึ่งครั้งในช่องค้นหา เทียบกับ str(row).lower() ทุกแถวแบบเดิม
+def bench_search(n=200_000, query="รายการจ่าย 1234"):
+    from search_index import SearchIndex
+
+    rows = make_rows(n)
+    t0 = time.perf_counter()
+    index = SearchIndex(rows)
+    print(f"build {n} rows: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    index_times, naive_times = [], []
+    for k in range(1, len(query) + 1):
+        typed = query[:k]
+        t0 = time.perf_counter()
+        hits = index.search(typed)
+        index_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        naive = [i for i, row in enumerate(rows) if typed.lower() in str(row).lower()]
+        naive_times.append(time.perf_counter() - t0)
+    print(f"keystrokes: {len(query)}  hits: {len(hits)}  naive hits: {len(naive)}")
+    for name, times in (("index", index_times), ("naive", naive_times)):
+        times.sort()
+        print(f"{name}: median {times[len(times) // 2] * 1000:.1f} ms, worst {times[-1] * 1000:.1f} ms")
+
+# หน้า/วินาที และหน่วยความจำสูงสุดของ render_pdf แยก process ต่อขนาด จะได้วัด RSS ได้ตรง
+def bench_pdf(sizes=(1_000, 10_000, 100_000, 300_000)):
+    import subprocess
+
+    print(f"{'rows':>10} {'pages':>7} {'seconds':>9} {'pages/s':>9} {'peak MB':>9}")
+    for n in sizes:
+        out = subprocess.run([sys.executable, __file__, "_pdf_worker", str(n)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        pages, seconds, peak = int(out[0]), float(out[1]), float(out[2])
+        print(f"{n:>10} {pages:>7} {seconds:>9.2f} {pages / seconds:>9.1f} {peak:>9.1f}")
+
+def _pdf_worker(n):
+    from pdf_report import render_pdf
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_report(os.path.join(tmp, "bench.csv"), iter_rows(int(n)))
+        t0 = time.perf_counter()
+        pages = render_pdf(csv_path, os.path.join(tmp, "bench.pdf"))
+        seconds = time.perf_counter() - t0
+    print(pages, seconds, _peak_rss_mb())
+
+# เวลาต่อรายงานเมื่อสร้าง PDF หลายฉบับต่อกัน: RenderContext ใหม่ทุกฉบับ เทียบกับใช้ context เดิมซ้ำ
+# (context ใหม่ = ต้องดึงฟอนต์และวัดความกว้างตัวอักษรใหม่ทุกฉบับ)
+def bench_pdf_context(reports=20, rows=500):
+    from pdf_report import RenderContext, render_rows
+
+    data = [make_rows(rows, seed=r) for r in range(reports)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        render_rows(data[0], pdf_path, RenderContext())
+
+        t0 = time.perf_counter()
+        for r in data:
+            render_rows(r, pdf_path, RenderContext())
+        cold_ms = (time.perf_counter() - t0) / reports * 1000
+
+        context = RenderContext()
+        t0 = time.perf_counter()
+        for r in data:
+            render_rows(r, pdf_path, context)
+        warm_ms = (time.perf_counter() - t0) / reports * 1000
+    print(f"{reports} รายงาน x {rows} แถว: context ใหม่ทุกฉบับ {cold_ms:.1f} ms/ฉบับ  "
+          f"ใช้ context ซ้ำ {warm_ms:.1f} ms/ฉบับ  x{cold_ms / warm_ms:.1f}")
+
+# ความเร็วแปลงทั้งโฟลเดอร์เทียบจำนวน process (ควรเร็วขึ้นเกือบเป็นเส้นตรงตามจำนวนคอร์)
+def bench_batch_export(reports=16, rows=20_000):
+    from batch_export import export_all
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(reports):
+            write_report(os.path.join(tmp, f"report_{i}.csv"), iter_rows(rows, seed=i))
+        workers = 1
+        base = None
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+        while workers <= (os.cpu_count() or 1):
+            t0 = time.perf_counter()
+            export_all(tmp, workers=workers, force=True)
+            seconds = time.perf_counter() - t0
+            base = base or seconds
+            print(f"{workers:>8} {seconds:>9.2f} {base / seconds:>8.2f}")
+            workers *= 2
+
+# เวลาเริ่มต้นของคำสั่งที่ไม่วาด PDF (ต้องไม่โหลด reportlab) เทียบกับการโหลด reportlab + ฟอนต์
+def bench_import(repeat=5):
+    import subprocess
+
+    cases = {
+        "cli (ไม่วาด PDF)": "import cli",
+        "reportlab + ฟอนต์": "import pdf_report; pdf_report.register_fonts()",
+    }
+    for name, stmt in cases.items():
+        code = ("import sys, time; t0 = time.perf_counter(); " + stmt +
+                "; print(time.perf_counter() - t0, 'reportlab' in sys.modules)")
+        times = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                 check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+            times.append(float(out[0]))
+        print(f"{name:<20} {min(times) * 1000:>8.1f} ms  reportlab โหลด: {out[1]}")
+
+# เปิด + รวมยอดตามหมวดหมู่: ไฟล์ .ledger (mmap) เทียบกับ csv.DictReader
+def bench_columnar(n=1_000_000):
+    from columnar import ColumnarReport, csv_to_columnar
+    from report_core import summarize
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_report(os.path.join(tmp, "bench.csv"), iter_rows(n))
+        t0 = time.perf_counter()
+        path = csv_to_columnar(csv_path)
+        print(f"import CSV -> .ledger: {time.perf_counter() - t0:.2f} s "
+              f"({os.path.getsize(csv_path) / 1e6:.1f} MB -> {os.path.getsize(path) / 1e6:.1f} MB)")
+
+        t0 = time.perf_counter()
+        expected, _ = summarize(csv_path)
+        csv_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ColumnarReport(path) as report:
+            totals = report.totals()
+        col_s = time.perf_counter() - t0
+
+        same = all(abs(totals[t][c] - expected[t][c]) < 1e-6 * max(1, abs(expected[t][c]))
+                   for t in expected for c in expected[t])
+        print(f"DictReader: {csv_s * 1000:.0f} ms  columnar: {col_s * 1000:.1f} ms  "
+              f"x{csv_s / col_s:.0f}  ผลตรงกัน: {same}")
+
+# บันทึกหลังเพิ่ม 1 รายการ: ต่อท้ายไฟล์ เทียบกับเขียนใหม่ทั้งไฟล์
+def bench_save(n=200_000):
+    import report_core
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        rows = make_rows(n)
+        report_core.save_to_csv("bench", rows)
+        rows.append(["รายจ่าย", "อื่นๆ", "รายการใหม่", 1.0])
+
+        t0 = time.perf_counter()
+        report_core.save_changes("bench", rows, "rewrite", n)
+        rewrite_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        report_core.save_changes("bench", rows, "append", n)
+        append_s = time.perf_counter() - t0
+    print(f"{n} rows + 1: rewrite {rewrite_s * 1000:.0f} ms, append {append_s * 1000:.2f} ms")
+
+# สรุปข้าม 100 รายงาน: analytics (NumPy) เทียบกับ loop dict ธรรมดา
+def bench_analytics(reports=100, rows=10_000):
+    import report_core
+    from analytics import MultiReport
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        names = [f"month_{i:03d}" for i in range(reports)]
+        for i, name in enumerate(names):
+            write_report(report_core.report_path(name), iter_rows(rows, seed=i))
+
+        # แบบเดิม: อ่าน CSV แล้วรวมยอดด้วย dict ทีละแถว
+        t0 = time.perf_counter()
+        loaded = {name: report_core.read_csv_rows(report_core.report_path(name))[1:] for name in names}
+        load_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        totals = {}
+        for name, data in loaded.items():
+            for kind, category, _, amount in data:
+                key = (name, kind, category.split(">")[0].strip())
+                totals[key] = totals.get(key, 0.0) + float(amount)
+        dict_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        multi = MultiReport(names)
+        cold_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        multi = MultiReport(names)
+        warm_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        multi.totals()
+        multi.deltas()
+        multi.top_n(5)
+        numpy_s = time.perf_counter() - t0
+
+    print(f"{reports} reports x {rows} rows")
+    print(f"dict loop: load CSV {load_s * 1000:.0f} ms + aggregate {dict_s * 1000:.0f} ms")
+    print(f"numpy: load {cold_s * 1000:.0f} ms (สร้าง .ledger) / {warm_s * 1000:.0f} ms (mmap) "
+          f"+ totals/deltas/top-N {numpy_s * 1000:.1f} ms")
+
+# จำนวนเงินแบบสตางค์ (int64) เทียบ float และ Decimal
+# ตรวจก่อนว่าผลรวมสตางค์ตรงกับ Decimal ทุกครั้ง (ข้อมูลสุ่มหลาย seed รวมค่าติดลบ/ทศนิยมเกิน 2 ตำแหน่ง)
+def bench_money(n=1_000_000, checks=200):
+    from decimal import Decimal, ROUND_HALF_UP
+    from money import format_column, parse_column, to_satang, to_text
+
+    cent = Decimal("0.01")
+    float_off = 0
+    for seed in range(checks):
+        rng = random.Random(seed)
+        texts = [f"{rng.uniform(-1e7, 1e7):.{rng.choice((0, 1, 2, 3))}f}" for _ in range(rng.randint(1, 2000))]
+        exact = sum(Decimal(t).quantize(cent, rounding=ROUND_HALF_UP) for t in texts)
+        satang = parse_column(texts)
+        assert Decimal(sum(satang)) / 100 == exact, seed
+        assert parse_column([to_text(v) for v in satang]) == satang, seed
+        assert [to_satang(t) for t in texts] == list(satang), seed
+        if Decimal(sum(float(to_text(v)) for v in satang)) != exact:
+            float_off += 1
+    print(f"ตรวจ {checks} ชุด: สตางค์ตรงกับ Decimal ทุกชุด, ผลรวม float ไม่ตรงทุกหลัก {float_off} ชุด")
+
+    texts = [row[3] for row in iter_rows(n)]
+    for label, parse, add in (
+            ("float", lambda: list(map(float, texts)), sum),
+            ("Decimal", lambda: list(map(Decimal, texts)), sum),
+            ("satang", lambda: parse_column(texts), sum)):
+        to_satang.cache_clear()
+        t0 = time.perf_counter()
+        values = parse()
+        t1 = time.perf_counter()
+        add(values)
+        t2 = time.perf_counter()
+        size = sys.getsizeof(values)
+        if isinstance(values, list):
+            size += sum(map(sys.getsizeof, values))
+        print(f"{label:>8}: parse {(t1 - t0) * 1000:7.0f} ms  sum {(t2 - t1) * 1000:6.1f} ms  "
+              f"{size / n:6.1f} B/ค่า")
+    t0 = time.perf_counter()
+    format_column(parse_column(texts))
+    print(f"format {n:,} ค่า: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+# หน่วยความจำต่อแถว: list ของ list จาก csv.reader เทียบ Ledger (คอลัมน์ + หมวดหมู่ใช้ร่วมกัน)
+def bench_ledger(n=500_000):
+    import tracemalloc
+    import report_core
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_report(os.path.join(tmp, "ledger.csv"), iter_rows(n))
+        report_core.REPORT_DIR = tmp
+        for label, load in (("list of lists", lambda: report_core.read_csv_rows(path)[1:]),
+                            ("Ledger", lambda: Ledger(report_core.iter_report("ledger")))):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            rows = load()
+            seconds = time.perf_counter() - t0
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:>14}: {current / n:6.0f} B/แถว  load {seconds * 1000:6.0f} ms  (peak {peak / 2**20:.0f} MB)")
+            del rows
+
+# นำเข้า statement CSV ขนาดใหญ่ แล้วนำเข้าไฟล์เดิมซ้ำ (ทุกแถวต้องถูกตัดเป็นรายการซ้ำ)
+def bench_statement(sizes=(100_000, 500_000)):
+    import tracemalloc
+    import report_core
+    from statement_import import import_statement
+
+    from datetime import date
+
+    start = date(2015, 1, 1).toordinal()
+    payees = ["7-ELEVEN", "การไฟฟ้าส่วนภูมิภาค", "โอนเข้า", "INTEREST", "OFFICEMATE", "ร้านข้าวแกง", "SALARY"]
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        for n in sizes:
+            path = os.path.join(tmp, f"statement_{n}.csv")
+            rng = random.Random(n)
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Date", "Description", "Amount"])
+                for i in range(n):
+                    amount = rng.uniform(-20000, 20000)
+                    day = date.fromordinal(start + i // 50)
+                    writer.writerow([f"{day.day:02d}/{day.month:02d}/{day.year + 543}",
+                                     f"{rng.choice(payees)} #{i}", f"{amount:.2f}"])
+            for label in ("ครั้งแรก", "นำเข้าซ้ำ"):
+                t0 = time.perf_counter()
+                stats = import_statement(f"bank_{n}", path)
+                seconds = time.perf_counter() - t0
+                print(f"{n:>9,} แถว {label}: {seconds:6.2f} s  นำเข้า {stats['imported']:,} ซ้ำ {stats['duplicates']:,}")
+            # หน่วยความจำสูงสุดตอนนำเข้าครั้งแรก (รายงานใหม่)
+            tracemalloc.start()
+            import_statement(f"fresh_{n}", path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{'':>9}  peak (รายงานใหม่): {peak / 2**20:.1f} MB")
+
+# แนะนำหมวดหมู่: เรียนรู้กฎหลายหมื่นคำ แล้ววัดเวลาค้นต่อหนึ่งรายละเอียด (automaton เทียบวนทุกกฎ)
+def bench_categorizer(vocabulary=40_000, rows=300_000, lookups=5_000):
+    from categorizer import Categorizer
+
+    rng = random.Random(0)
+    syllables = ["กา", "ขน", "คร", "งาน", "จัด", "ซื้อ", "ค่า", "ไฟ", "น้ำ", "รถ", "ข้าว", "ส่ง", "ผ้า", "โต๊ะ",
+                 "ปาก", "กา", "ซ่อม", "ท่อ", "สี", "ทา", "ชุด", "ยา", "บุญ", "ทาน"]
+    words = list({"".join(rng.choice(syllables) for _ in range(rng.randint(3, 5))) for _ in range(vocabulary)})
+    categories = [f"หมวด{i} > ย่อย{j}" for i in range(20) for j in range(5)]
+    by_category = {c: words[i::len(categories)] for i, c in enumerate(categories)}
+
+    def detail():
+        category = rng.choice(categories)
+        picked = rng.sample(by_category[category], 2)
+        return f"{picked[0]} {picked[1]} {rng.randint(1, 999)}", category
+
+    data = [("รายจ่าย", c, d, "1.00") for d, c in (detail() for _ in range(rows))]
+    t0 = time.perf_counter()
+    categorizer = Categorizer().learn(data).compile()
+    print(f"เรียนรู้ {rows:,} แถว -> {len(categorizer):,} กฎ: {time.perf_counter() - t0:.2f} s")
+
+    queries = [detail() for _ in range(lookups)]
+    times = []
+    hits = 0
+    for text, expected in queries:
+        t0 = time.perf_counter()
+        hits += categorizer.suggest(text, "รายจ่าย") == expected
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    print(f"automaton: p50 {times[len(times) // 2] * 1e6:.0f} us  p99 {times[int(len(times) * 0.99)] * 1e6:.0f} us  "
+          f"ถูก {hits / lookups:.0%}")
+
+    keywords = list(enumerate(categorizer.keywords))
+    t0 = time.perf_counter()
+    for text, _ in queries[:200]:
+        lowered = text.lower()
+        [kid for kid, k in keywords if k in lowered]
+    print(f"วนทุกกฎ: {(time.perf_counter() - t0) / 200 * 1e6:.0f} us ต่อรายการ")
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# สมุดรายชื่อรายงาน: อ่านครั้งแรก / refresh เมื่อไม่มีอะไรเปลี่ยน / เปลี่ยนบางไฟล์ / ค้นหา+เรียง
+def bench_catalog(reports=5_000, rows=200, changed=20):
+    import report_catalog
+    import report_core
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        for r in range(reports):
+            write_report(os.path.join(tmp, f"report_{r:05d}.csv"), iter_rows(rows, seed=r))
+
+        catalog = report_catalog.ReportCatalog(tmp)
+        t0 = time.perf_counter()
+        catalog.refresh()
+        cold_s = time.perf_counter() - t0
+
+        catalog = report_catalog.ReportCatalog(tmp)
+        t0 = time.perf_counter()
+        catalog.refresh()
+        warm_s = time.perf_counter() - t0
+
+        for r in range(changed):
+            with open(os.path.join(tmp, f"report_{r * 7:05d}.csv"), 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(["รายจ่าย", "อื่นๆ", "2024-01-05 รายการใหม่", "1.00"])
+        t0 = time.perf_counter()
+        updated = catalog.refresh()
+        partial_s = time.perf_counter() - t0
+
+        entries = catalog.entries()
+        t0 = time.perf_counter()
+        total, page = report_catalog.query(entries, "_04", "balance", True, 0, 50)
+        query_s = time.perf_counter() - t0
+
+        expected, count = report_core.summarize(os.path.join(tmp, "report_00007.csv"))
+        info = catalog.reports["report_00007"]
+        same = info.rows == count and info.income == round(sum(expected["รายรับ"].values()) * 100) \
+            and info.expense == round(sum(expected["รายจ่าย"].values()) * 100) and info.last_date == "2024-01-05"
+    print(f"{reports} รายงาน: อ่านครั้งแรก {cold_s:.2f} s  ไม่เปลี่ยน {warm_s * 1000:.0f} ms  "
+          f"เปลี่ยน {updated} ไฟล์ {partial_s * 1000:.0f} ms  ค้นหา+เรียง {query_s * 1000:.1f} ms "
+          f"({total} รายงาน)  ยอดตรง: {same}")
+
+# กู้คืนจาก journal: เวลาเล่น journal ซ้ำขึ้นกับจำนวน op ไม่ใช่ขนาดรายงาน และเลิกทำ/ทำซ้ำต่อครั้ง
+def bench_journal(sizes=(10_000, 1_000_000), ops=2_000):
+    import gc
+    import report_core
+    from edit_journal import EditSession, pending_journal
+    from ledger import Entry, Ledger
+    from search_index import SearchIndex
+
+    print(f"{'rows':>10} {'ops':>6} {'op us (UI)':>11} {'op+fsync ms':>12} {'undo+redo us':>13} {'recover ms':>11}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            report_core.REPORT_DIR = tmp
+            report_core.save_to_csv("bench", iter_rows(n))
+            data = Ledger(report_core.iter_report("bench"))
+            session = EditSession("bench", data, SearchIndex(data))
+            rng = random.Random(0)
+            t0 = time.perf_counter()
+            for i in range(ops):
+                r = rng.random()
+                if r < 0.4:
+                    session.update(rng.randrange(n), Entry("รายจ่าย", "อื่นๆ", f"แก้ {i}", "1.00"))
+                elif r < 0.7:
+                    session.delete([rng.randrange(n)])
+                else:
+                    session.add([Entry("รายรับ", "อื่นๆ", f"เพิ่ม {i}", "2.00")])
+            queued_us = (time.perf_counter() - t0) / ops * 1e6
+            # รวมเวลารอ thread ของ journal เขียน+fsync ทุกบรรทัดจนครบ
+            session.journal.close()
+            session.journal = None
+            op_ms = (time.perf_counter() - t0) / ops * 1000
+            t0 = time.perf_counter()
+            for _ in range(100):
+                session.undo()
+            for _ in range(100):
+                session.redo()
+            undo_us = (time.perf_counter() - t0) / 200 * 1e6
+            expected = list(session.pending()[0])
+
+            data = Ledger(report_core.iter_report("bench"))
+            index = SearchIndex(data)
+            # เก็บขยะจากการโหลดรายงานก่อน จะได้วัดเฉพาะการเล่น journal
+            gc.collect()
+            path = pending_journal("bench")[0]
+            t0 = time.perf_counter()
+            recovered = EditSession("bench", data, index, recover=path)
+            recover_ms = (time.perf_counter() - t0) * 1000
+            same = list(recovered.pending()[0]) == expected
+            recovered.close()
+        print(f"{n:>10} {ops:>6} {queued_us:>11.1f} {op_ms:>12.2f} {undo_us:>13.1f} {recover_ms:>11.1f}  ผลตรงกัน: {same}")
+
+# ต้นทุนของ span เมื่อปิด (ค่าเริ่มต้น) และเมื่อเปิด และโหลดรายงานโดยมี/ไม่มีการจับเวลา
+def bench_diagnostics(calls=1_000_000, n=500_000):
+    import diagnostics
+    from ledger import Ledger
+
+    def loop():
+        span = diagnostics.span
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            with span("bench"):
+                pass
+        return (time.perf_counter() - t0) / calls * 1e9
+
+    def empty():
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            pass
+        return (time.perf_counter() - t0) / calls * 1e9
+
+    base_ns = empty()
+    diagnostics.disable()
+    off_ns = loop() - base_ns
+    diagnostics.reset()
+    diagnostics.enable()
+    on_ns = loop() - base_ns
+    diagnostics.disable()
+    print(f"span ต่อครั้ง: ปิด {off_ns:.0f} ns  เปิด {on_ns:.0f} ns")
+
+    rows = make_rows(n)
+    t0 = time.perf_counter()
+    Ledger(rows)
+    off_s = time.perf_counter() - t0
+    diagnostics.reset()
+    diagnostics.enable()
+    t0 = time.perf_counter()
+    Ledger(rows)
+    on_s = time.perf_counter() - t0
+    snap = diagnostics.snapshot()
+    diagnostics.disable()
+    print(f"โหลด {n:,} แถว: ปิด {off_s * 1000:.0f} ms  เปิด {on_s * 1000:.0f} ms  "
+          f"load_rows {snap['spans']['load_rows']['total_ms']:.0f} ms  rows_parsed {snap['counters']['rows_parsed']:,}")
+
+# ค้นช่วงวันที่ในบัญชีหลายปี: "รายจ่ายหมวดหนึ่ง ม.ค.-มี.ค." ผ่านพาร์ทิชันรายเดือน เทียบกับอ่านทั้งรายงานแล้วกรอง
+def bench_dates(sizes=(100_000, 1_000_000), years=5, category="การดำเนินงานและกิจกรรม"):
+    import diagnostics
+    import report_core
+    from dates import period, row_date, to_ordinal
+    from date_partitions import get_store, range_rows
+
+    start, end = period(f"{START_YEAR + 2}-01", f"{START_YEAR + 2}-03")
+    print(f"{'rows':>10} {'build s':>8} {'range ms':>9} {'scan ms':>9} {'x':>6} {'parts':>6} {'hits':>7}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            report_core.REPORT_DIR = tmp
+            with open(report_core.report_path("bench"), 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(report_core.DATED_HEADER)
+                writer.writerows(iter_synthetic(n, years=years))
+
+            t0 = time.perf_counter()
+            get_store().ensure("bench")
+            build_s = time.perf_counter() - t0
+
+            diagnostics.reset()
+            diagnostics.enable()
+            t0 = time.perf_counter()
+            hits = list(range_rows("bench", start, end, "รายจ่าย", category))
+            range_s = time.perf_counter() - t0
+            parts = diagnostics.snapshot()["counters"].get("partitions_read", 0)
+            diagnostics.disable()
+
+            t0 = time.perf_counter()
+            scanned = [row for row in report_core.iter_report("bench")
+                       if row[0] == "รายจ่าย" and row[1].split(">")[0].strip() == category
+                       and start <= to_ordinal(row_date(row)) <= end]
+            scan_s = time.perf_counter() - t0
+            same = sorted(hits) == sorted(scanned)
+        print(f"{n:>10} {build_s:>8.2f} {range_s * 1000:>9.1f} {scan_s * 1000:>9.1f} {scan_s / range_s:>6.0f} "
+              f"{parts:>6} {len(hits):>7}  ผลตรงกัน: {same}")
+
+# หลาย process ต่อท้ายรายงานเดียวกันพร้อมกันผ่าน report_lock: เวลาต่อครั้ง (รอล็อก+เขียน) และไม่มีแถวหาย
+def _lock_worker(args):
+    import report_core
+    report_dir, worker, appends = args
+    report_core.REPORT_DIR = report_dir
+    times = []
+    for i in range(appends):
+        t0 = time.perf_counter()
+        report_core.append_report("bench", [["รายจ่าย", "อื่นๆ", f"process {worker} #{i}", "1.00", "2024-06-01"]])
+        times.append(time.perf_counter() - t0)
+    return times
+
+# ล็อกและการรวมการแก้ไขพร้อมกัน:
+#   ล็อกว่าง: ต้นทุนล็อก+ปล่อยต่อครั้ง, ชิงกัน: writers process ต่อท้ายรายงานเดียวกันพร้อมกัน
+#   รวม: เราแก้ edits แถว/ลบ/เพิ่ม ขณะอีกฝ่ายแก้แถวอื่น (ชนกัน conflicts แถว) และต่อท้าย แล้วบันทึกด้วย save_session
+def bench_locks(sizes=(100_000, 1_000_000), writers=8, appends=200, edits=200, conflicts=10):
+    import multiprocessing
+    import report_core
+    from edit_journal import EditSession
+    from ledger import Entry
+    from report_merge import load_versioned, merge, save_session
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        report_core.store_report("bench", iter_synthetic(1000))
+        t0 = time.perf_counter()
+        for _ in range(10_000):
+            with report_core.report_lock("bench"):
+                pass
+        free_us = (time.perf_counter() - t0) / 10_000 * 1e6
+
+        t0 = time.perf_counter()
+        with multiprocessing.Pool(writers) as pool:
+            times = [t for part in pool.map(_lock_worker, [(tmp, w, appends) for w in range(writers)]) for t in part]
+        wall = time.perf_counter() - t0
+        rows = sum(1 for _ in report_core.iter_report("bench"))
+    print(f"ล็อกว่าง {free_us:.1f} us/ครั้ง  {writers} process x {appends} ต่อท้าย: {len(times) / wall:,.0f} ครั้ง/s  "
+          f"p50 {_percentile(times, 0.5) * 1000:.2f} ms  p99 {_percentile(times, 0.99) * 1000:.2f} ms  "
+          f"แถวครบ: {rows == 1000 + writers * appends}")
+
+    print(f"{'rows':>10} {'load s':>7} {'merge ms':>9} {'save s':>7} {'conflicts':>10}  ผล")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            report_core.REPORT_DIR = tmp
+            report_core.store_report("bench", iter_synthetic(n))
+            rng = random.Random(0)
+            version, data = load_versioned(report_core, "bench")
+            session = EditSession("bench", data, journal=False, version=version)
+            mine = rng.sample(range(n), edits)
+            for i in mine[:edits // 2]:
+                session.update(i, Entry("รายจ่าย", "อื่นๆ", f"ของเรา {i}", "1.00", "2024-06-01"))
+            session.delete(mine[edits // 2:])
+            session.add([Entry("รายรับ", "อื่นๆ", f"เพิ่มโดยเรา {i}", "2.00", "2024-06-01") for i in range(edits)])
+
+            # อีกฝ่ายบันทึกไปก่อน: แก้แถวอื่น + แถวเดียวกับเรา conflicts แถว แล้วต่อท้าย
+            theirs = session.base_rows()
+            others = rng.sample(sorted(set(range(n)) - set(mine)), edits) + mine[:conflicts]
+            for i in others:
+                theirs[i] = Entry("รายรับ", "อื่นๆ", f"ของอีกฝ่าย {i}", "3.00", "2024-06-02")
+            theirs.extend([["รายจ่าย", "อื่นๆ", f"เพิ่มโดยอีกฝ่าย {i}", "4.00", "2024-06-02"] for i in range(edits)])
+            report_core.store_report("bench", theirs)
+
+            t0 = time.perf_counter()
+            version, latest = load_versioned(report_core, "bench")
+            load_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            merged = merge(session, latest, version)
+            merge_ms = (time.perf_counter() - t0) * 1000
+            choices = {c.row_id: ("ours", c.theirs) for c in merged.conflicts}
+            t0 = time.perf_counter()
+            path, _ = save_session(report_core, session, choices)
+            save_s = time.perf_counter() - t0
+            saved = [row[2] for row in report_core.iter_report("bench")]
+            same = len(saved) == n - edits // 2 + 2 * edits and saved.count(f"ของเรา {mine[0]}") == 1
+        print(f"{n:>10} {load_s:>7.2f} {merge_ms:>9.1f} {save_s:>7.2f} {len(merged.conflicts):>10}  "
+              f"บันทึกแล้ว: {path is not None}  ผลถูกต้อง: {same}")
+
+# ===== load test ของ api_server: client หลายตัวพร้อมกัน วัดคำขอ/วินาทีต่อเนื่อง และ p99 =====
+#   python bench.py api --clients 50 --duration 10 --rows 100k
+#   python bench.py api --url http://127.0.0.1:8765 --report <ชื่อ>   (ยิงเซิร์ฟเวอร์ที่เปิดอยู่แล้ว)
+# ปกติเปิดเซิร์ฟเวอร์เป็น process แยก (ไม่แย่ง GIL กับ client) ในโฟลเดอร์ temp: รายงานใหญ่ 1 รายงาน + รายงานเล็ก
+# แต่ละ client ใช้ connection keep-alive ของตัวเอง สุ่มคำขอตาม API_MIX:
+#   list = รายชื่อรายงาน, page = หน้าสุ่มของรายงานใหญ่, period = หน้าแรกของช่วง 3 เดือน,
+#   summary = ยอดรวมของรายงานสุ่ม, append = ต่อท้ายหนึ่งแถวในรายงานเล็ก (รายงานเล็กเท่านั้น ให้ summary รายงานใหญ่ยังได้จากแคช)
+API_MIX = {"list": 10, "page": 40, "period": 10, "summary": 30, "append": 10}
+API_SMALL_REPORTS = 10
+
+async def _api_request(reader, writer, method, path, body=None):
+    import json
+    data = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line[:15].lower() == b"content-length:":
+            length = int(line[15:])
+    return int(head[9:12]), await reader.readexactly(length)
+
+async def _api_clients(host, port, clients, duration, big, small, seed):
+    import asyncio
+    import json
+    from urllib.parse import quote
+
+    ops, weights = list(API_MIX), list(API_MIX.values())
+    big_path = "/reports/" + quote(big)
+    small_paths = ["/reports/" + quote(name) for name in small]
+    latencies = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+
+    async def client(i):
+        rng = random.Random(seed + i)
+        reader, writer = await asyncio.open_connection(host, port)
+        deadline = time.perf_counter() + duration
+        try:
+            while time.perf_counter() < deadline:
+                op = rng.choices(ops, weights)[0]
+                if op == "list":
+                    args = ("GET", "/reports?limit=50")
+                elif op == "page":
+                    args = ("GET", f"{big_path}?offset={rng.randrange(big_rows)}&limit=100")
+                elif op == "period":
+                    year = START_YEAR + rng.randrange(4)
+                    args = ("GET", f"{big_path}?from={year}-01&to={year}-03&limit=100")
+                elif op == "summary":
+                    args = ("GET", rng.choice(small_paths + [big_path]) + "/summary")
+                else:
+                    args = ("POST", rng.choice(small_paths) + "/rows",
+                            {"rows": [["รายจ่าย", "อื่นๆ", f"client {i}", f"{rng.uniform(1, 500):.2f}", "2024-06-01"]]})
+                t0 = time.perf_counter()
+                status, _ = await _api_request(reader, writer, *args)
+                latencies[op].append(time.perf_counter() - t0)
+                if status != 200:
+                    errors[op] += 1
+        finally:
+            writer.close()
+
+    reader, writer = await asyncio.open_connection(host, port)
+    # อุ่นเครื่อง: ให้เซิร์ฟเวอร์โหลด Ledger และยอดรวมของรายงานใหญ่ก่อนเริ่มจับเวลา
+    status, body = await _api_request(reader, writer, "GET", big_path + "?limit=0")
+    if status != 200:
+        raise RuntimeError(f"เปิดรายงาน {big} ไม่ได้: {body.decode('utf-8')}")
+    big_rows = max(1, json.loads(body)["total"])
+    for path in (big_path + "/summary", "/reports"):
+        await _api_request(reader, writer, "GET", path)
+    writer.close()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - t0, big_rows
+
+# ส่งออก/นำเข้าแต่ละรูปแบบ: แถว/วินาที ขนาดไฟล์ และหน่วยความจำสูงสุด (ต้องคงที่ไม่ว่ารายงานจะใหญ่แค่ไหน)
+def bench_formats(sizes=(100_000, 1_000_000), names=None):
+    import tracemalloc
+    import report_core
+    from report_formats import FORMATS, export_report, import_report
+
+    print(f"{'rows':>10} {'format':>8} {'export rows/s':>14} {'import rows/s':>14} {'MB':>8} "
+          f"{'peak exp MB':>12} {'peak imp MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        for n in sizes:
+            write_synthetic(report_core.report_path("bench"), n)
+            for fmt in (FORMATS[name] for name in names or FORMATS):
+                if not fmt.available:
+                    print(f"{n:>10} {fmt.name:>8}  (ข้าม: ไม่มี {fmt.requires})")
+                    continue
+                path = os.path.join(tmp, "out" + fmt.extension)
+                results = []
+                for run in (lambda: export_report("bench", path),
+                            lambda: import_report("imported", path, replace=True)):
+                    t0 = time.perf_counter()
+                    run()
+                    seconds = time.perf_counter() - t0
+                    tracemalloc.start()
+                    run()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    results.append((n / seconds, peak / 2**20))
+                same = list(report_core.iter_report("imported")) == list(report_core.iter_report("bench"))
+                (export_rate, export_peak), (import_rate, import_peak) = results
+                print(f"{n:>10} {fmt.name:>8} {export_rate:>14,.0f} {import_rate:>14,.0f} "
+                      f"{os.path.getsize(path) / 2**20:>8.1f} {export_peak:>12.1f} {import_peak:>12.1f}  "
+                      f"ผลตรงกัน: {same}")
+
+# แดชบอร์ด: รวมยอดทุกรายงาน + ข้อมูลกราฟ ครั้งแรก / เปิดโปรแกรมใหม่ (aggregate_cache บนดิสก์) / รีเฟรชซ้ำ
+# เวลาวาดกราฟหนึ่งรูปลง PDF (สร้าง Drawing + renderPDF) และเวลาแปลง PDF ที่มีหน้าสรุป เทียบไม่มีหน้าสรุป
+def bench_charts(reports=2_000, rows=200, pdf_rows=20_000, width=515):
+    import io
+    import aggregate_cache
+    import charts
+    import report_core
+    from budgets import load_budgets, save_budgets
+    from money import to_satang
+    from pdf_report import get_context, render_pdf
+    from reportlab.pdfgen import canvas
+
+    def refresh():
+        return charts.summary_charts(charts.dashboard_totals(), load_budgets())
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        result = fn()
+        return time.perf_counter() - t0, result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_core.REPORT_DIR = tmp
+        for r in range(reports):
+            write_synthetic(os.path.join(tmp, f"report_{r:05d}.csv"), rows, seed=r)
+        expense = report_core.CATEGORY_OPTIONS["รายจ่าย"]
+        save_budgets({"รายจ่าย": {main: to_satang(AMOUNT_SCALE.get(main, 1_500)) * reports * rows // 20
+                                  for main in expense}})
+        aggregate_cache._caches.clear()
+        get_context()
+
+        cold_s, specs = timed(refresh)
+        aggregate_cache._caches.clear()
+        reopen_s, reopen_specs = timed(refresh)
+        warm_s, _ = timed(refresh)
+        print(f"แดชบอร์ด {reports:,} รายงาน x {rows} แถว ({len(specs)} กราฟ): ครั้งแรก {cold_s:.2f} s  "
+              f"เปิดโปรแกรมใหม่ {reopen_s * 1000:.0f} ms  รีเฟรชซ้ำ {warm_s * 1000:.0f} ms  "
+              f"ข้อมูลตรงกัน: {specs == reopen_specs}")
+
+        c = canvas.Canvas(io.BytesIO())
+        for name, data in specs:
+            charts.draw_pdf(name, data, c, 40, 40, width, charts.chart_height(name, data))
+        t0 = time.perf_counter()
+        for name, data in specs:
+            charts.draw_pdf(name, data, c, 40, 40, width, charts.chart_height(name, data))
+        draw_ms = (time.perf_counter() - t0) / len(specs) * 1000
+
+        csv_path = write_synthetic(os.path.join(tmp, "pdf.csv"), pdf_rows, seed=reports)
+        pdf_path = os.path.join(tmp, "pdf.pdf")
+        plain_s, _ = timed(lambda: render_pdf(csv_path, pdf_path, summary=False))
+        summary_s, pages = timed(lambda: render_pdf(csv_path, pdf_path))
+    print(f"PDF {pdf_rows:,} แถว ({pages} หน้า): ไม่มีหน้าสรุป {plain_s:.2f} s  มีหน้าสรุป {summary_s:.2f} s  "
+          f"วาดกราฟลง PDF {draw_ms:.1f} ms/กราฟ")
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def bench_api(clients=50, duration=10.0, rows=100_000, url=None, report=None, seed=0):
+    import asyncio
+    import subprocess
+    from urllib.parse import urlsplit
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if url is None:
+            big = "bench_big"
+            small = [f"bench_small_{i}" for i in range(API_SMALL_REPORTS)]
+            write_synthetic(os.path.join(tmp, big + ".csv"), rows, seed)
+            for i, name in enumerate(small):
+                write_synthetic(os.path.join(tmp, name + ".csv"), 2_000, seed + i + 1)
+            server = subprocess.Popen([sys.executable, "api_server.py", "--dir", tmp, "--port", "0"],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)),
+                                      stdout=subprocess.PIPE, text=True, encoding='utf-8')
+            line = server.stdout.readline()
+            url = line[line.index("http://"):].split()[0]
+        else:
+            big = report
+            small = [report]
+        host, port = urlsplit(url).hostname, urlsplit(url).port
+        try:
+            latencies, errors, elapsed, rows = asyncio.run(_api_clients(host, port, clients, duration, big, small, seed))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{clients} clients, {elapsed:.1f} s, รายงานใหญ่ {rows:,} แถว ({url})")
+    print(f"{'op':>8} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    everything = []
+    for op, values in latencies.items():
+        everything += values
+        print(f"{op:>8} {len(values):>9,} {len(values) / elapsed:>8.0f} {_percentile(values, 0.5) * 1000:>8.1f} "
+              f"{_percentile(values, 0.99) * 1000:>8.1f} {max(values, default=0) * 1000:>8.1f} {errors[op]:>7}")
+    print(f"{'รวม':>8} {total:>9,} {total / elapsed:>8.0f} {_percentile(everything, 0.5) * 1000:>8.1f} "
+          f"{_percentile(everything, 0.99) * 1000:>8.1f} {max(everything, default=0) * 1000:>8.1f} "
+          f"{sum(errors.values()):>7}")
+    return {"rps": total / elapsed, "p99": _percentile(everything, 0.99), "errors": sum(errors.values())}
+
+def api_main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="bench.py api", description="load test ของ api_server")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="วินาที")
+    parser.add_argument("--rows", default="100k", help="จำนวนแถวของรายงานใหญ่ (เช่น 100k, 1m)")
+    parser.add_argument("--url", help="ยิงเซิร์ฟเวอร์ที่เปิดอยู่แล้วแทนการเปิดเอง (ต้องใส่ --report)")
+    parser.add_argument("--report", help="รายงานที่ใช้กับ --url (append จะต่อท้ายรายงานนี้)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.url and not args.report:
+        parser.error("--url ต้องใส่ --report ด้วย")
+    result = bench_api(args.clients, args.duration, parse_size(args.rows), args.url, args.report, args.seed)
+    return 1 if result["errors"] else 0
+
+# ===== suite: วัดเส้นทางหลักแบบไม่มีหน้าจอ บันทึกเป็น JSON และเทียบกับ baseline =====
+#   python bench.py suite --sizes 1k,100k,1m --out results.json --baseline baseline.json
+#   python bench.py suite --sizes 1k,10k --save-baseline baseline.json
+#   python bench.py generate 100000 reports/ตัวอย่าง.csv
+# ข้อมูลจำลองเก็บไว้ใน --data-dir (ใช้ซ้ำข้ามการรัน สร้าง 10M แถวครั้งเดียว)
+# ค่าที่บันทึก = เวลาดีที่สุดจาก --repeat รอบ (ขนาดตั้งแต่ 1M แถวขึ้นไปวัดรอบเดียว)
+# ช้ากว่า baseline เกิน --threshold เท่า (และเกิน REGRESSION_FLOOR_S) นับเป็น regression และจบด้วย exit code 1
+
+SUITE_SIZES = "1k,10k,100k"
+# ขนาดสูงสุดที่วัดต่อ benchmark (PDF 10M แถวใช้เวลาหลายนาที)
+SUITE_LIMITS = {"pdf": 1_000_000}
+REGRESSION_FLOOR_S = 0.005
+
+def parse_size(text):
+    text = text.strip().lower().replace("_", "")
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+def synthetic_report(data_dir, n, seed):
+    path = os.path.join(data_dir, f"synthetic_{n}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        write_synthetic(path + ".tmp", n, seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+class SuiteData:
+    def __init__(self, csv_path, n, tmp):
+        self.csv_path = csv_path
+        self.n = n
+        self.tmp = tmp
+        self._ledger = None
+
+    def rows(self):
+        with open(self.csv_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            yield from reader
+
+    @property
+    def ledger(self):
+        if self._ledger is None:
+            from ledger import Ledger
+            self._ledger = Ledger(self.rows())
+        return self._ledger
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+# แต่ละ benchmark คืน {ชื่อค่า: วินาที}
+def suite_csv_load(data):
+    from ledger import Ledger
+    return {"csv_load": _timed(lambda: Ledger(data.rows()))}
+
+def suite_search(data, query="ค่าไฟฟ้า"):
+    from search_index import SearchIndex
+
+    t0 = time.perf_counter()
+    index = SearchIndex(data.ledger)
+    build_s = time.perf_counter() - t0
+    # พิมพ์ทีละตัวอักษรเหมือนในช่องค้นหา
+    t0 = time.perf_counter()
+    for k in range(1, len(query) + 1):
+        index.search(query[:k])
+    return {"search.build": build_s, "search.typing": time.perf_counter() - t0}
+
+def suite_aggregate(data):
+    import report_core
+    from aggregate_cache import build_aggregates
+    return {"aggregate": _timed(lambda: build_aggregates(*report_core.summarize(data.csv_path)))}
+
+def suite_pdf(data):
+    import report_core
+    from pdf_report import generate_pdf_from_csv
+    report_core.REPORT_DIR = data.tmp
+    return {"pdf": _timed(generate_pdf_from_csv, data.csv_path, "suite")}
+
+def suite_save(data):
+    import report_core
+    report_core.REPORT_DIR = data.tmp
+    ledger = data.ledger
+    return {"save": _timed(report_core.save_to_csv, "suite", ledger)}
+
+SUITE = {
+    "csv_load": suite_csv_load,
+    "search": suite_search,
+    "aggregate": suite_aggregate,
+    "pdf": suite_pdf,
+    "save": suite_save,
+}
+
+def run_suite(sizes, names=None, repeat=3, seed=0, data_dir=None):
+    import platform
+    from datetime import datetime
+
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "ledger-bench-data")
+    results = {}
+    for n in sizes:
+        print(f"-- {n:,} แถว --")
+        csv_path = synthetic_report(data_dir, n, seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            data = SuiteData(csv_path, n, tmp)
+            for name in names or SUITE:
+                if n > SUITE_LIMITS.get(name, n):
+                    continue
+                runs = {}
+                for _ in range(repeat if n < 1_000_000 else 1):
+                    for metric, seconds in SUITE[name](data).items():
+                        runs.setdefault(metric, []).append(seconds)
+                for metric, times in runs.items():
+                    best = min(times)
+                    results[f"{metric}/{n}"] = {"rows": n, "seconds": best, "runs": times,
+                                                "rows_per_s": n / best if best else None}
+                    print(f"{metric:<16} {best * 1000:>12.1f} ms")
+    meta = {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "platform": platform.platform(), "seed": seed, "repeat": repeat}
+    return {"meta": meta, "results": results}
+
+# [(ชื่อ, baseline วินาที, ปัจจุบัน วินาที, อัตราส่วน, ช้าลงหรือไม่)] เฉพาะค่าที่มีทั้งสองฝั่ง
+def compare_results(current, baseline, threshold=1.25):
+    rows = []
+    for key, result in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        now, before = result["seconds"], base["seconds"]
+        ratio = now / before if before else float("inf")
+        regressed = ratio > threshold and now - before > REGRESSION_FLOOR_S
+        rows.append((key, before, now, ratio, regressed))
+    return rows
+
+def suite_main(argv):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="bench.py suite", description="benchmark เส้นทางหลักพร้อมเทียบ baseline")
+    parser.add_argument("--sizes", default=SUITE_SIZES, help=f"จำนวนแถว คั่นด้วย , เช่น 1k,1m,10m (ค่าเริ่มต้น {SUITE_SIZES})")
+    parser.add_argument("--only", help="เฉพาะ benchmark (คั่นด้วย ,): " + ", ".join(SUITE))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="โฟลเดอร์เก็บรายงานจำลอง (ค่าเริ่มต้นอยู่ในโฟลเดอร์ temp)")
+    parser.add_argument("--out", default="bench_results.json", help="ไฟล์ผลลัพธ์ JSON")
+    parser.add_argument("--baseline", help="ไฟล์ผลลัพธ์ที่ใช้เทียบ")
+    parser.add_argument("--save-baseline", help="บันทึกผลครั้งนี้เป็น baseline ด้วย")
+    parser.add_argument("--threshold", type=float, default=1.25, help="ช้ากว่า baseline กี่เท่าจึงนับเป็น regression")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else None
+    for name in names or ():
+        if name not in SUITE:
+            parser.error(f"ไม่รู้จัก benchmark: {name}")
+    current = run_suite([parse_size(s) for s in args.sizes.split(",")], names, args.repeat, args.seed,
+                        args.data_dir)
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"บันทึกผลที่ {path}")
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare_results(current, baseline, args.threshold)
+    print(f"{'benchmark':<24} {'baseline ms':>12} {'now ms':>12} {'x':>6}")
+    for key, before, now, ratio, regressed in rows:
+        print(f"{key:<24} {before * 1000:>12.1f} {now * 1000:>12.1f} {ratio:>6.2f}{'  ช้าลง' if regressed else ''}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"regression {regressions} รายการ (เกณฑ์ x{args.threshold})")
+    return 1 if regressions else 0
+
+BENCHMARKS = {
+    "virtual_table": bench_virtual_table,
+    "search": bench_search,
+    "pdf": bench_pdf,
+    "pdf_context": bench_pdf_context,
+    "batch_export": bench_batch_export,
+    "import": bench_import,
+    "columnar": bench_columnar,
+    "save": bench_save,
+    "analytics": bench_analytics,
+    "money": bench_money,
+    "ledger": bench_ledger,
+    "statement": bench_statement,
+    "categorizer": bench_categorizer,
+    "catalog": bench_catalog,
+    "journal": bench_journal,
+    "diagnostics": bench_diagnostics,
+    "dates": bench_dates,
+    "locks": bench_locks,
+    "formats": bench_formats,
+    "charts": bench_charts,
+    "api": bench_api,
+}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["_pdf_worker"]:
+        _pdf_worker(sys.argv[2])
+        sys.exit()
+    if sys.argv[1:2] == ["api"] and sys.argv[2:]:
+        sys.exit(api_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["suite"]:
+        sys.exit(suite_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["generate"]:
+        n, path = parse_size(sys.argv[2]), sys.argv[3]
+        write_synthetic(path, n, int(sys.argv[4]) if len(sys.argv) > 4 else 0)
+        print(f"{path} ({n:,} รายการ)")
+        sys.exit()
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import report_core
+from money import to_satang, to_text
+from report_core import CATEGORY_OPTIONS, TYPES
+
+# งบประมาณต่อหมวดหลักตาม CATEGORY_OPTIONS (แยกตามประเภท เพราะ "อื่นๆ" มีทั้งรายรับและรายจ่าย)
+# บันทึกที่ REPORT_DIR/budgets.json: {ประเภท: {หมวดหลัก: "1234.50"}} ใช้ร่วมกันทุกรายงาน
+# หมวดที่ไม่มีงบไม่ต้องอยู่ในไฟล์ ค่าในหน่วยความจำเป็นสตางค์ อ่านไฟล์ใหม่เฉพาะเมื่อ (mtime_ns, ขนาด) เปลี่ยน
+
+BUDGET_NAME = "budgets.json"
+
+def budget_path(report_dir=None):
+    return os.path.join(report_dir or report_core.REPORT_DIR, BUDGET_NAME)
+
+_loaded = {}
+_lock = threading.Lock()
+
+# {ประเภท: {หมวดหลัก: สตางค์}} ยังไม่มีไฟล์ = ไม่มีงบ
+def load_budgets(report_dir=None):
+    path = budget_path(report_dir)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {kind: {} for kind in TYPES}
+    with _lock:
+        entry = _loaded.get(path)
+        if entry is not None and entry[0] == (st.st_mtime_ns, st.st_size):
+            return entry[1]
+    with open(path, encoding='utf-8') as f:
+        stored = json.load(f)
+    budgets = {kind: {main: to_satang(amount) for main, amount in stored.get(kind, {}).items()} for kind in TYPES}
+    with _lock:
+        _loaded[path] = ((st.st_mtime_ns, st.st_size), budgets)
+    return budgets
+
+# บันทึกทั้งชุด หมวดที่ไม่อยู่ใน CATEGORY_OPTIONS ของประเภทนั้น -> ValueError งบ 0/None = ไม่มีงบ
+def save_budgets(budgets, report_dir=None):
+    stored = {}
+    for kind in TYPES:
+        groups = stored[kind] = {}
+        for main, satang in budgets.get(kind, {}).items():
+            if main not in CATEGORY_OPTIONS[kind]:
+                raise ValueError(f"ไม่มีหมวด {main!r} ใน{kind}")
+            if satang:
+                groups[main] = to_text(satang)
+    path = budget_path(report_dir)
+    # ชื่อไฟล์ชั่วคราวไม่ซ้ำกันต่อ process/thread: สองเครื่องบันทึกพร้อมกันไม่เขียนลงไฟล์ชั่วคราวเดียวกัน
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def set_budget(kind, main, satang, report_dir=None):
+    budgets = {k: dict(groups) for k, groups in load_budgets(report_dir).items()}
+    budgets[kind][main] = satang
+    return save_budgets(budgets, report_dir)
+
+# เทียบงบกับยอดจริง (main_totals = {ประเภท: {หมวดหลัก: สตางค์}}) เฉพาะหมวดที่มีงบ ตามลำดับใน CATEGORY_OPTIONS
+# คืนแถว (ประเภท, หมวดหลัก, งบ, ยอดจริง, ส่วนต่าง) ส่วนต่างบวก = ดีกว่างบ ติดลบ = รายจ่ายเกินงบ / รายรับยังไม่ถึงเป้า
+def budget_rows(budgets, main_totals):
+    rows = []
+    for kind in TYPES:
+        for main in CATEGORY_OPTIONS[kind]:
+            budget = budgets.get(kind, {}).get(main)
+            if not budget:
+                continue
+            actual = main_totals.get(kind, {}).get(main, 0)
+            difference = budget - actual if kind == TYPES[1] else actual - budget
+            rows.append((kind, main, budget, actual, difference))
+    return rows
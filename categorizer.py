@@ -0,0 +1,195 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict, deque
+import report_core
+from statement_import import DEFAULT_CATEGORY
+
+# แนะนำหมวดหมู่จากรายละเอียด โดยเรียนรู้จากคู่ (รายละเอียด -> หมวดหมู่) ในรายงานที่มีอยู่
+# 1. ตัดรายละเอียดเป็นคำ (ช่องว่าง ตัวเลข และเครื่องหมาย) ได้ "คำค้น"
+# 2. คำค้นที่ส่วนใหญ่ (>= MIN_SHARE) อยู่ในหมวดเดียวกันของประเภทนั้นกลายเป็นกฎ
+# 3. กฎทั้งหมดคอมไพล์เป็น automaton แบบ Aho-Corasick: ค้นทุกคำค้นในข้อความได้ในการเดินผ่านข้อความรอบเดียว
+#    เวลาค้นขึ้นกับความยาวข้อความ ไม่ขึ้นกับจำนวนกฎ และหาคำภาษาไทยที่ไม่มีช่องว่างคั่นได้
+# คะแนนหมวด = ผลรวมของ share * ความยาวคำค้น * log(1 + จำนวนครั้ง) ของทุกคำค้นที่พบ
+
+MIN_SHARE = 0.6
+MIN_COUNT = 2
+MIN_LENGTH = 2
+_SPLIT = re.compile(r"[\s0-9๐-๙#.,:;/\\()\[\]{}\-_+*&@!?'\"|<>=~^%$]+")
+
+def tokens(text):
+    return [t for t in _SPLIT.split(text.lower()) if len(t) >= MIN_LENGTH]
+
+class Automaton:
+    def __init__(self, keywords):
+        # goto[state] = {ตัวอักษร: state ถัดไป}, out[state] = id ของคำค้นที่จบที่ state นี้ (รวมตาม fail link แล้ว)
+        goto = [{}]
+        out = [[]]
+        for kid, word in enumerate(keywords):
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(kid)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self.goto = goto
+        self.fail = fail
+        self.out = [tuple(o) for o in out]
+
+    # id ของทุกคำค้นที่พบในข้อความ (ซ้ำได้ถ้าพบหลายครั้ง)
+    def find(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        found = []
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+class Categorizer:
+    def __init__(self):
+        # counts[คำค้น][(ประเภท, หมวดหมู่)] = จำนวนครั้ง
+        self.counts = defaultdict(Counter)
+        self.keywords = []
+        self.rules = []
+        self.automaton = Automaton([])
+
+    def learn(self, rows):
+        counts = self.counts
+        for kind, category, detail, *_ in rows:
+            if not category:
+                continue
+            key = (kind, category)
+            for token in set(tokens(detail)):
+                counts[token][key] += 1
+        return self
+
+    # แปลงสถิติเป็นกฎแล้วสร้าง automaton ใหม่ (เรียกหลัง learn)
+    def compile(self):
+        keywords = []
+        rules = []
+        for token, counter in self.counts.items():
+            best = {}
+            per_kind = Counter()
+            for (kind, category), n in counter.items():
+                per_kind[kind] += n
+                if n > best.get(kind, (None, 0))[1]:
+                    best[kind] = (category, n)
+            rule = []
+            for kind, (category, n) in best.items():
+                share = n / per_kind[kind]
+                if n >= MIN_COUNT and share >= MIN_SHARE:
+                    rule.append((kind, category, share * len(token) * math.log1p(n)))
+            if rule:
+                keywords.append(token)
+                rules.append(tuple(rule))
+        self.keywords = keywords
+        self.rules = rules
+        self.automaton = Automaton(keywords)
+        return self
+
+    def __len__(self):
+        return len(self.keywords)
+
+    # หมวดที่แนะนำเรียงตามคะแนน [(หมวดหมู่, คะแนน)] ของประเภท kind (None = ทุกประเภท)
+    def scores(self, detail, kind=None):
+        totals = Counter()
+        rules = self.rules
+        for kid in set(self.automaton.find(detail.lower())):
+            for rule_kind, category, weight in rules[kid]:
+                if kind is None or rule_kind == kind:
+                    totals[category] += weight
+        return totals.most_common()
+
+    def suggest(self, detail, kind=None):
+        ranked = self.scores(detail, kind)
+        return ranked[0][0] if ranked else None
+
+    # แนะนำทีละหลายรายการ (ใช้กับการนำเข้า) items = [(รายละเอียด, ประเภท)] รายละเอียดซ้ำคำนวณครั้งเดียว
+    def suggest_many(self, items):
+        cache = {}
+        result = []
+        for item in items:
+            if item not in cache:
+                cache[item] = self.suggest(*item)
+            result.append(cache[item])
+        return result
+
+# ===== ตัวจัดหมวดที่เรียนรู้จากรายงานทั้งหมด (แคชไว้จนกว่ารายงานจะเปลี่ยน) =====
+def _reports_signature():
+    if report_core.STORAGE == "sqlite":
+        path = os.path.join(report_core.REPORT_DIR, "ledger.db")
+        paths = [path, path + "-wal"]
+    else:
+        try:
+            paths = sorted(e.path for e in os.scandir(report_core.REPORT_DIR) if e.name.endswith(".csv"))
+        except FileNotFoundError:
+            paths = []
+    signature = [report_core.REPORT_DIR, report_core.STORAGE]
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+_cached = (None, None)
+_cached_lock = threading.Lock()
+
+def learn_from_reports(names=None):
+    categorizer = Categorizer()
+    for name in names if names is not None else report_core.list_reports():
+        try:
+            categorizer.learn(report_core.iter_report(name))
+        except (OSError, ValueError, KeyError):
+            continue
+    return categorizer.compile()
+
+def get_categorizer():
+    global _cached
+    signature = _reports_signature()
+    with _cached_lock:
+        if _cached[0] == signature:
+            return _cached[1]
+    categorizer = learn_from_reports()
+    with _cached_lock:
+        _cached = (signature, categorizer)
+    return categorizer
+
+# ใช้กับ statement_import: กฎคำค้นที่กำหนดไว้ก่อน ถ้าไม่ตรงกฎใดใช้หมวดที่เรียนรู้จากรายงานเดิม
+class ImportCategorizer:
+    def __init__(self, rules, learned):
+        self.rules = rules
+        self.learned = learned
+        self.cache = {}
+
+    def categorize(self, payee, amount):
+        kind, category = self.rules.categorize(payee, amount)
+        if category != DEFAULT_CATEGORY:
+            return kind, category
+        key = (payee, kind)
+        if key not in self.cache:
+            if len(self.cache) >= self.rules.CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = self.learned.suggest(payee, kind) or category
+        return kind, self.cache[key]
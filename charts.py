@@ -0,0 +1,317 @@
+import os
+import report_core
+from diagnostics import span
+from money import to_satang
+from pdf_report import BOLD, REGULAR, register_fonts
+from report_core import CATEGORY_OPTIONS, TYPES
+
+# กราฟสรุปตามหมวดหลัก (แท่ง/วงกลม) และงบประมาณเทียบยอดจริง จากข้อมูลชุดเดียวกัน (summary_charts) วาดได้สองที่:
+#   PDF (หน้าสรุปท้ายรายงาน): Drawing ของ reportlab.graphics วาดลง canvas ด้วย renderPDF (vector ฟอนต์เดียวกับรายงาน)
+#   dashboard (UI.py): วาดลง tkinter.Canvas ตรง ๆ (สี่เหลี่ยม ชิ้นวงกลม ข้อความ) ไม่ต้องมี backend วาดภาพของ reportlab
+# ไม่มีแคชกราฟ: กราฟหนึ่งรูปใช้ราว 15 ms ใน PDF และไม่ถึงมิลลิวินาทีบน Tk
+# ส่วนที่ช้าคือยอดรวมหลายรายงาน ซึ่งมาจาก aggregate_cache อยู่แล้ว
+
+TOP_SLICES = 7
+LABEL_WIDTH = 170
+PALETTE = ["#4e79a7", "#f28e2b", "#e15759", "#76b7b2", "#59a14f", "#edc948", "#b07aa1", "#ff9da7", "#9c755f",
+           "#bab0ac"]
+KIND_COLORS = {TYPES[0]: "#59a14f", TYPES[1]: "#e15759"}
+BUDGET_COLOR = "#bab0ac"
+OVER_COLOR = "#e15759"
+WITHIN_COLOR = "#59a14f"
+
+# ===== ข้อมูล =====
+# {ประเภท: {"หลัก > ย่อย": สตางค์}} -> {ประเภท: {หมวดหลัก: สตางค์}}
+def main_totals(category_totals):
+    mains = {kind: {} for kind in TYPES}
+    for kind, groups in category_totals.items():
+        target = mains[TYPES[0] if kind == TYPES[0] else TYPES[1]]
+        for category, satang in groups.items():
+            main = category.split(">")[0].strip()
+            target[main] = target.get(main, 0) + satang
+    return mains
+
+# หมวดที่ยอดไม่เป็นศูนย์ เรียงตาม CATEGORY_OPTIONS แล้วตามด้วยหมวดอื่นที่พบในรายงาน
+def ordered_items(kind, totals):
+    known = [main for main in CATEGORY_OPTIONS[kind] if totals.get(main)]
+    return [[main, totals[main]] for main in known + sorted(set(totals) - set(known)) if totals[main]]
+
+# ยอดรวมตามหมวดหลักของหลายรายงาน (names=None: ทุกรายงาน) {ประเภท: {หมวดหลัก: สตางค์}}
+# CSV: รายชื่อและ stat จาก scandir ครั้งเดียว ยอดของแต่ละรายงานจาก aggregate_cache (อ่านใหม่เฉพาะไฟล์ที่เปลี่ยน)
+# SQLite: GROUP BY ครั้งเดียวทุกรายงาน
+def dashboard_totals(names=None, task=None):
+    wanted = set(names) if names is not None else None
+    mains = {kind: {} for kind in TYPES}
+    with span("dashboard_totals"):
+        if report_core.STORAGE == "sqlite":
+            for name, kind, category, amount in report_core._db().totals_by_report():
+                if wanted is None or name in wanted:
+                    target = mains[TYPES[0] if kind == TYPES[0] else TYPES[1]]
+                    main = category.split(">")[0].strip()
+                    target[main] = target.get(main, 0) + to_satang(amount)
+            return mains
+        from aggregate_cache import get_cache
+        cache = get_cache()
+        with os.scandir(report_core.REPORT_DIR) as it:
+            entries = [entry for entry in it if entry.name.endswith(".csv") and entry.is_file()
+                       and (wanted is None or entry.name[:-4] in wanted)]
+        cache.fit(len(entries))
+        try:
+            for i, entry in enumerate(entries, 1):
+                for kind, groups in cache.get(entry.path, entry.stat())["main"].items():
+                    target = mains[kind]
+                    for main, baht in groups.items():
+                        target[main] = target.get(main, 0) + to_satang(baht)
+                if task is not None and i % 200 == 0:
+                    task.check()
+                    task.set_status(f"รวมยอดแล้ว {i:,}/{len(entries):,} รายงาน")
+        finally:
+            cache.save()
+    return mains
+
+# ===== กราฟ reportlab =====
+def _color(value):
+    from reportlab.lib.colors import HexColor
+    return HexColor(value)
+
+def _baht_label(value):
+    return f"{value:,.0f}"
+
+def _title(drawing, text):
+    from reportlab.graphics.shapes import String
+    drawing.add(String(0, drawing.height - 14, text, fontName=BOLD, fontSize=16))
+
+def _empty(drawing, text="ไม่มีรายการ"):
+    from reportlab.graphics.shapes import String
+    drawing.add(String(drawing.width / 2, drawing.height / 2, text, fontName=REGULAR, fontSize=14,
+                       textAnchor="middle"))
+    return drawing
+
+def _style_axes(chart):
+    chart.categoryAxis.labels.fontName = REGULAR
+    chart.categoryAxis.labels.fontSize = 13
+    chart.valueAxis.labels.fontName = REGULAR
+    chart.valueAxis.labels.fontSize = 12
+    chart.valueAxis.labelTextFormat = _baht_label
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = _color("#dddddd")
+    chart.categoryAxis.visibleTicks = False
+
+# แท่งแนวนอนต่อหมวดหลัก data = {"title", "color", "items": [[หมวด, สตางค์], ...]}
+def bar_drawing(data, width, height):
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing
+    drawing = Drawing(width, height)
+    _title(drawing, data["title"])
+    items = data["items"]
+    if not items:
+        return _empty(drawing)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = LABEL_WIDTH, 20
+    chart.width, chart.height = width - LABEL_WIDTH - 60, height - 45
+    # แท่งแรกของ HorizontalBarChart อยู่ล่างสุด กลับลำดับให้หมวดแรกอยู่บน
+    chart.data = [[satang / 100 for _, satang in reversed(items)]]
+    chart.categoryAxis.categoryNames = [label for label, _ in reversed(items)]
+    _style_axes(chart)
+    if min(chart.data[0]) >= 0:
+        chart.valueAxis.valueMin = 0
+    chart.bars[0].fillColor = _color(data["color"])
+    chart.bars.strokeColor = None
+    chart.barLabelFormat = _baht_label
+    chart.barLabels.fontName = REGULAR
+    chart.barLabels.fontSize = 12
+    chart.barLabels.boxAnchor = "w"
+    chart.barLabels.dx = 3
+    drawing.add(chart)
+    return drawing
+
+# ชิ้นของวงกลม: TOP_SLICES หมวดแรกตามยอด ที่เหลือรวมเป็นชิ้นเดียว ตัดหมวดที่ยอดไม่เป็นบวก
+def pie_items(items):
+    items = sorted((item for item in items if item[1] > 0), key=lambda item: -item[1])
+    if len(items) > TOP_SLICES + 1:
+        rest = items[TOP_SLICES:]
+        items = items[:TOP_SLICES] + [[f"หมวดอื่น {len(rest)} หมวด", sum(satang for _, satang in rest)]]
+    return items
+
+def _pie_size(width, height):
+    return min(height - 40, width / 2 - 20)
+
+# วงกลมสัดส่วนต่อหมวดหลัก
+def pie_drawing(data, width, height):
+    from reportlab.graphics.charts.piecharts import Pie
+    from reportlab.graphics.shapes import Drawing, Rect, String
+    drawing = Drawing(width, height)
+    _title(drawing, data["title"])
+    items = pie_items(data["items"])
+    if not items:
+        return _empty(drawing)
+    total = sum(satang for _, satang in items)
+    size = _pie_size(width, height)
+    pie = Pie()
+    pie.x, pie.y = 10, (height - 20 - size) / 2
+    pie.width = pie.height = size
+    pie.data = [satang for _, satang in items]
+    pie.labels = None
+    pie.slices.strokeColor = _color("#ffffff")
+    pie.slices.strokeWidth = 1
+    for i in range(len(items)):
+        pie.slices[i].fillColor = _color(PALETTE[i % len(PALETTE)])
+    drawing.add(pie)
+    # คำอธิบายสีข้างวงกลม
+    x = size + 40
+    y = height - 40
+    step = min(22, (height - 50) / len(items))
+    for i, (label, satang) in enumerate(items):
+        drawing.add(Rect(x, y - 2, 10, 10, fillColor=_color(PALETTE[i % len(PALETTE)]), strokeColor=None))
+        drawing.add(String(x + 16, y, f"{label}  {satang * 100 / total:.1f}%", fontName=REGULAR, fontSize=13))
+        y -= step
+    return drawing
+
+def _budget_legend(expense):
+    return ((LABEL_WIDTH, BUDGET_COLOR, "งบประมาณ"), (LABEL_WIDTH + 90, WITHIN_COLOR, "ยอดจริง"),
+            (LABEL_WIDTH + 170, OVER_COLOR, "เกินงบ" if expense else "ต่ำกว่าเป้า"))
+
+# งบประมาณ (แท่งเทา) เทียบยอดจริง (เขียว = อยู่ในงบ/ถึงเป้า, แดง = เกินงบ/ต่ำกว่าเป้า)
+# data = {"title", "kind", "rows": [[หมวด, งบ, ยอดจริง], ...]} (สตางค์)
+def budget_drawing(data, width, height):
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing, Rect, String
+    drawing = Drawing(width, height)
+    _title(drawing, data["title"])
+    rows = data["rows"]
+    if not rows:
+        return _empty(drawing, "ยังไม่ได้กำหนดงบประมาณ")
+    chart = HorizontalBarChart()
+    chart.x, chart.y = LABEL_WIDTH, 20
+    chart.width, chart.height = width - LABEL_WIDTH - 60, height - 65
+    rows = rows[::-1]
+    chart.data = [[budget / 100 for _, budget, _ in rows], [actual / 100 for _, _, actual in rows]]
+    chart.categoryAxis.categoryNames = [label for label, _, _ in rows]
+    _style_axes(chart)
+    chart.valueAxis.valueMin = min(0, *chart.data[1])
+    chart.bars.strokeColor = None
+    chart.bars[0].fillColor = _color(BUDGET_COLOR)
+    expense = data["kind"] == TYPES[1]
+    for i, (_, budget, actual) in enumerate(rows):
+        good = actual <= budget if expense else actual >= budget
+        chart.bars[(1, i)].fillColor = _color(WITHIN_COLOR if good else OVER_COLOR)
+    chart.groupSpacing = 6
+    drawing.add(chart)
+    y = height - 36
+    for x, color, label in _budget_legend(expense):
+        drawing.add(Rect(x, y - 2, 10, 10, fillColor=_color(color), strokeColor=None))
+        drawing.add(String(x + 14, y, label, fontName=REGULAR, fontSize=13))
+    return drawing
+
+CHARTS = {"bar": bar_drawing, "pie": pie_drawing, "budget": budget_drawing}
+
+# ===== ชุดกราฟของหน้าสรุป =====
+# [(name, data), ...] จากยอดตามหมวดหลักและงบ: แท่งรายรับ แท่งรายจ่าย วงกลมรายจ่าย และงบเทียบยอดจริงของประเภทที่มีงบ
+def summary_charts(mains, budgets):
+    from budgets import budget_rows
+    specs = []
+    for kind in TYPES:
+        specs.append(("bar", {"title": f"{kind}ตามหมวดหมู่", "color": KIND_COLORS[kind],
+                              "items": ordered_items(kind, mains[kind])}))
+    specs.append(("pie", {"title": f"สัดส่วน{TYPES[1]}", "items": ordered_items(TYPES[1], mains[TYPES[1]])}))
+    rows = budget_rows(budgets, mains)
+    for kind in TYPES:
+        kind_rows = [[main, budget, actual] for k, main, budget, actual, _ in rows if k == kind]
+        if kind_rows:
+            specs.append(("budget", {"title": f"งบประมาณเทียบยอดจริง ({kind})", "kind": kind, "rows": kind_rows}))
+    return specs
+
+# ความสูงของกราฟตามจำนวนหมวด (แท่งละ ~22 point)
+def chart_height(name, data):
+    if name == "pie":
+        return 220
+    lines = len(data["items"]) if name == "bar" else 2 * len(data["rows"])
+    return max(120, min(600, 60 + 22 * lines))
+
+
+# ===== วาด =====
+# กราฟ name ลง canvas ของ reportlab ที่ (x, y) มุมซ้ายล่าง ขนาด width x height point
+def draw_pdf(name, data, c, x, y, width, height):
+    from reportlab.graphics import renderPDF
+    with span("chart_" + name):
+        register_fonts()
+        renderPDF.draw(CHARTS[name](data, width, height), c, x, y)
+
+TK_TITLE = ("TH Sarabun New", -16, "bold")
+TK_LABEL = ("TH Sarabun New", -13)
+TK_VALUE = ("TH Sarabun New", -12)
+
+# กราฟ name ลง tkinter.Canvas ที่ (x, y) มุมซ้ายบน ขนาด width x height pixel ทุกชิ้นติด tag
+# แบบย่อของกราฟใน PDF: แท่ง ชิ้นวงกลม ป้ายหมวดและยอด ไม่มีแกนและเส้นตาราง
+def draw_tk(name, data, canvas, x, y, width, height, tag="chart"):
+    canvas.create_text(x, y, text=data["title"], anchor="nw", font=TK_TITLE, tags=tag)
+    if name == "bar":
+        if data["items"]:
+            rows = [(label, [(satang, data["color"])]) for label, satang in data["items"]]
+            _tk_bars(canvas, rows, x, y + 30, width, y + height - 10, tag)
+        else:
+            _tk_empty(canvas, x, y, width, height, tag)
+    elif name == "pie":
+        _tk_pie(data, canvas, x, y, width, height, tag)
+    elif data["rows"]:
+        expense = data["kind"] == TYPES[1]
+        for lx, color, label in _budget_legend(expense):
+            canvas.create_rectangle(x + lx, y + 28, x + lx + 10, y + 38, fill=color, outline="", tags=tag)
+            canvas.create_text(x + lx + 14, y + 33, text=label, anchor="w", font=TK_LABEL, tags=tag)
+        rows = [(label, [(budget, BUDGET_COLOR),
+                         (actual, WITHIN_COLOR if (actual <= budget if expense else actual >= budget) else OVER_COLOR)])
+                for label, budget, actual in data["rows"]]
+        _tk_bars(canvas, rows, x, y + 50, width, y + height - 10, tag, values=False)
+    else:
+        _tk_empty(canvas, x, y, width, height, tag, "ยังไม่ได้กำหนดงบประมาณ")
+
+def _tk_empty(canvas, x, y, width, height, tag, text="ไม่มีรายการ"):
+    canvas.create_text(x + width / 2, y + height / 2, text=text, font=TK_LABEL, tags=tag)
+
+# แท่งแนวนอน rows = [(ป้าย, [(สตางค์, สี), ...]), ...] หนึ่งช่องต่อหมวด (หลายแท่งต่อช่องได้) ค่าติดลบอยู่ซ้ายเส้นศูนย์
+def _tk_bars(canvas, rows, x, top, width, bottom, tag, values=True):
+    amounts = [satang for _, bars in rows for satang, _ in bars]
+    low, high = min(0, *amounts), max(0, *amounts)
+    left, right = x + LABEL_WIDTH, x + width - 60
+    scale = (right - left) / ((high - low) or 1)
+    zero = left - low * scale
+    slot = (bottom - top) / len(rows)
+    thickness = slot * 0.7 / len(rows[0][1])
+    for i, (label, bars) in enumerate(rows):
+        canvas.create_text(left - 6, top + (i + 0.5) * slot, text=label, anchor="e", font=TK_LABEL, tags=tag)
+        y0 = top + i * slot + slot * 0.15
+        for satang, color in bars:
+            end = zero + satang * scale
+            canvas.create_rectangle(min(zero, end), y0, max(zero, end), y0 + thickness, fill=color, outline="",
+                                    tags=tag)
+            if values:
+                canvas.create_text(end + (3 if satang >= 0 else -3), y0 + thickness / 2, text=_baht_label(satang / 100),
+                                   anchor="w" if satang >= 0 else "e", font=TK_VALUE, tags=tag)
+            y0 += thickness
+    canvas.create_line(zero, top, zero, bottom, fill="#888888", tags=tag)
+
+# วงกลมเริ่มที่ 12 นาฬิกาเวียนตามเข็ม แบบเดียวกับ Pie ของ reportlab
+def _tk_pie(data, canvas, x, y, width, height, tag):
+    items = pie_items(data["items"])
+    if not items:
+        return _tk_empty(canvas, x, y, width, height, tag)
+    total = sum(satang for _, satang in items)
+    size = _pie_size(width, height)
+    left, top = x + 10, y + (height + 20 - size) / 2
+    start = 90.0
+    for i, (_, satang) in enumerate(items):
+        color = PALETTE[i % len(PALETTE)]
+        if len(items) == 1:
+            canvas.create_oval(left, top, left + size, top + size, fill=color, outline="#ffffff", tags=tag)
+            break
+        extent = -360.0 * satang / total
+        canvas.create_arc(left, top, left + size, top + size, start=start, extent=extent, style="pieslice",
+                          fill=color, outline="#ffffff", tags=tag)
+        start += extent
+    lx, ly = x + size + 40, y + 40
+    step = min(22, (height - 50) / len(items))
+    for i, (label, satang) in enumerate(items):
+        canvas.create_rectangle(lx, ly - 5, lx + 10, ly + 5, fill=PALETTE[i % len(PALETTE)], outline="", tags=tag)
+        canvas.create_text(lx + 16, ly, text=f"{label}  {satang * 100 / total:.1f}%", anchor="w", font=TK_LABEL,
+                           tags=tag)
+        ly += step
@@ -0,0 +1,338 @@
+import argparse
+import csv
+import os
+import sys
+import diagnostics
+import report_core
+import dates
+from money import format_satang, normalize, to_satang
+from report_core import (TYPES, append_report, create_report, report_exists, report_path, store_report,
+                         summarize_report)
+
+# คำสั่งแบบไม่มีหน้าจอ: python cli.py <list|create|append|import-statement|suggest|summarize|range|convert|migrate|totals|compare|export-pdf|export|import-file|budget> ...
+# reportlab ถูก import เฉพาะตอน export-pdf
+
+def _parse_entries(args):
+    rows = []
+    for kind, category, detail, amount in args.entry or []:
+        rows.append(_check_row([kind, category, detail, amount, args.date or ""]))
+    if args.from_csv:
+        with open(args.from_csv, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header and header not in (report_core.HEADER, report_core.DATED_HEADER):
+                rows.append(_check_row(header))
+            for row in reader:
+                rows.append(_check_row(row))
+    return rows
+
+def _check_row(row):
+    if len(row) not in (4, 5):
+        raise SystemExit(f"แถวต้องมี 4 หรือ 5 ช่อง (ประเภท หมวดหมู่ รายละเอียด จำนวนเงิน [วันที่]): {row}")
+    kind, category, detail, amount = row[:4]
+    if kind not in TYPES:
+        raise SystemExit(f"ประเภทต้องเป็น {' หรือ '.join(TYPES)}: {kind}")
+    try:
+        amount = normalize(amount)
+    except ValueError:
+        raise SystemExit(f"จำนวนเงินต้องเป็นตัวเลข: {amount}")
+    try:
+        date = dates.normalize(row[4]) if len(row) > 4 else ""
+    except ValueError as e:
+        raise SystemExit(str(e))
+    return [kind, category, detail, amount, date]
+
+def _period(args):
+    try:
+        return dates.period(args.start, args.end)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+def cmd_list(args):
+    from report_catalog import list_catalog, query
+    total, page = query(list_catalog(), args.filter, args.sort, args.desc,
+                        (args.page - 1) * args.page_size, args.page_size)
+    for info in page:
+        when = f"{info.first_date} - {info.last_date}" if info.first_date else ""
+        balance = format_satang(info.balance) if info.balance is not None else "อ่านไม่ได้"
+        print(f"{info.name:<30} {info.rows or 0:>10,} {when:<23} {balance:>15}")
+    pages = max(1, -(-total // args.page_size))
+    print(f"หน้า {args.page}/{pages} ({total:,} รายงาน)")
+
+def cmd_create(args):
+    rows = _parse_entries(args)
+    if args.overwrite:
+        print(store_report(args.name, rows), f"({len(rows)} รายการ)")
+        return
+    try:
+        print(create_report(args.name, rows), f"({len(rows)} รายการ)")
+    except FileExistsError:
+        raise SystemExit(f"มีรายงานชื่อ '{args.name}' อยู่แล้ว (ใช้ --overwrite เพื่อเขียนทับ)") from None
+
+def cmd_append(args):
+    if not report_exists(args.name):
+        raise SystemExit(f"ไม่พบรายงาน '{args.name}'")
+    rows = _parse_entries(args)
+    print(append_report(args.name, rows), f"(+{len(rows)} รายการ)")
+
+def cmd_summarize(args):
+    if args.columnar:
+        from columnar import open_report
+        with open_report(report_path(args.name)) as report:
+            totals, count = report.totals(), len(report)
+    else:
+        totals, count = summarize_report(args.name)
+    for kind in TYPES:
+        print(kind)
+        for category, amount in totals[kind].items():
+            print(f"  {category:<40} {format_satang(to_satang(amount)):>15}")
+        print(f"  {'รวม' + kind:<40} {format_satang(sum(map(to_satang, totals[kind].values()))):>15}")
+    diff = sum(map(to_satang, totals["รายรับ"].values())) - sum(map(to_satang, totals["รายจ่าย"].values()))
+    print(f"{'รายรับ - รายจ่าย':<42} {format_satang(diff):>15}")
+    print(f"{count} รายการ")
+
+# รายการในช่วงวันที่จากหลายรายงาน (CSV อ่านเฉพาะพาร์ทิชันเดือนที่เกี่ยว) พร้อมยอดรวม
+def cmd_range(args):
+    from date_partitions import range_rows
+    start, end = _period(args)
+    totals = {kind: 0 for kind in TYPES}
+    count = 0
+    for name in args.name or report_core.list_reports():
+        for row in range_rows(name, start, end, args.type, args.category):
+            satang = to_satang(row[3])
+            totals[row[0] if row[0] in totals else TYPES[1]] += satang
+            count += 1
+            if not args.totals_only:
+                print(f"{row[4]}  {name:<20} {row[0]:<8} {row[1]:<40} {row[2]:<30} {format_satang(satang):>15}")
+    print(f"ช่วงวันที่ {dates.describe(start, end)}: {count:,} รายการ")
+    for kind in TYPES:
+        print(f"  รวม{kind:<10} {format_satang(totals[kind]):>15}")
+
+def cmd_convert(args):
+    from columnar import EXTENSION, columnar_to_csv, csv_to_columnar
+    if args.to == "columnar":
+        print(csv_to_columnar(report_path(args.name)))
+    else:
+        print(columnar_to_csv(os.path.join(report_core.REPORT_DIR, args.name + EXTENSION)))
+
+def cmd_migrate(args):
+    from ledger_db import get_db
+
+    def progress(done, total, path, count):
+        print(f"[{done}/{total}] {os.path.basename(path)} ({count} รายการ)", flush=True)
+
+    count = get_db().migrate_dir(report_core.REPORT_DIR, progress)
+    print(f"นำเข้า {count} รายงานไปยัง SQLite แล้ว")
+
+def cmd_totals(args):
+    from ledger_db import get_db
+    for name, kind, category, amount in get_db().totals_by_report(args.type, args.category):
+        print(f"{name:<30} {kind:<8} {category:<40} {amount:>15,.2f}")
+
+def cmd_import_statement(args):
+    from statement_import import import_statement, load_rules
+    rules = load_rules(args.rules) if args.rules else None
+    for path in args.path:
+        stats = import_statement(args.name, path, rules, args.date_order, learn=args.learn)
+        print(f"{os.path.basename(path)}: อ่าน {stats['read']:,} นำเข้า {stats['imported']:,} "
+              f"ซ้ำ {stats['duplicates']:,} ข้าม {stats['skipped']:,}")
+
+def cmd_suggest(args):
+    from categorizer import get_categorizer
+    categorizer = get_categorizer()
+    for detail in args.detail:
+        ranked = categorizer.scores(detail, args.type)[:3]
+        print(f"{detail}: " + (",  ".join(f"{c} ({score:.1f})" for c, score in ranked) or "-"))
+
+def cmd_compare(args):
+    from analytics import MultiReport
+    multi = MultiReport(args.name)
+    if args.output:
+        print(multi.export_csv(args.output, args.level))
+        return
+    for name, kind, group, total, delta in multi.summary_rows(args.level):
+        print(f"{name:<30} {kind:<8} {group:<40} {total:>15,.2f} {delta:>+15,.2f}")
+    for group, amount in multi.top_n(args.top, "รายจ่าย", args.level):
+        print(f"รายจ่ายสูงสุด: {group:<40} {amount:>15,.2f}")
+
+def cmd_export_pdf(args):
+    if args.all and (args.start or args.end):
+        raise SystemExit("--from/--to ใช้กับรายงานที่ระบุชื่อเท่านั้น")
+    if args.all:
+        import batch_export
+        return batch_export.main(["--dir", report_core.REPORT_DIR] + (["--force"] if args.force else []))
+    if not args.name:
+        raise SystemExit("ระบุชื่อรายงาน หรือใช้ --all")
+    from pdf_report import generate_pdf
+    period = _period(args) if args.start or args.end else None
+    for name in args.name:
+        print(generate_pdf(name, period))
+
+# ส่งออก/นำเข้าไฟล์ CSV/XLSX/JSON lines/Parquet (รูปแบบจากนามสกุลไฟล์หรือ --format)
+def cmd_export(args):
+    import report_formats
+    if not report_exists(args.name):
+        raise SystemExit(f"ไม่พบรายงาน '{args.name}'")
+    period = _period(args) if args.start or args.end else None
+    try:
+        count = report_formats.export_report(args.name, args.path, args.format, period)
+    except (ValueError, ModuleNotFoundError) as e:
+        raise SystemExit(str(e))
+    print(args.path, f"({count:,} รายการ)")
+
+def cmd_import_file(args):
+    import report_formats
+    try:
+        count = report_formats.import_report(args.name, args.path, args.format, args.replace)
+    except FileExistsError:
+        raise SystemExit(f"มีรายงานชื่อ '{args.name}' อยู่แล้ว (ใช้ --replace เพื่อเขียนทับ)") from None
+    except (ValueError, ModuleNotFoundError) as e:
+        raise SystemExit(str(e))
+    print(args.name, f"({count:,} รายการ)")
+
+# งบประมาณต่อหมวดหลักเทียบยอดจริงของรายงานที่ระบุ (ไม่ระบุ = ทุกรายงาน) --set ตั้งงบ (0 = ยกเลิก)
+def cmd_budget(args):
+    from budgets import budget_rows, load_budgets, set_budget
+    from charts import dashboard_totals
+    if args.set:
+        kind, main, amount = args.set
+        try:
+            print(set_budget(kind, main, to_satang(amount)))
+        except ValueError as e:
+            raise SystemExit(str(e))
+        return
+    rows = budget_rows(load_budgets(), dashboard_totals(args.name or None))
+    if not rows:
+        print("ยังไม่ได้ตั้งงบประมาณ (ใช้ --set ประเภท หมวดหลัก จำนวนเงิน)")
+        return
+    print(f"{'ประเภท':<10}{'หมวดหลัก':<30}{'งบประมาณ':>16}{'ยอดจริง':>16}{'ส่วนต่าง':>16}")
+    for kind, main, budget, actual, difference in rows:
+        print(f"{kind:<10}{main:<30}{format_satang(budget):>16}{format_satang(actual):>16}"
+              f"{format_satang(difference):>16}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="ระบบรายรับรายจ่าย (ไม่มีหน้าจอ)")
+    parser.add_argument("--dir", default=report_core.REPORT_DIR, help="โฟลเดอร์รายงาน")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default=report_core.STORAGE,
+                        help="ที่เก็บรายงาน (ค่าเริ่มต้นจาก LEDGER_STORAGE)")
+    parser.add_argument("--trace", metavar="ไฟล์.jsonl", help="จับเวลาแต่ละขั้นตอนแล้วเขียนลงไฟล์ (JSON หนึ่งบรรทัดต่อหนึ่ง span)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def entry_options(p):
+        p.add_argument("name", help="ชื่อรายงาน (ไม่ต้องใส่ .csv)")
+        p.add_argument("--entry", nargs=4, action="append",
+                       metavar=("ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"), help="เพิ่มหนึ่งรายการ (ใช้ซ้ำได้)")
+        p.add_argument("--from-csv", help="อ่านรายการจากไฟล์ CSV 4 คอลัมน์ (หรือ 5 คอลัมน์ที่มีวันที่)")
+        p.add_argument("--date", help="วันที่ของรายการจาก --entry (YYYY-MM-DD หรือ วัน/เดือน/ปี)")
+
+    p = sub.add_parser("list", help="รายชื่อรายงานพร้อมจำนวนรายการ ช่วงวันที่ และยอดคงเหลือ")
+    p.add_argument("--filter", default="", help="กรองเฉพาะชื่อที่มีข้อความนี้")
+    p.add_argument("--sort", choices=["name", "modified", "size", "rows", "date", "balance"], default="name")
+    p.add_argument("--desc", action="store_true", help="เรียงจากมากไปน้อย")
+    p.add_argument("--page", type=int, default=1)
+    p.add_argument("--page-size", type=int, default=50)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("create", help="สร้างรายงานใหม่")
+    entry_options(p)
+    p.add_argument("--overwrite", action="store_true", help="เขียนทับถ้ามีรายงานชื่อนี้อยู่แล้ว")
+    p.set_defaults(func=cmd_create)
+
+    p = sub.add_parser("append", help="ต่อท้ายรายการในรายงานเดิม")
+    entry_options(p)
+    p.set_defaults(func=cmd_append)
+
+    p = sub.add_parser("summarize", help="สรุปยอดตามหมวดหมู่")
+    p.add_argument("name", help="ชื่อรายงาน (ไม่ต้องใส่ .csv)")
+    p.add_argument("--columnar", action="store_true", help="อ่านจากไฟล์ .ledger (แปลงจาก CSV ให้อัตโนมัติ)")
+    p.set_defaults(func=cmd_summarize)
+
+    def period_options(p):
+        p.add_argument("--from", dest="start", help="วันแรก: YYYY, YYYY-MM หรือ YYYY-MM-DD")
+        p.add_argument("--to", dest="end", help="วันสุดท้าย: YYYY, YYYY-MM (ทั้งเดือน) หรือ YYYY-MM-DD")
+
+    p = sub.add_parser("range", help="รายการในช่วงวันที่ (เช่น รายจ่ายหมวดหนึ่งตั้งแต่ ม.ค.-มี.ค.)")
+    p.add_argument("name", nargs="*", help="ชื่อรายงาน (ไม่ระบุ = ทุกรายงาน)")
+    period_options(p)
+    p.add_argument("--type", choices=TYPES)
+    p.add_argument("--category", help="หมวดหลัก (รวมหมวดย่อย) หรือ \"หลัก > ย่อย\"")
+    p.add_argument("--totals-only", action="store_true", help="แสดงเฉพาะยอดรวม")
+    p.set_defaults(func=cmd_range)
+
+    p = sub.add_parser("convert", help="แปลงรายงานระหว่าง CSV กับไฟล์คอลัมน์ .ledger")
+    p.add_argument("name", help="ชื่อรายงาน (ไม่ต้องใส่นามสกุล)")
+    p.add_argument("--to", choices=["columnar", "csv"], default="columnar")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("migrate", help="นำเข้า reports/*.csv ทั้งหมดไปยัง SQLite (ledger.db)")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("totals", help="ยอดรวมข้ามทุกรายงานจาก SQLite แยกตามประเภท/หมวดหมู่")
+    p.add_argument("--type", choices=TYPES)
+    p.add_argument("--category")
+    p.set_defaults(func=cmd_totals)
+
+    p = sub.add_parser("import-statement", help="นำเข้ารายการเดินบัญชี (CSV/OFX/QFX/QIF) ต่อท้ายรายงาน")
+    p.add_argument("name", help="ชื่อรายงาน (สร้างใหม่ถ้ายังไม่มี)")
+    p.add_argument("path", nargs="+", help="ไฟล์รายการเดินบัญชี")
+    p.add_argument("--rules", help="CSV กฎจัดหมวดหมู่: คำค้น[,ประเภท],หมวดหมู่")
+    p.add_argument("--date-order", choices=["dmy", "mdy"], default="dmy", help="ลำดับวัน/เดือนในไฟล์")
+    p.add_argument("--learn", action="store_true", help="รายการที่ไม่ตรงกฎ ใช้หมวดที่เรียนรู้จากรายงานเดิม")
+    p.set_defaults(func=cmd_import_statement)
+
+    p = sub.add_parser("suggest", help="แนะนำหมวดหมู่จากรายละเอียด (เรียนรู้จากรายงานเดิม)")
+    p.add_argument("detail", nargs="+")
+    p.add_argument("--type", choices=TYPES)
+    p.set_defaults(func=cmd_suggest)
+
+    p = sub.add_parser("compare", help="สรุปและเทียบยอดหลายรายงาน (ต้องมี numpy)")
+    p.add_argument("name", nargs="+", help="ชื่อรายงานเรียงตามลำดับเดือน")
+    p.add_argument("--level", choices=["main", "category"], default="main", help="รวมตามหมวดหลักหรือหมวดย่อย")
+    p.add_argument("--top", type=int, default=5, help="จำนวนหมวดรายจ่ายสูงสุดที่แสดง")
+    p.add_argument("--output", help="บันทึกตารางสรุปเป็น CSV แทนการพิมพ์")
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("export-pdf", help="แปลงรายงานเป็น PDF")
+    p.add_argument("name", nargs="*", help="ชื่อรายงาน (ไม่ต้องใส่ .csv)")
+    p.add_argument("--all", action="store_true", help="แปลงทุกรายงานพร้อมกันหลาย process")
+    p.add_argument("--force", action="store_true", help="ใช้กับ --all: แปลงใหม่แม้ PDF จะใหม่กว่า CSV")
+    period_options(p)
+    p.set_defaults(func=cmd_export_pdf)
+
+    from report_formats import FORMATS
+    p = sub.add_parser("export", help="ส่งออกรายงานเป็น CSV/XLSX/JSON lines/Parquet")
+    p.add_argument("name", help="ชื่อรายงาน (ไม่ต้องใส่ .csv)")
+    p.add_argument("path", help="ไฟล์ปลายทาง (รูปแบบตามนามสกุล)")
+    p.add_argument("--format", choices=list(FORMATS), help="ระบุรูปแบบแทนการดูจากนามสกุล")
+    period_options(p)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import-file", help="สร้างรายงานจากไฟล์ CSV/XLSX/JSON lines/Parquet ที่ส่งออกไว้")
+    p.add_argument("name", help="ชื่อรายงานใหม่")
+    p.add_argument("path", help="ไฟล์ต้นทาง (รูปแบบตามนามสกุล)")
+    p.add_argument("--format", choices=list(FORMATS), help="ระบุรูปแบบแทนการดูจากนามสกุล")
+    p.add_argument("--replace", action="store_true", help="เขียนทับถ้ามีรายงานชื่อนี้อยู่แล้ว")
+    p.set_defaults(func=cmd_import_file)
+
+    p = sub.add_parser("budget", help="งบประมาณต่อหมวดหลักเทียบยอดจริง หรือตั้งงบด้วย --set")
+    p.add_argument("name", nargs="*", help="ชื่อรายงานที่รวมยอดจริง (ไม่ระบุ = ทุกรายงาน)")
+    p.add_argument("--set", nargs=3, metavar=("ประเภท", "หมวดหลัก", "จำนวนเงิน"), help="ตั้งงบ (0 = ยกเลิกงบหมวดนั้น)")
+    p.set_defaults(func=cmd_budget)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report_core.REPORT_DIR = args.dir
+    report_core.STORAGE = args.storage
+    if args.trace:
+        diagnostics.enable(args.trace)
+    try:
+        return args.func(args) or 0
+    finally:
+        if args.trace:
+            # ปิดท้ายด้วยสรุปรวมของทุก span/ตัวนับ
+            diagnostics.write_snapshot(args.trace)
+            diagnostics.disable()
+
+if __name__ == "__main__":
+    sys.exit(main())
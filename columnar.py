@@ -0,0 +1,189 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+import dates
+from money import to_baht, to_satang, to_text
+from report_core import DATED_HEADER, TYPES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# รูปแบบไฟล์ .ledger แบบคอลัมน์ (เก็บ 5 คอลัมน์เดียวกับ CSV)
+#   header   : MAGIC, version, จำนวนแถว, ตำแหน่งเริ่มของแต่ละส่วน
+#   หมวดหมู่  : dictionary ของชื่อหมวดหมู่ (utf-8) แต่ละแถวเก็บเป็นรหัส uint32
+#   ประเภท   : uint8 (index ใน TYPES)
+#   จำนวนเงิน : int64 หน่วยสตางค์ (ตั้งแต่ version 2 ไฟล์ version 1 ที่เป็น float64 จะถูกสร้างใหม่จาก CSV)
+#   วันที่     : uint32 เลขวัน (dates.to_ordinal, 0 = ไม่มี) ตั้งแต่ version 3
+#   รายละเอียด: offset uint64 (n + 1 ตัว) + ข้อความ utf-8 ต่อกัน
+# ทุกคอลัมน์เริ่มที่ตำแหน่งหาร 8 ลงตัว อ่านผ่าน mmap + memoryview.cast ได้โดยไม่ต้อง copy
+
+MAGIC = b"LDG1"
+VERSION = 3
+EXTENSION = ".ledger"
+_HEADER = struct.Struct("<4sIQQQQQQQQ")
+
+if sys.byteorder != "little":
+    raise ImportError("columnar รองรับเฉพาะเครื่อง little-endian")
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % 8))
+
+def write_columnar(path, rows):
+    types = array('B')
+    cats = array('I')
+    amounts = array('q')
+    days = array('I')
+    det_offsets = array('Q', [0])
+    details = bytearray()
+    categories = {}
+
+    for row in rows:
+        kind, category, detail, amount = row[:4]
+        date = dates.row_date(row)
+        types.append(0 if kind == TYPES[0] else 1)
+        code = categories.get(category)
+        if code is None:
+            code = categories[category] = len(categories)
+        cats.append(code)
+        amounts.append(to_satang(amount))
+        days.append(dates.to_ordinal(date))
+        details += detail.encode("utf-8")
+        det_offsets.append(len(details))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        _pad(f)
+        dict_off = f.tell()
+        f.write(struct.pack("<I", len(categories)))
+        for name in categories:
+            data = name.encode("utf-8")
+            f.write(struct.pack("<I", len(data)) + data)
+        offsets = []
+        for column in (types, cats, amounts, days, det_offsets):
+            _pad(f)
+            offsets.append(f.tell())
+            column.tofile(f)
+        offsets.append(f.tell())
+        f.write(details)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(types), dict_off, *offsets))
+    os.replace(tmp_path, path)
+    return path
+
+# อ่านไฟล์ .ledger ผ่าน mmap คอลัมน์ตัวเลขเป็น memoryview ชี้เข้าไฟล์ตรง ๆ
+class ColumnarReport:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = struct.unpack_from("<4sI", self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"ไม่ใช่ไฟล์ {EXTENSION}: {path}")
+        _, _, n, dict_off, type_off, cat_off, amt_off, date_off, det_off, blob_off = \
+            _HEADER.unpack_from(self._mm, 0)
+        self.n = n
+
+        (count,) = struct.unpack_from("<I", self._mm, dict_off)
+        pos = dict_off + 4
+        self.categories = []
+        for _ in range(count):
+            (size,) = struct.unpack_from("<I", self._mm, pos)
+            self.categories.append(self._mm[pos + 4:pos + 4 + size].decode("utf-8"))
+            pos += 4 + size
+
+        mv = self._view = memoryview(self._mm)
+        self.types = mv[type_off:type_off + n].cast('B')
+        self.cats = mv[cat_off:cat_off + 4 * n].cast('I')
+        self.amounts = mv[amt_off:amt_off + 8 * n].cast('q')
+        self.dates = mv[date_off:date_off + 4 * n].cast('I')
+        self.det_offsets = mv[det_off:det_off + 8 * (n + 1)].cast('Q')
+        self._blob_off = blob_off
+
+    def __len__(self):
+        return self.n
+
+    def detail(self, i):
+        start = self._blob_off + self.det_offsets[i]
+        end = self._blob_off + self.det_offsets[i + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def row(self, i):
+        return [TYPES[self.types[i]], self.categories[self.cats[i]], self.detail(i), to_text(self.amounts[i]),
+                dates.to_text(self.dates[i])]
+
+    def rows(self):
+        for i in range(self.n):
+            yield self.row(i)
+
+    # ยอดรวม {ประเภท: {หมวดหมู่: ยอด}} รูปแบบเดียวกับ report_core.summarize
+    # bincount รวมเป็น float64 แต่ทุกค่าเป็นจำนวนเต็มสตางค์ จึงตรงทุกหลักจนถึง 2**53 สตางค์
+    def totals(self):
+        k = len(self.categories)
+        if np is not None and self.n:
+            types = np.frombuffer(self.types, dtype=np.uint8)
+            cats = np.frombuffer(self.cats, dtype=np.uint32).astype(np.intp)
+            amounts = np.frombuffer(self.amounts, dtype=np.int64)
+            sums = np.bincount(types.astype(np.intp) * k + cats, weights=amounts, minlength=2 * k)
+            sums = sums.reshape(2, k)
+            present = np.bincount(types.astype(np.intp) * k + cats, minlength=2 * k).reshape(2, k)
+            return {t: {self.categories[c]: to_baht(int(sums[ti, c])) for c in range(k) if present[ti, c]}
+                    for ti, t in enumerate(TYPES)}
+
+        sums = [[0] * k, [0] * k]
+        present = [[False] * k, [False] * k]
+        for t, c, a in zip(self.types, self.cats, self.amounts):
+            sums[t][c] += a
+            present[t][c] = True
+        return {t: {self.categories[c]: to_baht(sums[ti][c]) for c in range(k) if present[ti][c]}
+                for ti, t in enumerate(TYPES)}
+
+    def close(self):
+        for name in ("types", "cats", "amounts", "dates", "det_offsets", "_view"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _csv_rows(csv_path):
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            yield row
+
+def csv_to_columnar(csv_path, path=None):
+    path = path or os.path.splitext(csv_path)[0] + EXTENSION
+    return write_columnar(path, _csv_rows(csv_path))
+
+def columnar_to_csv(path, csv_path=None):
+    csv_path = csv_path or os.path.splitext(path)[0] + ".csv"
+    with ColumnarReport(path) as report, open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(DATED_HEADER)
+        writer.writerows(report.rows())
+    return csv_path
+
+# เปิดรายงานแบบคอลัมน์จาก CSV ถ้า .ledger ยังไม่มี เก่ากว่า CSV หรือเป็น version เก่า จะแปลงให้ก่อน
+def open_report(csv_path):
+    path = os.path.splitext(csv_path)[0] + EXTENSION
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(csv_path):
+        csv_to_columnar(csv_path, path)
+    try:
+        return ColumnarReport(path)
+    except ValueError:
+        csv_to_columnar(csv_path, path)
+        return ColumnarReport(path)
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from bisect import bisect_left
+import report_core
+from dates import is_iso, row_date, to_text
+from diagnostics import count, span
+
+# พาร์ทิชันรายเดือนของรายงาน CSV สำหรับค้นตามช่วงวันที่โดยไม่ต้องอ่านรายงานทั้งไฟล์
+# REPORT_DIR/.partitions/<ชื่อรายงาน>/
+#   YYYY-MM.csv  แถว 5 คอลัมน์ที่วันที่อยู่ในเดือนนั้น เรียงตามวันที่ (วันเดียวกันคงลำดับเดิมในรายงาน) ไม่มีหัวตาราง
+#   index.json   {"stamp": [mtime_ns, ขนาด], "rows": จำนวนแถวทั้งรายงาน, "undated": แถวที่ไม่มีวันที่,
+#                 "months": {"YYYY-MM": {"rows": n, "days": [[วัน, offset ไบต์ของแถวแรกของวันนั้น], ...]}}}
+# "days" คือสารบัญวันที่ที่เรียงแล้วของแต่ละเดือน: ค้นช่วง ม.ค.-มี.ค. เปิดแค่ 3 ไฟล์ เดือนที่ช่วงเริ่มกลางเดือน
+# bisect หาวันแรกแล้ว seek ไปอ่านจากตรงนั้น และหยุดอ่านทันทีที่เลยวันสุดท้ายของช่วง
+#
+# สร้างใหม่เมื่อ (mtime_ns, ขนาด) ของรายงานเปลี่ยน แบบเดียวกับ aggregate_cache / report_catalog
+# การสร้างอ่านรายงานรอบเดียว แยกแถวตามเดือนในหน่วยความจำ เกิน SPILL_ROWS แถวค่อยพักลงไฟล์ชั่วคราวรายเดือน
+# แล้วเรียงทีละเดือน (หน่วยความจำไม่เกิน SPILL_ROWS แถว + เดือนที่ใหญ่ที่สุด)
+# SQLite ไม่ใช้พาร์ทิชัน: ค้นผ่าน index (report_id, date) ใน ledger_db.range_rows
+
+DIR_NAME = ".partitions"
+INDEX_NAME = "index.json"
+SPILL_ROWS = 500_000
+
+def _matches(row, kind, category):
+    if kind and row[0] != kind:
+        return False
+    return not category or row[1] == category or row[1].split(">")[0].strip() == category
+
+class PartitionStore:
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+        self.root = os.path.join(report_dir, DIR_NAME)
+        self._lock = threading.Lock()
+
+    def _dir(self, report_name):
+        return os.path.join(self.root, report_name)
+
+    # index ของรายงาน (สร้างใหม่ถ้ารายงานเปลี่ยนหลังสร้างครั้งก่อน)
+    def ensure(self, report_name, task=None):
+        st = os.stat(report_core.report_path(report_name))
+        stamp = [st.st_mtime_ns, st.st_size]
+        with self._lock:
+            try:
+                with open(os.path.join(self._dir(report_name), INDEX_NAME), encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get("stamp") == stamp:
+                    return index
+            except (OSError, ValueError):
+                pass
+            with span("build_partitions"):
+                return self._build(report_name, stamp, task)
+
+    def _build(self, report_name, stamp, task):
+        part_dir = self._dir(report_name)
+        # โฟลเดอร์ชั่วคราวชื่อไม่ซ้ำ: หลาย process สร้างรายงานเดียวกันพร้อมกันไม่ลบ/เขียนทับของกันและกัน
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=report_name + ".", suffix=".tmp", dir=self.root)
+        try:
+            index = self._build_into(tmp_dir, report_name, stamp, task)
+            self._install(tmp_dir, part_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return index
+
+    # ย้ายชุดเก่าออกไปชื่อชั่วคราวก่อน (rename ทีเดียว) แล้ว rename ชุดใหม่เข้าที่
+    # rename ทับโฟลเดอร์ที่มีไฟล์อยู่ไม่ได้ ถ้า process อื่นวางชุดของมันลงไปก่อน (stamp เดียวกัน) ใช้ของเขาไป
+    def _install(self, tmp_dir, part_dir):
+        old_dir = tmp_dir + ".old"
+        try:
+            os.replace(part_dir, old_dir)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmp_dir, part_dir)
+        except OSError:
+            if not os.path.isdir(part_dir):
+                raise
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _build_into(self, tmp_dir, report_name, stamp, task):
+        pending = {}
+        spills = {}
+        rows = undated = buffered = 0
+
+        def spill():
+            for month, month_rows in pending.items():
+                f = spills.get(month)
+                if f is None:
+                    f = spills[month] = open(os.path.join(tmp_dir, month + ".unsorted"), 'w+', newline='',
+                                             encoding='utf-8')
+                csv.writer(f).writerows(month_rows)
+            pending.clear()
+
+        try:
+            for row in report_core.iter_report(report_name):
+                rows += 1
+                date = row_date(row)
+                if not is_iso(date):
+                    undated += 1
+                    continue
+                month_rows = pending.get(date[:7])
+                if month_rows is None:
+                    month_rows = pending[date[:7]] = []
+                month_rows.append(row if len(row) == 5 else row[:5])
+                buffered += 1
+                if buffered >= SPILL_ROWS:
+                    spill()
+                    buffered = 0
+                if task is not None and rows % 50_000 == 0:
+                    task.check()
+                    task.set_status(f"แบ่งตามเดือนแล้ว {rows:,} แถว")
+
+            months = {}
+            for month in sorted(pending.keys() | spills.keys()):
+                month_rows = pending.pop(month, [])
+                f = spills.get(month)
+                if f is not None:
+                    f.seek(0)
+                    month_rows = list(csv.reader(f)) + month_rows
+                month_rows.sort(key=lambda row: row[4])
+                months[month] = self._write_month(os.path.join(tmp_dir, month + ".csv"), month_rows)
+        finally:
+            for f in spills.values():
+                f.close()
+                os.remove(f.name)
+
+        index = {"stamp": stamp, "rows": rows, "undated": undated, "months": months}
+        with open(os.path.join(tmp_dir, INDEX_NAME), 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        return index
+
+    # เขียนแถวที่เรียงแล้วทีละวัน (หนึ่งก้อนต่อวัน) จดตำแหน่งไบต์ที่แต่ละวันเริ่ม
+    @staticmethod
+    def _write_month(path, rows):
+        days = []
+        offset = 0
+        with open(path, 'wb') as f:
+            start = 0
+            while start < len(rows):
+                date = rows[start][4]
+                end = start + 1
+                while end < len(rows) and rows[end][4] == date:
+                    end += 1
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows[start:end])
+                data = buffer.getvalue().encode('utf-8')
+                days.append([int(date[8:]), offset])
+                f.write(data)
+                offset += len(data)
+                start = end
+        return {"rows": len(rows), "days": days}
+
+    # แถวที่วันที่อยู่ในช่วง [start, end] (ข้อความ YYYY-MM-DD) เรียงตามวันที่ อ่านเฉพาะเดือนที่ตัดกับช่วง
+    def query(self, report_name, start, end, kind=None, category=None):
+        index = self.ensure(report_name)
+        part_dir = self._dir(report_name)
+        for month in sorted(index["months"]):
+            if month > end[:7]:
+                break
+            if month < start[:7]:
+                continue
+            count("partitions_read")
+            offset = 0
+            if month == start[:7]:
+                days = index["months"][month]["days"]
+                i = bisect_left(days, [int(start[8:]), -1])
+                if i == len(days):
+                    continue
+                offset = days[i][1]
+            with open(os.path.join(part_dir, month + ".csv"), 'rb') as f:
+                f.seek(offset)
+                for row in csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline='')):
+                    if row[4] > end:
+                        break
+                    if _matches(row, kind, category):
+                        yield row
+
+    # ลบพาร์ทิชันของรายงาน (เช่นรายงานถูกลบ) ครั้งต่อไปจะสร้างใหม่
+    def discard(self, report_name):
+        with self._lock:
+            shutil.rmtree(self._dir(report_name), ignore_errors=True)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(report_dir=None):
+    report_dir = report_dir or report_core.REPORT_DIR
+    with _stores_lock:
+        store = _stores.get(report_dir)
+        if store is None:
+            store = _stores[report_dir] = PartitionStore(report_dir)
+        return store
+
+# แถวของรายงานในที่เก็บปัจจุบันที่วันที่อยู่ในช่วง (start, end เป็นเลขวันจาก dates.period)
+# category: หมวดหลัก (รวมทุกหมวดย่อย) หรือ "หลัก > ย่อย"
+def range_rows(report_name, start, end, kind=None, category=None):
+    start, end = to_text(max(start, 1)), to_text(end)
+    if report_core.STORAGE == "sqlite":
+        return report_core._db().range_rows(report_name, start, end, kind, category)
+    return get_store().query(report_name, start, end, kind, category)
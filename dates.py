@@ -0,0 +1,94 @@
+import datetime
+import re
+from functools import lru_cache
+
+# วันที่ของรายการ: ในไฟล์เป็นข้อความ YYYY-MM-DD (ค.ศ.) คอลัมน์ที่ 5 "วันที่" ใน Ledger เป็นเลขวัน (date.toordinal)
+# 0 = ไม่มีวันที่ (รายงาน 4 คอลัมน์แบบเดิม หรือรายการที่ไม่ได้ใส่วันที่)
+# วันที่มาจากคอลัมน์วันที่เท่านั้น ไม่เดาจากรายละเอียด (รายละเอียดที่ผู้ใช้พิมพ์ขึ้นต้นด้วยวันที่ได้)
+# ช่องวันที่ในฟอร์ม/CLI รับ YYYY-MM-DD หรือ วัน/เดือน/ปี (ปี พ.ศ. แปลงเป็น ค.ศ.)
+
+NO_DATE = 0
+MAX_DAY = datetime.date.max.toordinal()
+_DMY = re.compile(r"(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{2,4})")
+
+def is_iso(text):
+    return len(text) == 10 and text[4] == "-" and text[7] == "-" and text[:4].isdigit() \
+        and text[5:7].isdigit() and text[8:].isdigit()
+
+# ข้อความ YYYY-MM-DD -> เลขวัน ("" -> 0) วันที่ซ้ำกันมากในรายงาน แคชไว้
+@lru_cache(maxsize=1 << 14)
+def to_ordinal(text):
+    if not text:
+        return NO_DATE
+    if not is_iso(text):
+        return to_ordinal(normalize(text))
+    try:
+        return datetime.date(int(text[:4]), int(text[5:7]), int(text[8:])).toordinal()
+    except ValueError:
+        raise ValueError(f"วันที่ไม่ถูกต้อง: {text!r}") from None
+
+@lru_cache(maxsize=1 << 14)
+def to_text(ordinal):
+    return datetime.date.fromordinal(ordinal).isoformat() if ordinal else ""
+
+# วันที่จากฟอร์ม -> "YYYY-MM-DD" (ว่าง -> "") ค่าที่อ่านไม่ได้ ValueError
+def normalize(value):
+    text = str(value).strip()
+    if not text:
+        return ""
+    if is_iso(text):
+        to_ordinal(text)
+        return text
+    m = _DMY.fullmatch(text)
+    if m is None:
+        raise ValueError(f"วันที่ไม่ถูกต้อง: {value!r}")
+    day, month, year = map(int, m.groups())
+    if year < 100:
+        year += 2500 if year > 40 else 2000
+    if year > 2400:
+        year -= 543
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        raise ValueError(f"วันที่ไม่ถูกต้อง: {value!r}") from None
+
+def today():
+    return datetime.date.today().isoformat()
+
+# วันที่ของแถวจากไฟล์ (4 หรือ 5 คอลัมน์) เป็นข้อความ YYYY-MM-DD หรือ "" (แถว 4 คอลัมน์ไม่มีวันที่)
+def row_date(row):
+    return row[4] if len(row) > 4 else ""
+
+# "05/03/67" (ปี พ.ศ. สองหลัก) สำหรับ PDF
+def short(ordinal):
+    d = datetime.date.fromordinal(ordinal)
+    return f"{d.day:02d}/{d.month:02d}/{(d.year + 543) % 100:02d}"
+
+# ช่วงวันที่ -> (เลขวันแรก, เลขวันสุดท้าย) รวมทั้งสองวัน
+# รับ YYYY (ทั้งปี), YYYY-MM (ทั้งเดือน) หรือวันที่เต็ม ค่าที่ไม่ใส่ = ไม่จำกัดด้านนั้น
+def period(start=None, end=None):
+    return (_bound(start, first=True) if start else 1,
+            _bound(end, first=False) if end else MAX_DAY)
+
+def _bound(text, first):
+    text = text.strip()
+    try:
+        if len(text) == 4 and text.isdigit():
+            return datetime.date(int(text), 1 if first else 12, 1 if first else 31).toordinal()
+        if len(text) == 7 and text[4] == "-" and text[:4].isdigit() and text[5:].isdigit():
+            year, month = int(text[:4]), int(text[5:])
+            if not 1 <= month <= 12:
+                raise ValueError(month)
+            if first:
+                return datetime.date(year, month, 1).toordinal()
+            return datetime.date(year + month // 12, month % 12 + 1, 1).toordinal() - 1
+    except ValueError:
+        raise ValueError(f"ช่วงวันที่ไม่ถูกต้อง: {text!r}") from None
+    return to_ordinal(normalize(text))
+
+def describe(start, end):
+    if start <= 1 and end >= MAX_DAY:
+        return "ทุกช่วงวันที่"
+    left = to_text(start) if start > 1 else "แรกสุด"
+    right = to_text(end) if end < MAX_DAY else "ล่าสุด"
+    return f"{left} ถึง {right}"
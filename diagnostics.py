@@ -0,0 +1,178 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+# จับเวลาและนับจำนวนในงานหลัก (โหลดรายงาน, refresh ตาราง, วาด PDF, บันทึก) ดูได้จากหน้าต่างวินิจฉัยใน UI
+#   with span("ชื่อ"): ...      จับเวลาช่วงหนึ่ง (สะสม จำนวนครั้ง/รวม/สูงสุด ต่อชื่อ)
+#   count("ชื่อ", n)            ตัวนับ
+# ปิดอยู่ (ค่าเริ่มต้น): span คืน object ว่างตัวเดียวกันทุกครั้ง count จบที่ if เดียว แทบไม่มีต้นทุน
+# เปิดด้วย enable() หรือ LEDGER_TRACE=<ไฟล์.jsonl> (เขียนทุก span ที่จบเป็น JSON หนึ่งบรรทัด)
+# capture: cProfile + tracemalloc ของ thread หลักและงานใน IOExecutor ระหว่าง start_capture() ถึง stop_capture()
+
+ENABLED = False
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+_output = None
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stat = _spans.get(self.name)
+            if stat is None:
+                _spans[self.name] = [1, elapsed, elapsed]
+            else:
+                stat[0] += 1
+                stat[1] += elapsed
+                if elapsed > stat[2]:
+                    stat[2] = elapsed
+            if _output is not None:
+                _output.write(json.dumps({"t": time.time(), "span": self.name, "ms": round(elapsed * 1000, 3),
+                                          "thread": threading.current_thread().name}, ensure_ascii=False) + "\n")
+        return False
+
+def span(name):
+    if not ENABLED:
+        return _NULL
+    return _Span(name)
+
+def count(name, n=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+# jsonl_path: ไฟล์ที่จะเขียนต่อท้ายทุก span (None = เก็บสถิติในหน่วยความจำอย่างเดียว)
+def enable(jsonl_path=None):
+    global ENABLED, _output
+    with _lock:
+        if _output is not None:
+            _output.close()
+        _output = open(jsonl_path, 'a', encoding='utf-8', buffering=1) if jsonl_path else None
+        ENABLED = True
+
+def disable():
+    global ENABLED, _output
+    with _lock:
+        ENABLED = False
+        if _output is not None:
+            _output.close()
+            _output = None
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+# {"spans": {ชื่อ: {"count", "total_ms", "mean_ms", "max_ms"}}, "counters": {ชื่อ: จำนวน}}
+def snapshot():
+    with _lock:
+        spans = {name: {"count": n, "total_ms": total * 1000, "mean_ms": total * 1000 / n, "max_ms": peak * 1000}
+                 for name, (n, total, peak) in _spans.items()}
+        return {"spans": spans, "counters": dict(_counters)}
+
+def write_snapshot(path):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"t": time.time(), **snapshot()}, ensure_ascii=False) + "\n")
+    return path
+
+# ===== cProfile + tracemalloc =====
+_capture = None
+
+class _Capture:
+    def __init__(self, memory):
+        self.stats = None
+        self.main = cProfile.Profile()
+        self.memory = memory
+        self.stats_lock = threading.Lock()
+
+    def add(self, profile):
+        with self.stats_lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+def capturing():
+    return _capture is not None
+
+# เริ่มจับ profile ของ thread ที่เรียก (thread ของ Tk) งานใน worker ใช้ profiled() ครอบ
+def start_capture(memory=True):
+    global _capture
+    if _capture is not None:
+        return
+    capture = _Capture(memory)
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+    capture.main.enable()
+    _capture = capture
+
+# หยุดจับ คืนข้อความสรุป (ฟังก์ชันที่ใช้เวลามากสุด และบรรทัดที่จองหน่วยความจำมากสุด)
+# prof_path: บันทึกผล cProfile ไว้เปิดด้วย pstats/snakeviz ภายหลัง
+def stop_capture(prof_path=None, limit=25):
+    return capture_report(end_capture(), prof_path, limit)
+
+# หยุด profiler (ต้องเรียกจาก thread ที่เรียก start_capture) คืนผลที่จับได้ หรือ None ถ้าไม่ได้จับอยู่
+# ไม่แตะไฟล์ ส่งผลต่อให้ capture_report ใน worker ได้
+def end_capture():
+    global _capture
+    capture, _capture = _capture, None
+    if capture is not None:
+        capture.main.disable()
+        capture.add(capture.main)
+    return capture
+
+def capture_report(capture, prof_path=None, limit=25):
+    if capture is None:
+        return ""
+    out = io.StringIO()
+    capture.stats.stream = out
+    capture.stats.sort_stats("cumulative").print_stats(limit)
+    if prof_path:
+        capture.stats.dump_stats(prof_path)
+    if capture.memory:
+        import tracemalloc
+        snap = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        out.write("\nหน่วยความจำที่จองมากที่สุด:\n")
+        for stat in snap.statistics("lineno")[:limit]:
+            out.write(f"{stat}\n")
+    return out.getvalue()
+
+# ครอบงานที่รันใน thread อื่น: ถ้ากำลังจับ profile อยู่ ให้ profile งานนั้นแล้วรวมเข้ากับผลหลัก
+def profiled(fn, *args):
+    capture = _capture
+    if capture is None:
+        return fn(*args)
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(fn, *args)
+    finally:
+        capture.add(profile)
+
+if os.environ.get("LEDGER_TRACE"):
+    enable(os.environ["LEDGER_TRACE"])
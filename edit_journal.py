@@ -0,0 +1,436 @@
+import gc
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+import report_core
+from file_lock import try_lock_file
+from ledger import Entry, Ledger
+from search_index import SearchIndex
+
+# การแก้ไขรายงานในหน้าแก้ไข พร้อมเลิกทำ/ทำซ้ำ และบันทึกทุกการกระทำลง journal ก่อน (write-ahead log)
+#
+# รหัสแถว (id) = ตำแหน่งใน data ซึ่งไม่เลื่อนตลอดการแก้ไข:
+#   แถวเดิมได้ id 0..base-1 ตามลำดับในรายงาน แถวที่เพิ่มต่อท้ายได้ id ถัดไป
+#   การลบแค่ทำเครื่องหมายใน live (tombstone) ไม่ได้ลบออกจาก data จริง
+# ทุกการกระทำเป็นหนึ่ง op: add / update / delete การเลิกทำและทำซ้ำแค่ย้อนหรือทำ op ซ้ำ ไม่ต้องคัดลอกข้อมูล
+#
+# journal หนึ่งไฟล์ต่อหนึ่ง session: REPORT_DIR/<ชื่อรายงาน>.<เครื่อง>-<pid>-<uuid>.journal
+# หลายหน้าต่าง/หลายเครื่องแก้รายงานเดียวกันพร้อมกันได้โดยไม่เขียนทับ journal ของกันและกัน
+# session ถือล็อกไฟล์ journal ของตัวเองไว้ตลอด (file_lock.try_lock_file) ระบบปล่อยให้เองเมื่อโปรแกรมปิดหรือตาย
+# journal ที่ไม่มีใครถือล็อก = ของ session ที่ปิดไปก่อนบันทึก กู้คืนได้ ของ session ที่ยังเปิดอยู่ไม่ถูกแตะ
+# เป็น JSON หนึ่งบรรทัดต่อหนึ่งรายการ เขียนต่อท้ายอย่างเดียว:
+#   {"report": ชื่อ, "base": จำนวนแถวเดิม, "stamp": รุ่นของรายงาน (report_core.report_version)}   บรรทัดแรก
+#   {"op": "add", "rows": [[ประเภท, หมวดหมู่, รายละเอียด, จำนวนเงิน, วันที่], ...], "start": id ของแถวแรก}
+#   {"op": "update", "id": id, "old": [...], "new": [...]}
+#   {"op": "delete", "ids": [...]}
+#   {"op": "undo"} / {"op": "redo"}
+# การเขียนและ fsync อยู่ใน thread ของ journal (JournalWriter) การแก้ไขแต่ละครั้งแค่ต่อคิว ไม่แตะดิสก์
+# บรรทัดที่ค้างในคิวเขียนรวมกันแล้ว fsync ครั้งเดียว เครื่องดับกะทันหันเสียได้เฉพาะ op ที่ยังอยู่ในคิวชุดสุดท้าย
+# ถ้าโปรแกรมปิดไปก่อนบันทึก เปิดรายงานเดิมครั้งต่อไปจะเล่น journal ซ้ำ (เวลาตามความยาว journal ไม่ใช่ขนาดรายงาน)
+# session ที่กู้คืนรับ journal นั้นมาเขียนต่อ (ถือล็อกแทน) ไม่ต้องคัดลอก op ไปไฟล์ใหม่
+# บันทึกรายงานสำเร็จหรือผู้ใช้ยกเลิกการแก้ไขแล้ว journal ถูกลบ
+#
+# version = รุ่นของรายงานตอนอ่านมาแก้ไข ถ้าตอนบันทึกรุ่นเปลี่ยนไปแล้ว report_merge รวมการแก้ไขของเรา
+# (changes เทียบกับ base_rows) เข้ากับรายงานล่าสุด แทนการเขียนทับ
+
+SUFFIX = ".journal"
+# รอล็อก journal ที่เพิ่งสร้าง: pending_journal ของโปรแกรมอื่นอาจเปิดดูอยู่ชั่วครู่ (เห็นไฟล์ว่าง จึงข้ามไป)
+CLAIM_RETRIES = 1000
+
+# journal ที่จะกู้คืนมี session อื่นถืออยู่ (รับไปกู้แล้ว)
+class JournalInUse(Exception):
+    pass
+
+def journal_path(report_name, session_id):
+    return os.path.join(report_core.REPORT_DIR, f"{report_name}.{session_id}{SUFFIX}")
+
+def new_session_id():
+    return f"{socket.gethostname().replace('.', '_')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# เปิดและล็อก journal (ไม่รอ) คืน fd ที่ถือล็อกอยู่ (ตำแหน่งต้นไฟล์) หรือ None ถ้ามี session อื่นถืออยู่
+def _claim(path):
+    fd = os.open(path, os.O_RDWR)
+    if try_lock_file(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        return fd
+    os.close(fd)
+    return None
+
+# ลบไฟล์ก่อนปล่อยล็อก (ปิดไฟล์) ไม่ให้โปรแกรมอื่นเห็นเป็น journal ค้างในจังหวะนั้น
+# Windows ลบไฟล์ที่ยังเปิดอยู่ไม่ได้ จึงต้องปิดก่อน
+def _remove_and_release(path, close):
+    if os.name != "nt":
+        _remove(path)
+    close()
+    if os.name == "nt":
+        _remove(path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# อ่าน journal จาก fd ที่ถืออยู่: (หัว journal, รายการ op, ตำแหน่งไบต์หลังบรรทัดสมบูรณ์บรรทัดสุดท้าย)
+# บรรทัดสุดท้ายที่เขียนไม่จบตอนเครื่องดับ (ไม่มี "\n" หรือ JSON เสีย) ไม่นับ หัวเสีย -> ValueError
+def _read(fd):
+    with open(fd, 'rb', closefd=False) as f:
+        line = f.readline()
+        header = json.loads(line)
+        if not line.endswith(b"\n") or not isinstance(header, dict):
+            raise ValueError("หัว journal ไม่สมบูรณ์")
+        records = []
+        end = len(line)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            end += len(line)
+    return header, records, end
+
+# ตัวระบุรุ่นของรายงาน: journal ใช้ได้เฉพาะกับรายงานรุ่นเดียวกับตอนที่เริ่มแก้ไข
+def report_stamp(report_name):
+    return report_core.current_version(report_name)
+
+# journal ที่ค้างอยู่ของรายงาน (ไม่มี session ไหนถือล็อก) ล่าสุด: (path, หัว journal, จำนวน op) หรือ None
+def pending_journal(report_name):
+    prefix = report_name + "."
+    found = []
+    try:
+        with os.scandir(report_core.REPORT_DIR) as it:
+            for entry in it:
+                if entry.name.startswith(prefix) and entry.name.endswith(SUFFIX):
+                    found.append((entry.stat().st_mtime_ns, entry.path))
+    except OSError:
+        return None
+    for _, path in sorted(found, reverse=True):
+        try:
+            fd = _claim(path)
+        except OSError:
+            continue
+        if fd is None:
+            continue
+        try:
+            header, records, _ = _read(fd)
+        except ValueError:
+            continue
+        finally:
+            os.close(fd)
+        # "รายงาน.ก.<id>.journal" ก็ขึ้นต้นด้วย "รายงาน." ด้วย ตรวจชื่อในหัว journal
+        if header.get("report") == report_name:
+            return path, header, len(records)
+    return None
+
+# ทิ้ง journal ค้าง (ผู้ใช้ไม่กู้คืน หรือกู้ไม่ได้) ถ้ามี session อื่นรับไปแล้วไม่ลบ
+def discard_journal(path):
+    try:
+        fd = _claim(path)
+    except FileNotFoundError:
+        return
+    if fd is not None:
+        _remove_and_release(path, lambda: os.close(fd))
+
+# เขียน journal ใน thread แยก: write() จาก thread ไหนก็ได้ (เช่น thread ของ Tk) close() รอจนทุกบรรทัดลงดิสก์
+# เขียนไม่ได้ (ดิสก์เต็ม ฯลฯ) แก้ไขต่อได้ แต่กู้คืนหลังเครื่องดับไม่ได้ เหมือนตอนเปิด journal ไม่ได้
+# ถือล็อกไฟล์ไว้จนปิด: pending_journal ของโปรแกรมอื่น (หรือหน้าต่างอื่น) ไม่นับว่าเป็น journal ค้าง
+# fd: journal ที่ค้างอยู่ซึ่ง _claim ไว้แล้ว เขียนต่อจาก end (ตัดบรรทัดที่เขียนไม่จบทิ้ง)
+# ไม่มี fd: สร้างไฟล์ใหม่ ล็อกก่อนเขียนหัว journal (lines) แล้ว fsync ก่อนคืน
+class JournalWriter:
+    def __init__(self, path, lines=(), fd=None, end=0):
+        self.path = path
+        if fd is None:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o666)
+            try:
+                for _ in range(CLAIM_RETRIES):
+                    if try_lock_file(fd):
+                        break
+                    time.sleep(0.001)
+                else:
+                    raise OSError(f"ล็อก {path} ไม่ได้")
+            except BaseException:
+                os.close(fd)
+                _remove(path)
+                raise
+        else:
+            os.ftruncate(fd, end)
+        self.f = open(fd, 'a', encoding='utf-8')
+        if lines:
+            self.f.write("".join(lines))
+            self.f.flush()
+            os.fsync(fd)
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        self.queue.put(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _run(self):
+        while True:
+            lines = [self.queue.get()]
+            while True:
+                try:
+                    lines.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in lines
+            text = "".join(line for line in lines if line is not None)
+            if text:
+                try:
+                    self.f.write(text)
+                    self.f.flush()
+                    os.fsync(self.f.fileno())
+                except OSError:
+                    pass
+            if stop:
+                return
+
+    # remove: ลบ journal ด้วย (บันทึกแล้ว/ยกเลิกการแก้ไข)
+    def close(self, remove=False):
+        self.queue.put(None)
+        self.thread.join()
+        if remove:
+            _remove_and_release(self.path, self.f.close)
+        else:
+            self.f.close()
+
+class EditSession:
+    # recover: path ของ journal ที่ค้างอยู่ (จาก pending_journal) ให้เล่นซ้ำก่อน แล้วเขียนต่อใน journal นั้นเลย
+    # journal ของรายงานรุ่นอื่น -> ValueError, มี session อื่นกู้อยู่ -> JournalInUse (journal เดิมไม่ถูกแตะ)
+    # version: รุ่นของรายงานที่ data อ่านมา (ไม่ใส่ = รุ่นปัจจุบันของรายงานในเครื่อง)
+    def __init__(self, report_name, data=None, index=None, journal=True, recover=None, version=None):
+        self.report_name = report_name
+        self.version = version if version is not None else report_stamp(report_name)
+        self.data = data if data is not None else Ledger()
+        self.index = index if index is not None else SearchIndex(self.data)
+        self.base = len(self.data)
+        self.live = bytearray(b"\x01") * self.base
+        self.dead = 0
+        self.ops = []
+        self.applied = 0
+        # จำนวน op ที่มีผลอยู่ซึ่งแก้/ลบแถวเดิม (ถ้ามี ต้องเขียนรายงานใหม่ทั้งไฟล์)
+        self.touched = 0
+        self.journal = None
+        self.recovered = 0
+        if recover:
+            self._recover(recover, journal)
+        elif journal:
+            self._open_journal()
+
+    # ===== journal =====
+    # ถือล็อก journal เดิมตลอดการเล่น (สองโปรแกรมกู้ journal เดียวกันไม่ได้) แล้วให้ JournalWriter ถือต่อ
+    def _recover(self, path, journal):
+        fd = _claim(path)
+        if fd is None:
+            raise JournalInUse(f"journal {os.path.basename(path)} กำลังถูกใช้อยู่")
+        try:
+            header, records, end = _read(fd)
+            if header.get("base") != self.base or header.get("stamp") != self.version:
+                raise ValueError("รายงานถูกแก้ไขหลังจากเริ่ม journal นี้แล้ว")
+            # ปิด GC ระหว่างเล่น journal ไม่ให้ GC วนตรวจ object ทั้งรายงานซ้ำ ๆ ระหว่างสร้าง op จำนวนมาก
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                for record in records:
+                    self._replay(record)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            self.recovered = len(records)
+        except BaseException:
+            os.close(fd)
+            raise
+        if journal:
+            try:
+                self.journal = JournalWriter(path, fd=fd, end=end)
+                return
+            except OSError:
+                # เขียนต่อไม่ได้: แก้ไขต่อได้โดยไม่มี journal และเก็บ journal เดิมไว้
+                pass
+        os.close(fd)
+
+    # journal ใหม่ของ session นี้ (ชื่อไม่ซ้ำกับ session ไหน)
+    def _open_journal(self):
+        path = journal_path(self.report_name, new_session_id())
+        header = {"report": self.report_name, "base": self.base, "stamp": self.version}
+        try:
+            self.journal = JournalWriter(path, [json.dumps(header, ensure_ascii=False) + "\n"])
+        except OSError:
+            # เขียน journal ไม่ได้ (เช่นโฟลเดอร์อ่านอย่างเดียว) ยังแก้ไขได้ แต่กู้คืนหลังเครื่องดับไม่ได้
+            self.journal = None
+
+    def _log(self, record):
+        if self.journal is not None:
+            self.journal.write(record)
+
+    # รอ journal ลงดิสก์ครบแล้วปิด (discard: ลบ journal ด้วย) เรียกจาก worker ไม่ใช่ thread ของ Tk
+    def close(self, discard=True):
+        if self.journal is not None:
+            self.journal.close(remove=discard)
+            self.journal = None
+
+    def _replay(self, record):
+        op = record["op"]
+        if op == "undo":
+            self.undo()
+        elif op == "redo":
+            self.redo()
+        elif op == "add":
+            self.add([Entry(*row) for row in record["rows"]])
+        elif op == "update":
+            self.update(record["id"], Entry(*record["new"]))
+        elif op == "delete":
+            self.delete(record["ids"])
+
+    # ===== การแก้ไข =====
+    def _do(self, op):
+        # op ใหม่หลังเลิกทำ: ทิ้งส่วนที่ทำซ้ำได้
+        del self.ops[self.applied:]
+        self.ops.append(op)
+        self.applied += 1
+        self._apply(op)
+        self._log(op)
+
+    def add(self, entries):
+        rows = [entry.row() for entry in entries]
+        if rows:
+            self._do({"op": "add", "rows": rows, "start": len(self.data)})
+
+    def update(self, row_id, entry):
+        self._do({"op": "update", "id": row_id, "old": self.data[row_id], "new": entry.row()})
+
+    def delete(self, ids):
+        ids = sorted(i for i in set(ids) if self.live[i])
+        if ids:
+            self._do({"op": "delete", "ids": ids})
+
+    def undo(self):
+        if not self.applied:
+            return False
+        self.applied -= 1
+        self._revert(self.ops[self.applied])
+        self._log({"op": "undo"})
+        return True
+
+    def redo(self):
+        if self.applied >= len(self.ops):
+            return False
+        self._apply(self.ops[self.applied])
+        self.applied += 1
+        self._log({"op": "redo"})
+        return True
+
+    @property
+    def can_undo(self):
+        return self.applied > 0
+
+    @property
+    def can_redo(self):
+        return self.applied < len(self.ops)
+
+    def _apply(self, op):
+        kind = op["op"]
+        if kind == "add":
+            start = op["start"]
+            if start == len(self.data):
+                # ครั้งแรก: เพิ่มแถวจริง (ทำซ้ำหลังเลิกทำแค่ทำเครื่องหมายกลับ)
+                for row in op["rows"]:
+                    self.data.append(Entry(*row))
+                    self.index.append(self.data[-1])
+                self.live.extend(b"\x01" * len(op["rows"]))
+            else:
+                self._set_live(range(start, start + len(op["rows"])), 1)
+        elif kind == "update":
+            self._write(op["id"], op["new"])
+        elif kind == "delete":
+            self._set_live(op["ids"], 0)
+        self._count_touched(op, 1)
+
+    def _revert(self, op):
+        kind = op["op"]
+        if kind == "add":
+            self._set_live(range(op["start"], op["start"] + len(op["rows"])), 0)
+        elif kind == "update":
+            self._write(op["id"], op["old"])
+        elif kind == "delete":
+            self._set_live(op["ids"], 1)
+        self._count_touched(op, -1)
+
+    def _write(self, row_id, row):
+        entry = Entry(*row)
+        self.data[row_id] = entry
+        self.index.update(row_id, entry)
+
+    def _set_live(self, ids, flag):
+        live = self.live
+        for i in ids:
+            if live[i] != flag:
+                live[i] = flag
+                self.dead += -1 if flag else 1
+
+    def _count_touched(self, op, sign):
+        if op["op"] == "update" and op["id"] < self.base:
+            self.touched += sign
+        elif op["op"] == "delete" and op["ids"][0] < self.base:
+            self.touched += sign
+
+    # ===== ผลลัพธ์ =====
+    # id ของแถวที่ยังอยู่และตรงกับคำค้น (เรียงตามลำดับในรายงาน)
+    # period = (เลขวันแรก, เลขวันสุดท้าย) จาก dates.period: เฉพาะรายการที่วันที่อยู่ในช่วง
+    def search(self, query, period=None):
+        keys = self.index.search(query)
+        if period is not None:
+            keys = self.data.in_period(keys, *period)
+        if not self.dead:
+            return keys
+        live = self.live
+        return [i for i in keys if live[i]]
+
+    @property
+    def dirty(self):
+        return self.touched > 0 or any(self.live[self.base:])
+
+    # แถวที่จะบันทึก พร้อม mode/base สำหรับ report_core.save_changes
+    # "append" เมื่อมีแต่แถวที่เพิ่ม (ต่อท้ายไฟล์ได้), "rewrite" เมื่อแก้/ลบแถวเดิม
+    def pending(self):
+        if self.dead:
+            rows = self.data.compress(self.live)
+        else:
+            rows = self.data.copy()
+        if self.touched:
+            return rows, "rewrite", self.base
+        if len(rows) > self.base:
+            return rows, "append", self.base
+        return rows, None, self.base
+
+    # รายงานตอนเปิดแก้ไข: แถว 0..base-1 ก่อนถูกแก้ (update แรกที่มีผลของแต่ละแถวเก็บค่าเดิมไว้)
+    def base_rows(self):
+        rows = self.data[:self.base]
+        seen = set()
+        for op in self.ops[:self.applied]:
+            if op["op"] == "update" and op["id"] < self.base and op["id"] not in seen:
+                seen.add(op["id"])
+                rows[op["id"]] = op["old"]
+        return rows
+
+    # การแก้ไขเทียบกับ base_rows: ({id: แถวใหม่}, [id ที่ลบ], Ledger ของแถวที่เพิ่ม)
+    # ไล่จาก op ที่มีผลอยู่ ไม่ต้องเทียบทั้งรายงาน แถวที่แก้แล้วกลับเป็นค่าเดิมไม่นับ แถวที่แก้แล้วลบนับเป็นลบ
+    def changes(self, base_rows):
+        live = self.live
+        updated, deleted = set(), set()
+        for op in self.ops[:self.applied]:
+            if op["op"] == "update" and op["id"] < self.base:
+                updated.add(op["id"])
+            elif op["op"] == "delete":
+                deleted.update(i for i in op["ids"] if i < self.base and not live[i])
+        updated = {i: self.data.row(i) for i in sorted(updated - deleted)}
+        updated = {i: row for i, row in updated.items() if row != base_rows.row(i)}
+        added = self.data[self.base:].compress(live[self.base:])
+        return updated, sorted(deleted), added
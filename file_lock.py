@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from diagnostics import count, span
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# ล็อกแบบ advisory ข้าม process (และข้าม thread) ผ่านไฟล์ล็อก ใช้กับโฟลเดอร์รายงานที่หลายเครื่องเปิดพร้อมกัน
+# POSIX: fcntl.flock ทั้งไฟล์, Windows: msvcrt.locking 1 ไบต์ที่ LOCK_OFFSET (ไกลจากเนื้อหา อ่านตัวนับได้ระหว่างล็อก)
+# ล็อกผูกกับไฟล์ที่เปิดอยู่ process ตายระหว่างถือล็อก ระบบปฏิบัติการปล่อยให้เอง ไม่มีไฟล์ล็อกค้าง
+# thread เดียวกันล็อกไฟล์เดิมซ้อนได้ (นับชั้น) เช่น report_core.save_if ที่เรียก store_report ซึ่งล็อกอีกชั้น
+#
+# เนื้อหาไฟล์ล็อกคือตัวนับการเขียน (ตัวเลข COUNTER_WIDTH ตัว) ผู้ถือล็อกเพิ่มด้วย bump()
+# report_core ใช้เป็นส่วนหนึ่งของรุ่นรายงาน (mtime/ขนาดไฟล์อย่างเดียวอาจไม่เปลี่ยนถ้าเขียนเร็วและขนาดเท่าเดิม)
+
+LOCK_TIMEOUT = 30.0
+LOCK_OFFSET = 1 << 30
+COUNTER_WIDTH = 20
+
+class LockTimeout(TimeoutError):
+    pass
+
+_held = threading.local()
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+# ล็อกไฟล์ที่เปิดไว้เองแบบไม่รอ ไม่นับชั้นและไม่ผูกกับ thread ปล่อยเมื่อปิดไฟล์ (หรือ process ตาย)
+# ใช้กับไฟล์ที่ถือไว้ตลอดอายุของงาน เช่น journal ของ session แก้ไข คืน False ถ้ามีคนถืออยู่
+def try_lock_file(fd):
+    return _try_lock(fd)
+
+# ตัวนับในไฟล์ล็อก (ไม่ต้องถือล็อก) ยังไม่มีไฟล์ = 0
+def read_counter(path):
+    try:
+        with open(path, 'rb') as f:
+            text = f.read(COUNTER_WIDTH)
+    except FileNotFoundError:
+        return 0
+    try:
+        return int(text or 0)
+    except ValueError:
+        # อ่านตรงกับจังหวะที่อีกฝั่งกำลังเขียน: ค่าที่ไม่ซ้ำกับรุ่นใด ผู้เรียกแค่เห็นว่ารุ่นเปลี่ยน
+        return -1
+
+class FileLock:
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        held = _held.__dict__.setdefault("locks", {})
+        state = held.get(self.path)
+        if state is not None:
+            state[1] += 1
+            return self
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if not _try_lock(fd):
+                # มีคนถืออยู่: ถามซ้ำถี่ ๆ ก่อน (การเขียนส่วนใหญ่ใช้ไม่กี่มิลลิวินาที) แล้วค่อยห่างขึ้น
+                count("lock_waits")
+                with span("lock_wait"):
+                    deadline = time.monotonic() + self.timeout
+                    delay = 0.001
+                    while not _try_lock(fd):
+                        if time.monotonic() >= deadline:
+                            raise LockTimeout(f"รอล็อก {os.path.basename(self.path)} นานเกิน {self.timeout:g} วินาที "
+                                              "(มีผู้ใช้อื่นกำลังบันทึกรายงานนี้)")
+                        time.sleep(delay)
+                        delay = min(delay * 2, 0.05)
+        except BaseException:
+            os.close(fd)
+            raise
+        held[self.path] = [fd, 1]
+        return self
+
+    def __exit__(self, *exc):
+        held = _held.locks
+        state = held[self.path]
+        state[1] -= 1
+        if state[1]:
+            return
+        del held[self.path]
+        try:
+            _unlock(state[0])
+        finally:
+            os.close(state[0])
+
+    # เพิ่มตัวนับการเขียน (เรียกขณะถือล็อก) คืนค่าใหม่
+    def bump(self):
+        fd = _held.locks[self.path][0]
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            value = int(os.read(fd, COUNTER_WIDTH) or 0) + 1
+        except ValueError:
+            value = 1
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, b"%*d" % (COUNTER_WIDTH, value))
+        return value
@@ -0,0 +1,110 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
+from diagnostics import profiled
+
+# งานอ่าน/เขียนไฟล์และสร้าง PDF รันใน thread แยก แล้วส่งผลกลับให้ Tk ผ่าน root.after
+# (Tk ไม่ thread-safe: callback ทุกตัวถูกเรียกใน thread ของ mainloop เท่านั้น)
+
+class TaskCancelled(Exception):
+    pass
+
+class Task:
+    def __init__(self, message):
+        self.message = message
+        self.status = ""
+        self.future = None
+        self._cancel = threading.Event()
+
+    # เรียกจาก worker thread ได้
+    def set_status(self, text):
+        self.status = text
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    # ให้ loop ยาว ๆ ใน worker เรียกเป็นระยะ เพื่อหยุดเมื่อผู้ใช้กดยกเลิก
+    def check(self):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+class IOExecutor:
+    POLL_MS = 50
+    # งานที่เสร็จเร็วกว่านี้ไม่ต้องแสดงหน้าต่างรอ จะได้ไม่กระพริบ
+    DIALOG_DELAY_MS = 300
+
+    def __init__(self, root, workers=2):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="io")
+
+    # fn(task, *args) รันใน worker; on_done(result) / on_error(exc) รันใน thread ของ Tk
+    # ถ้าผู้ใช้กดยกเลิก ผลลัพธ์จะถูกทิ้ง และ callback ทั้งสองไม่ถูกเรียก
+    def submit(self, fn, *args, on_done=None, on_error=None, message="กำลังทำงาน...", parent=None):
+        task = Task(message)
+        task.future = self.pool.submit(profiled, fn, task, *args)
+        state = {"dialog": None, "waited": 0}
+
+        def poll():
+            if task.future.done() or task.cancelled:
+                if state["dialog"] is not None:
+                    state["dialog"].close()
+                self._finish(task, on_done, on_error)
+                return
+            state["waited"] += self.POLL_MS
+            if state["dialog"] is None and state["waited"] >= self.DIALOG_DELAY_MS:
+                state["dialog"] = _ProgressDialog(parent or self.root, task)
+            elif state["dialog"] is not None:
+                state["dialog"].update_status()
+            self.root.after(self.POLL_MS, poll)
+
+        self.root.after(self.POLL_MS, poll)
+        return task
+
+    def _finish(self, task, on_done, on_error):
+        if task.cancelled:
+            return
+        error = task.future.exception()
+        if error is None:
+            if on_done:
+                on_done(task.future.result())
+        elif not isinstance(error, TaskCancelled):
+            if on_error:
+                on_error(error)
+            else:
+                from tkinter import messagebox
+                messagebox.showerror("ผิดพลาด", str(error))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# หน้าต่างรอ: แถบความคืบหน้าแบบวิ่ง + ข้อความสถานะ + ปุ่มยกเลิก
+class _ProgressDialog:
+    def __init__(self, parent, task):
+        self.task = task
+        self.win = tk.Toplevel(parent)
+        self.win.title("กรุณารอสักครู่")
+        self.win.geometry("360x150")
+        self.win.transient(parent)
+
+        tk.Label(self.win, text=task.message, font=("TH Sarabun New", 16)).pack(pady=5)
+        self.status = tk.Label(self.win, text="", font=("TH Sarabun New", 14))
+        self.status.pack()
+        self.bar = ttk.Progressbar(self.win, mode="indeterminate", length=300)
+        self.bar.pack(pady=5)
+        self.bar.start(15)
+        tk.Button(self.win, text="ยกเลิก", command=task.cancel, font=("TH Sarabun New", 14)).pack(pady=5)
+        self.win.protocol("WM_DELETE_WINDOW", task.cancel)
+
+    def update_status(self):
+        self.status.config(text=self.task.status)
+
+    def close(self):
+        self.bar.stop()
+        self.win.destroy()
@@ -0,0 +1,231 @@
+import threading
+from array import array
+from itertools import compress
+import dates
+from diagnostics import count, span
+from money import parse_column, to_satang, to_text
+from report_core import CATEGORY_OPTIONS, TYPES
+
+# โครงสร้างข้อมูลรายการที่ทุกหน้าจอใช้ร่วมกัน
+# Ledger เก็บแบบคอลัมน์ (struct-of-arrays):
+#   types  : array('B') รหัสประเภท INCOME/EXPENSE (index ใน TYPES)
+#   cats   : array('I') รหัสหมวดหมู่จาก CATEGORIES (ชื่อหมวดเก็บครั้งเดียวทั้งโปรแกรม)
+#   details: list ของข้อความรายละเอียด
+#   amounts: array('q') จำนวนเงินหน่วยสตางค์
+#   dates  : array('I') เลขวันของวันที่รายการ (dates.to_ordinal, 0 = ไม่มีวันที่)
+# ledger[i] คืนแถวแสดงผล [ประเภท, หมวดหมู่, รายละเอียด, "1234.50", "YYYY-MM-DD"] แบบเดียวกับแถวจาก CSV ทุกหน้าจอ
+# อ่านได้ทั้งแถว 4 คอลัมน์ (รายงานเดิม) และ 5 คอลัมน์ แถว 4 คอลัมน์ไม่มีวันที่
+
+INCOME, EXPENSE = 0, 1
+
+def type_code(kind):
+    return INCOME if kind == TYPES[INCOME] else EXPENSE
+
+def split_category(name):
+    parts = [s.strip() for s in name.split(">", 1)]
+    return parts[0], (parts[1] if len(parts) > 1 else "")
+
+# ตารางหมวดหมู่ "หลัก > ย่อย" -> รหัส พร้อมรหัสหมวดหลักของแต่ละหมวด
+# เริ่มจากหมวดหลักใน CATEGORY_OPTIONS แล้วเพิ่มหมวดที่พบในรายงานไปเรื่อย ๆ
+class Categories:
+    def __init__(self, options=CATEGORY_OPTIONS):
+        self.names = []
+        self.ids = {}
+        self.main_of = array('I')
+        self._lock = threading.Lock()
+        for kind in TYPES:
+            for main in options[kind]:
+                self.intern(main)
+
+    def intern(self, name):
+        cid = self.ids.get(name)
+        if cid is not None:
+            return cid
+        main = split_category(name)[0]
+        main_id = self.intern(main) if main != name else None
+        with self._lock:
+            cid = self.ids.get(name)
+            if cid is None:
+                cid = len(self.names)
+                self.names.append(name)
+                self.main_of.append(cid if main_id is None else main_id)
+                self.ids[name] = cid
+        return cid
+
+    def name(self, cid):
+        return self.names[cid]
+
+    def main(self, cid):
+        return self.names[self.main_of[cid]]
+
+CATEGORIES = Categories()
+
+# หนึ่งรายการ (ใช้กับฟอร์มเพิ่ม/แก้ไข) วนลูปได้เป็นแถวแสดงผลเหมือน ledger[i]
+class Entry:
+    __slots__ = ("type", "category", "detail", "amount", "date")
+
+    def __init__(self, kind, category, detail, amount, date=""):
+        self.type = type_code(kind)
+        self.category = CATEGORIES.intern(category)
+        self.detail = detail
+        self.amount = to_satang(amount)
+        self.date = dates.to_ordinal(date)
+
+    @property
+    def kind(self):
+        return TYPES[self.type]
+
+    @property
+    def category_name(self):
+        return CATEGORIES.name(self.category)
+
+    @property
+    def main(self):
+        return CATEGORIES.main(self.category)
+
+    def row(self):
+        return [TYPES[self.type], CATEGORIES.name(self.category), self.detail, to_text(self.amount),
+                dates.to_text(self.date)]
+
+    def __iter__(self):
+        return iter(self.row())
+
+    def __eq__(self, other):
+        return isinstance(other, Entry) and self.row() == other.row()
+
+    def __repr__(self):
+        return f"Entry{tuple(self.row())!r}"
+
+class Ledger:
+    def __init__(self, rows=(), task=None):
+        self.types = array('B')
+        self.cats = array('I')
+        self.details = []
+        self.amounts = array('q')
+        self.dates = array('I')
+        if rows:
+            self.extend(rows, task)
+
+    # เพิ่มหลายแถว แปลงจำนวนเงินทั้งคอลัมน์ทีละก้อน task (ถ้ามี) ใช้ตรวจการยกเลิกเหมือน read_csv_rows
+    # (ส่วนใหญ่ rows คือ iter_report จึงเป็นเวลาอ่าน CSV/SQLite ทั้งรายงานด้วย)
+    def extend(self, rows, task=None, chunk=50_000):
+        with span("load_rows"):
+            count("rows_parsed", self._extend(rows, task, chunk))
+
+    def _extend(self, rows, task, chunk):
+        ids, intern = CATEGORIES.ids, CATEGORIES.intern
+        income = TYPES[INCOME]
+        add_type, add_cat, add_detail = self.types.append, self.cats.append, self.details.append
+        add_date, to_ordinal = self.dates.append, dates.to_ordinal
+        amounts = []
+        add_amount = amounts.append
+        i = 0
+        for i, row in enumerate(rows, 1):
+            kind, category, detail, amount = row[0], row[1], row[2], row[3]
+            date = row[4] if len(row) > 4 else ""
+            add_type(INCOME if kind == income else EXPENSE)
+            cid = ids.get(category)
+            add_cat(intern(category) if cid is None else cid)
+            add_detail(detail)
+            add_amount(amount if type(amount) is str else to_text(to_satang(amount)))
+            add_date(to_ordinal(date) if date else 0)
+            if i % chunk == 0:
+                self.amounts.extend(parse_column(amounts))
+                amounts.clear()
+                if task is not None:
+                    task.check()
+                    task.set_status(f"อ่านแล้ว {i:,} แถว")
+        self.amounts.extend(parse_column(amounts))
+        return i
+
+    def append(self, entry):
+        if not isinstance(entry, Entry):
+            entry = Entry(*entry)
+        self.types.append(entry.type)
+        self.cats.append(entry.category)
+        self.details.append(entry.detail)
+        self.amounts.append(entry.amount)
+        self.dates.append(entry.date)
+
+    def entry(self, i):
+        entry = Entry.__new__(Entry)
+        entry.type = self.types[i]
+        entry.category = self.cats[i]
+        entry.detail = self.details[i]
+        entry.amount = self.amounts[i]
+        entry.date = self.dates[i]
+        return entry
+
+    def row(self, i):
+        return [TYPES[self.types[i]], CATEGORIES.names[self.cats[i]], self.details[i], to_text(self.amounts[i]),
+                dates.to_text(self.dates[i])]
+
+    def __len__(self):
+        return len(self.details)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            part = Ledger()
+            part.types, part.cats = self.types[i], self.cats[i]
+            part.details, part.amounts, part.dates = self.details[i], self.amounts[i], self.dates[i]
+            return part
+        return self.row(i)
+
+    def __setitem__(self, i, entry):
+        if not isinstance(entry, Entry):
+            entry = Entry(*entry)
+        self.types[i] = entry.type
+        self.cats[i] = entry.category
+        self.details[i] = entry.detail
+        self.amounts[i] = entry.amount
+        self.dates[i] = entry.date
+
+    def __delitem__(self, i):
+        del self.types[i]
+        del self.cats[i]
+        del self.details[i]
+        del self.amounts[i]
+        del self.dates[i]
+
+    def __iter__(self):
+        for i in range(len(self.details)):
+            yield self.row(i)
+
+    def copy(self):
+        return self[:]
+
+    # เฉพาะแถวที่ live[i] เป็นจริง (bytearray 0/1 ยาวเท่า ledger) เรียงตามลำดับเดิม
+    def compress(self, live):
+        part = Ledger()
+        part.types.extend(compress(self.types, live))
+        part.cats.extend(compress(self.cats, live))
+        part.details = list(compress(self.details, live))
+        part.amounts.extend(compress(self.amounts, live))
+        part.dates.extend(compress(self.dates, live))
+        return part
+
+    # แถวตามลำดับ keys โดยไม่สร้าง list ของแถวทั้งหมด (ให้ VirtualTable ดึงเฉพาะแถวที่มองเห็น)
+    def view(self, keys):
+        return LedgerView(self, keys)
+
+    # keys ที่วันที่อยู่ในช่วง [start, end] (เลขวัน) แถวที่ไม่มีวันที่ไม่ผ่าน
+    def in_period(self, keys, start, end):
+        dates_ = self.dates
+        return [i for i in keys if start <= dates_[i] <= end]
+
+    # ยอดรวมสตางค์ของประเภท (INCOME/EXPENSE)
+    def total(self, code):
+        return sum(a for t, a in zip(self.types, self.amounts) if t == code)
+
+class LedgerView:
+    __slots__ = ("ledger", "keys")
+
+    def __init__(self, ledger, keys):
+        self.ledger = ledger
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        return self.ledger.row(self.keys[i])
@@ -0,0 +1,232 @@
+import csv
+import glob
+import os
+import sqlite3
+import threading
+import report_core
+from dates import row_date
+from money import to_baht, to_satang
+
+# ที่เก็บรายงานแบบ SQLite (ทางเลือกแทนหนึ่งไฟล์ CSV ต่อหนึ่งรายงาน)
+# ทุกรายการอยู่ในตาราง entries ตารางเดียว ผูกกับรายงานด้วย report_id
+# ใช้ WAL: อ่านได้พร้อมกับที่อีก thread/process กำลังเขียน
+# amount เป็น REAL ที่ปัดเป็นสตางค์ตอนเขียน ตอนรวมยอดแปลงกลับเป็นสตางค์ (SATANG_SUM) ก่อน SUM จึงไม่คลาด
+# date เป็น YYYY-MM-DD หรือ "" (index (report_id, date) เรียงตามวันที่อยู่แล้ว ค้นช่วงวันที่ไม่ต้องแบ่งพาร์ทิชัน)
+# reports.version เพิ่มขึ้นทุกครั้งที่รายการของรายงานเปลี่ยน ใช้แทน (mtime_ns, ขนาด) ของไฟล์ CSV ในแคชต่าง ๆ
+
+DB_NAME = "ledger.db"
+BATCH_SIZE = 10_000
+SATANG_SUM = "SUM(CAST(ROUND(amount * 100) AS INTEGER))"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    amount REAL NOT NULL,
+    date TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_entries_report ON entries(report_id, seq);
+CREATE INDEX IF NOT EXISTS idx_entries_type ON entries(type, report_id);
+CREATE INDEX IF NOT EXISTS idx_entries_category ON entries(category, report_id);
+"""
+
+class LedgerDB:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    # ฐานข้อมูลที่สร้างก่อนมีคอลัมน์ date: เพิ่มคอลัมน์ รายการเดิมไม่มีวันที่ (ไม่เดาจากรายละเอียด)
+    def _migrate(self, conn):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+        if "date" not in columns:
+            conn.execute("ALTER TABLE entries ADD COLUMN date TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(report_id, date)")
+        if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(reports)")}:
+            conn.execute("ALTER TABLE reports ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    # หนึ่ง connection ต่อ thread (งาน I/O ของ UI รันใน worker thread)
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def list_reports(self):
+        return [name for (name,) in self.connect().execute("SELECT name FROM reports ORDER BY name")]
+
+    def exists(self, name):
+        return self.connect().execute("SELECT 1 FROM reports WHERE name = ?", (name,)).fetchone() is not None
+
+    # รุ่นของรายงาน (ไม่มีรายงาน -> KeyError)
+    def version(self, name):
+        row = self.connect().execute("SELECT version FROM reports WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def _bump(self, conn, report_id):
+        conn.execute("UPDATE reports SET version = version + 1 WHERE id = ?", (report_id,))
+
+    def _report_id(self, conn, name, create=False):
+        row = conn.execute("SELECT id FROM reports WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0]
+        if not create:
+            raise KeyError(name)
+        return conn.execute("INSERT INTO reports(name) VALUES (?)", (name,)).lastrowid
+
+    def iter_rows(self, name):
+        conn = self.connect()
+        report_id = self._report_id(conn, name)
+        cursor = conn.execute("SELECT type, category, detail, amount, date FROM entries "
+                              "WHERE report_id = ? ORDER BY seq", (report_id,))
+        return self._fetch(cursor)
+
+    def _fetch(self, cursor):
+        while True:
+            batch = cursor.fetchmany(BATCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                yield list(row)
+
+    def read_rows(self, name):
+        return list(self.iter_rows(name))
+
+    def _insert(self, conn, report_id, rows, start):
+        batch = []
+        seq = start
+        for row in rows:
+            kind, category, detail, amount = row[:4]
+            batch.append((report_id, seq, kind, category, detail, to_baht(to_satang(amount)), row_date(row)))
+            seq += 1
+            if len(batch) >= BATCH_SIZE:
+                conn.executemany("INSERT INTO entries(report_id, seq, type, category, detail, amount, date) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                batch.clear()
+        if batch:
+            conn.executemany("INSERT INTO entries(report_id, seq, type, category, detail, amount, date) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        return seq - start
+
+    # แทนที่ทุกรายการของรายงาน (หรือสร้างใหม่) ใน transaction เดียว
+    def save_rows(self, name, rows):
+        conn = self.connect()
+        with conn:
+            report_id = self._report_id(conn, name, create=True)
+            conn.execute("DELETE FROM entries WHERE report_id = ?", (report_id,))
+            self._bump(conn, report_id)
+            return self._insert(conn, report_id, rows, 0)
+
+    def append_rows(self, name, rows):
+        conn = self.connect()
+        with conn:
+            report_id = self._report_id(conn, name, create=True)
+            (last,) = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM entries WHERE report_id = ?",
+                                   (report_id,)).fetchone()
+            self._bump(conn, report_id)
+            return self._insert(conn, report_id, rows, last)
+
+    def delete_report(self, name):
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM reports WHERE name = ?", (name,))
+
+    # ยอดรวม {ประเภท: {หมวดหมู่: ยอด}} และจำนวนแถว รูปแบบเดียวกับ report_core.summarize
+    def summarize(self, name):
+        conn = self.connect()
+        report_id = self._report_id(conn, name)
+        totals = {t: {} for t in report_core.TYPES}
+        count = 0
+        for kind, category, amount, n in conn.execute(
+                f"SELECT type, category, {SATANG_SUM}, COUNT(*) FROM entries "
+                "WHERE report_id = ? GROUP BY type, category ORDER BY MIN(seq)", (report_id,)):
+            totals["รายรับ" if kind == "รายรับ" else "รายจ่าย"][category] = to_baht(amount)
+            count += n
+        return totals, count
+
+    # แถวของรายงานที่วันที่อยู่ในช่วง [start, end] (YYYY-MM-DD) เรียงตามวันที่ ผ่าน index (report_id, date)
+    # category: หมวดหลัก (รวมทุกหมวดย่อย) หรือ "หลัก > ย่อย"
+    def range_rows(self, name, start, end, kind=None, category=None):
+        conn = self.connect()
+        report_id = self._report_id(conn, name)
+        sql = ("SELECT type, category, detail, amount, date FROM entries "
+               "WHERE report_id = ? AND date BETWEEN ? AND ? AND date != ''")
+        params = [report_id, start, end]
+        if kind:
+            sql += " AND type = ?"
+            params.append(kind)
+        if category:
+            sql += " AND (category = ? OR substr(category, 1, ?) = ?)"
+            params += [category, len(category) + 2, category + " >"]
+        return self._fetch(conn.execute(sql + " ORDER BY date, seq", params))
+
+    # ยอดรวมข้ามทุกรายงาน ตามประเภท/หมวดหมู่ (ใช้ index ไม่ต้องเปิดไฟล์ทีละเดือน)
+    def totals_by_report(self, kind=None, category=None):
+        sql = (f"SELECT r.name, e.type, e.category, {SATANG_SUM} FROM entries e "
+               "JOIN reports r ON r.id = e.report_id WHERE 1 = 1")
+        params = []
+        if kind:
+            sql += " AND e.type = ?"
+            params.append(kind)
+        if category:
+            sql += " AND e.category = ?"
+            params.append(category)
+        sql += " GROUP BY r.name, e.type, e.category ORDER BY r.name"
+        return [(name, kind, category, to_baht(amount))
+                for name, kind, category, amount in self.connect().execute(sql, params)]
+
+    # ข้อมูลย่อทุกรายงาน [(ชื่อ, จำนวนแถว, วันที่แรก, วันที่สุดท้าย, รายรับ, รายจ่าย)] ยอดเป็นสตางค์
+    # วันที่มาจากคอลัมน์ date (เติมจากรายละเอียดไว้แล้วตอน migrate) แบบเดียวกับ report_catalog
+    def catalog(self):
+        date = "NULLIF(e.date, '')"
+        income = "CAST(ROUND(e.amount * 100) AS INTEGER)"
+        sql = (f"SELECT r.name, COUNT(e.seq), MIN({date}), MAX({date}), "
+               f"COALESCE(SUM(CASE WHEN e.type = ? THEN {income} END), 0), "
+               f"COALESCE(SUM(CASE WHEN e.type = ? THEN 0 ELSE {income} END), 0) "
+               "FROM reports r LEFT JOIN entries e ON e.report_id = r.id GROUP BY r.id ORDER BY r.name")
+        return self.connect().execute(sql, (report_core.TYPES[0], report_core.TYPES[0])).fetchall()
+
+    def import_csv(self, csv_path, name=None):
+        name = name or os.path.splitext(os.path.basename(csv_path))[0]
+        with open(csv_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return self.save_rows(name, reader)
+
+    # นำเข้า reports/*.csv ทั้งหมด (รายงานชื่อซ้ำจะถูกแทนที่ด้วยข้อมูลจากไฟล์)
+    def migrate_dir(self, report_dir, progress=None):
+        paths = sorted(glob.glob(os.path.join(report_dir, "*.csv")))
+        for i, path in enumerate(paths, 1):
+            count = self.import_csv(path)
+            if progress:
+                progress(i, len(paths), path, count)
+        return len(paths)
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_db(report_dir=None):
+    path = os.path.join(report_dir or report_core.REPORT_DIR, DB_NAME)
+    with _instances_lock:
+        db = _instances.get(path)
+        if db is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = _instances[path] = LedgerDB(path)
+        return db
@@ -0,0 +1,437 @@
+import csv
+import io
+import os
+import tempfile
+import report_core
+from dates import MAX_DAY, describe, row_date, short, to_ordinal, to_text
+from diagnostics import span
+from money import format_satang, to_satang
+
+# reportlab และฟอนต์โหลดเมื่อสร้าง PDF ครั้งแรกเท่านั้น งานที่ไม่ได้วาด PDF จะเริ่มได้เร็ว
+# ขนาด A4 เป็น point (เท่ากับ reportlab.lib.pagesizes.A4)
+A4 = (595.2755905511812, 841.8897637795277)
+
+# ระยะบรรทัดของแต่ละชนิด (เท่ากับ layout เดิม)
+LINE_HEIGHT = {"main": 20, "sub": 18, "entry": 18, "gap": 10}
+TOP_MARGIN = 50
+BOTTOM_MARGIN = 50
+X_INCOME = 40
+X_EXPENSE = 320
+
+REGULAR = "THSarabun"
+BOLD = "THSarabun-Bold"
+FONT_FILES = {REGULAR: 'fonts/THSarabunNew/THSarabunNew.ttf',
+              BOLD: 'fonts/THSarabunNew/THSarabunNew Bold.ttf'}
+
+_fonts_registered = False
+
+def register_fonts():
+    global _fonts_registered
+    if _fonts_registered:
+        return
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    for name, path in FONT_FILES.items():
+        pdfmetrics.registerFont(TTFont(name, path))
+    _fonts_registered = True
+
+# ของที่ใช้ซ้ำได้ทุกครั้งที่สร้าง PDF ใน process เดียวกัน (ทั้ง UI, batch_export worker, cli)
+#   - ฟอนต์ลงทะเบียนครั้งเดียว
+#   - ความกว้างตัวอักษรต่อ (ฟอนต์, ขนาด) สำหรับจัดชิดขวาโดยไม่ต้องเรียก stringWidth ทุกบรรทัด
+#   - ส่วนคงที่ของทุกหน้า (หัวคอลัมน์) วาดเป็น Form XObject ครั้งเดียวต่อเอกสาร แล้วอ้างถึงทุกหน้า
+class RenderContext:
+    def __init__(self):
+        register_fonts()
+        self._widths = {}
+
+    def width(self, text, font, size):
+        table = self._widths.get((font, size))
+        if table is None:
+            table = self._widths[(font, size)] = {}
+        try:
+            return sum(map(table.__getitem__, text))
+        except KeyError:
+            from reportlab.pdfbase.pdfmetrics import stringWidth
+            for ch in set(text) - table.keys():
+                table[ch] = stringWidth(ch, font, size)
+            return sum(map(table.__getitem__, text))
+
+    def canvas(self, pdf_path):
+        from reportlab.pdfgen import canvas
+        c = canvas.Canvas(pdf_path, pagesize=A4, pageCompression=1)
+        c.beginForm("furniture")
+        c.setFont(BOLD, 18)
+        c.drawString(X_INCOME, A4[1] - TOP_MARGIN, "รายรับ")
+        c.drawString(X_EXPENSE, A4[1] - TOP_MARGIN, "รายจ่าย")
+        c.endForm()
+        return c
+
+_context = None
+
+def get_context():
+    global _context
+    if _context is None:
+        _context = RenderContext()
+    return _context
+
+# ข้อความทั้งหน้าอยู่ใน text object เดียว (BT ... ET) ตั้งฟอนต์เฉพาะเมื่อต่างจากบรรทัดก่อน
+class _PageText:
+    def __init__(self, context, c):
+        self.context = context
+        self.c = c
+        self.text = c.beginText()
+        self.font = None
+
+    def set_font(self, name, size):
+        if self.font != (name, size):
+            self.text.setFont(name, size)
+            self.font = (name, size)
+
+    def draw(self, x, y, text):
+        self.text.setTextOrigin(x, y)
+        self.text.textOut(text)
+
+    def draw_right(self, x, y, text):
+        self.draw(x - self.context.width(text, *self.font), y, text)
+
+    def draw_centred(self, x, y, text):
+        self.draw(x - self.context.width(text, *self.font) / 2, y, text)
+
+    def finish(self):
+        self.c.drawText(self.text)
+
+# อ่าน CSV ทีละแถว แล้วพักรายการของแต่ละหมวดหมู่ไว้ พร้อมยอดรวมต่อหมวด (totals) สำหรับหน้าสรุป
+# ทุกหมวดใช้ไฟล์ชั่วคราวไฟล์เดียว: พักในหน่วยความจำได้รวม SPILL_ROWS แถว เต็มเมื่อไรเขียนของแต่ละหมวดต่อท้ายไฟล์
+# เป็นก้อน แล้วจำ (ตำแหน่ง, ความยาว) ของก้อนไว้ในหมวดนั้น จำนวนไฟล์ที่เปิดคงที่ไม่ว่าจะมีหมวดย่อยกี่หมวด
+# รายงานเล็กที่ไม่เกิน SPILL_ROWS แถวไม่แตะดิสก์เลย (ลำดับหมวดหมู่ = ลำดับที่พบครั้งแรก)
+# จำนวนเงินพักไว้เป็นสตางค์ (int) ยอดรวมทุกหน้าจึงตรงทุกสตางค์
+SPILL_ROWS = 8192
+
+class _SpilledSections:
+    def __init__(self):
+        self.file = None
+        self.pending = {}
+        self.blocks = {}
+        self.totals = {}
+        self.buffered = 0
+
+    def add(self, category, detail, amount):
+        rows = self.pending.get(category)
+        if rows is None:
+            rows = self.pending[category] = []
+            self.blocks[category] = []
+            self.totals[category] = 0
+        satang = to_satang(amount)
+        rows.append((detail, satang))
+        self.totals[category] += satang
+        self.buffered += 1
+        if self.buffered >= SPILL_ROWS:
+            self._spill()
+
+    def _spill(self):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        self.file.seek(0, os.SEEK_END)
+        for category, rows in self.pending.items():
+            if rows:
+                buffer = io.StringIO(newline='')
+                csv.writer(buffer).writerows(rows)
+                data = buffer.getvalue().encode('utf-8')
+                self.blocks[category].append((self.file.tell(), len(data)))
+                self.file.write(data)
+                rows.clear()
+        self.buffered = 0
+
+    # อ่านทีละก้อน (ก้อนถูกอ่านทั้งก้อนก่อน yield หลายหมวดอ่านสลับกันได้) แล้วต่อด้วยแถวที่ยังพักในหน่วยความจำ
+    def _rows(self, category):
+        for offset, length in self.blocks[category]:
+            self.file.seek(offset)
+            text = self.file.read(length).decode('utf-8')
+            for name, amount in csv.reader(io.StringIO(text, newline='')):
+                yield name, int(amount)
+        yield from self.pending[category]
+
+    def items(self):
+        for category in self.pending:
+            yield category, self._rows(category)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.pending.clear()
+        self.blocks.clear()
+
+# รายการที่มีวันที่ขึ้นต้นด้วยวันที่แบบสั้น ("05/03/67 รายละเอียด")
+def _spill_rows(rows):
+    income = _SpilledSections()
+    expense = _SpilledSections()
+    for row in rows:
+        kind, category, detail, amount = row[:4]
+        date = row_date(row)
+        if date:
+            detail = f"{short(to_ordinal(date))} {detail}"
+        target = income if kind == "รายรับ" else expense
+        target.add(category, detail, amount)
+    return income, expense
+
+def _csv_rows(csv_path):
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+# แถวที่วันที่อยู่ในช่วง period = (เลขวันแรก, เลขวันสุดท้าย) สำหรับแถวที่ยังไม่ได้กรอง (เช่นอ่านจาก CSV ตรง ๆ)
+def _in_period(rows, period):
+    start, end = period
+    for row in rows:
+        date = row_date(row)
+        if date and start <= to_ordinal(date) <= end:
+            yield row
+
+# แปลงหมวดหมู่ -> บรรทัดที่ต้องวาด (kind, ข้อความ, จำนวนเงิน, หมวดหลัก)
+def _section_lines(items):
+    current_main = ""
+    for section, entries in items:
+        parts = [s.strip() for s in section.split(">")]
+        main_cat = parts[0]
+        sub_cat = parts[1] if len(parts) > 1 else None
+
+        if current_main != main_cat:
+            current_main = main_cat
+            yield "main", main_cat, None, main_cat
+        if sub_cat:
+            yield "sub", sub_cat, None, main_cat
+        for name, amount in entries:
+            yield "entry", name, amount, main_cat
+        yield "gap", None, None, main_cat
+
+# คอลัมน์รายรับ/รายจ่ายหนึ่งคอลัมน์ ที่วาดต่อเนื่องข้ามหน้าได้
+class _Column:
+    def __init__(self, lines, x):
+        self.lines = lines
+        self.x = x
+        self.total = 0
+        self.pending = next(lines, None)
+
+    @property
+    def done(self):
+        return self.pending is None
+
+    def draw_page(self, pen, y, first_page):
+        with span("draw_section"):
+            return self._draw_page(pen, y, first_page)
+
+    def _draw_page(self, pen, y, first_page):
+        x = self.x
+        if not first_page and not self.done:
+            pen.set_font(REGULAR, 15)
+            pen.draw(x, y, "ยอดยกมา")
+            pen.draw_right(x + 200, y, format_satang(self.total))
+            y -= LINE_HEIGHT["entry"]
+            kind, _, _, main_cat = self.pending
+            if kind != "main":
+                pen.set_font(BOLD, 16)
+                pen.draw(x, y, f"{main_cat} (ต่อ)")
+                y -= LINE_HEIGHT["main"]
+
+        # เว้นที่ไว้หนึ่งบรรทัดสำหรับ "ยอดยกไป"
+        limit = BOTTOM_MARGIN + LINE_HEIGHT["entry"]
+        while self.pending is not None:
+            kind, text, amount, _ = self.pending
+            if y - LINE_HEIGHT[kind] < limit and kind != "gap":
+                break
+            if kind == "main":
+                pen.set_font(BOLD, 16)
+                pen.draw(x, y, text)
+            elif kind == "sub":
+                pen.set_font(BOLD, 15)
+                pen.draw(x + 20, y, text)
+            elif kind == "entry":
+                pen.set_font(REGULAR, 15)
+                pen.draw(x + 20, y, text)
+                pen.draw_right(x + 200, y, format_satang(amount))
+                self.total += amount
+            y -= LINE_HEIGHT[kind]
+            self.pending = next(self.lines, None)
+
+        if not self.done:
+            pen.set_font(BOLD, 15)
+            pen.draw(x, BOTTOM_MARGIN, "ยอดยกไป")
+            pen.draw_right(x + 200, BOTTOM_MARGIN, format_satang(self.total))
+        return y
+
+# เริ่มหน้าใหม่: หัวคอลัมน์จาก Form XObject + เลขหน้า คืน (pen ของหน้า, y ที่เริ่มเขียนได้)
+# subtitle (เช่นช่วงวันที่) พิมพ์เหนือหัวคอลัมน์ของทุกหน้า
+def _start_page(context, c, page, subtitle=None):
+    c.doForm("furniture")
+    pen = _PageText(context, c)
+    pen.set_font(REGULAR, 12)
+    pen.draw_centred(A4[0] / 2, BOTTOM_MARGIN - 25, f"หน้า {page}")
+    if subtitle:
+        pen.set_font(REGULAR, 14)
+        pen.draw_centred(A4[0] / 2, A4[1] - TOP_MARGIN + 22, subtitle)
+    return pen, A4[1] - TOP_MARGIN - 25
+
+def _draw_totals(pen, y_total, total_income, total_expense):
+    pen.set_font(BOLD, 16)
+
+    pen.draw(X_INCOME, y_total, "รวมรายรับ")
+    pen.draw_right(X_INCOME + 200, y_total, format_satang(total_income))
+
+    pen.draw(X_EXPENSE, y_total, "รวมรายจ่าย")
+    pen.draw_right(X_EXPENSE + 200, y_total, format_satang(total_expense))
+
+    # รายรับสูง/ต่ำกว่ารายจ่าย
+    y_total -= 20
+    diff = total_income - total_expense
+
+    if diff > 0:
+        pen.draw(X_EXPENSE, y_total, "รายรับ สูง กว่า รายจ่าย")
+        pen.draw_right(X_EXPENSE + 200, y_total, f"({format_satang(abs(diff))})")
+    elif diff < 0:
+        pen.draw(X_EXPENSE, y_total, "รายรับ ต่ำ กว่า รายจ่าย")
+        pen.draw_right(X_EXPENSE + 200, y_total, f"({format_satang(abs(diff))})")
+    else:
+        pen.draw(X_EXPENSE, y_total, "รายรับ เท่ากับ รายจ่าย")
+        pen.draw_right(X_EXPENSE + 200, y_total, format_satang(0))
+
+# ===== หน้าสรุปท้ายรายงาน: กราฟตามหมวดหลัก และงบประมาณเทียบยอดจริง (charts.py / budgets.py) =====
+SUMMARY_WIDTH = A4[0] - 2 * X_INCOME
+BUDGET_COLUMNS = (330, 420, 500, A4[0] - X_INCOME)
+
+def _start_summary_page(context, c, page, subtitle=None):
+    pen = _PageText(context, c)
+    pen.set_font(REGULAR, 12)
+    pen.draw_centred(A4[0] / 2, BOTTOM_MARGIN - 25, f"หน้า {page}")
+    if subtitle:
+        pen.set_font(REGULAR, 14)
+        pen.draw_centred(A4[0] / 2, A4[1] - TOP_MARGIN + 22, subtitle)
+    pen.set_font(BOLD, 18)
+    pen.draw(X_INCOME, A4[1] - TOP_MARGIN, "สรุปตามหมวดหมู่")
+    return pen, A4[1] - TOP_MARGIN - 25
+
+# ตารางงบประมาณ: หมวด งบ ยอดจริง ส่วนต่าง (บวก = อยู่ในงบ/เกินเป้า) และร้อยละของงบ
+def _budget_lines(rows):
+    kind = None
+    yield "main", ["หมวดหมู่", "งบประมาณ", "ยอดจริง", "ส่วนต่าง", "ร้อยละ"]
+    for row_kind, main, budget, actual, difference in rows:
+        if row_kind != kind:
+            kind = row_kind
+            yield "sub", [kind]
+        yield "entry", [main, format_satang(budget), format_satang(actual), format_satang(difference),
+                        f"{actual * 100 / budget:,.1f}%"]
+
+# เริ่มหน้าใหม่ต่อจากหน้าปัจจุบัน (pen ของหน้าเดิมปิดแล้ว) วาดกราฟทีละรูป ไม่พอที่ขึ้นหน้าใหม่ คืนจำนวนหน้า
+def _draw_summary(context, c, page, subtitle, category_totals, report_dir):
+    from budgets import budget_rows, load_budgets
+    from charts import chart_height, draw_pdf, main_totals, summary_charts
+    with span("draw_summary"):
+        mains = main_totals(category_totals)
+        budgets = load_budgets(report_dir)
+        c.showPage()
+        page += 1
+        pen, y = _start_summary_page(context, c, page, subtitle)
+        for name, data in summary_charts(mains, budgets):
+            height = chart_height(name, data)
+            if y - height < BOTTOM_MARGIN:
+                pen.finish()
+                c.showPage()
+                page += 1
+                pen, y = _start_summary_page(context, c, page, subtitle)
+            draw_pdf(name, data, c, X_INCOME, y - height, SUMMARY_WIDTH, height)
+            y -= height + 20
+        rows = budget_rows(budgets, mains)
+        for kind, cells in _budget_lines(rows) if rows else ():
+            if y - LINE_HEIGHT[kind] < BOTTOM_MARGIN:
+                pen.finish()
+                c.showPage()
+                page += 1
+                pen, y = _start_summary_page(context, c, page, subtitle)
+            pen.set_font(REGULAR if kind == "entry" else BOLD, 16 if kind == "main" else 15)
+            pen.draw(X_INCOME + (20 if kind == "entry" else 0), y, cells[0])
+            for x, text in zip(BUDGET_COLUMNS, cells[1:]):
+                pen.draw_right(x, y, text)
+            y -= LINE_HEIGHT[kind]
+        pen.finish()
+    return page
+
+# period: เฉพาะรายการในช่วงวันที่ (อ่าน CSV ทั้งไฟล์แล้วกรอง ใช้ generate_pdf ถ้าต้องการอ่านเฉพาะเดือนที่เกี่ยว)
+# งบประมาณและแคชกราฟของหน้าสรุปมาจากโฟลเดอร์เดียวกับ csv_path
+def render_pdf(csv_path, pdf_path, context=None, period=None, summary=True):
+    rows = _csv_rows(csv_path)
+    report_dir = os.path.dirname(csv_path) or "."
+    if period is not None:
+        return render_rows(_in_period(rows, period), pdf_path, context, _period_title(period), summary, report_dir)
+    return render_rows(rows, pdf_path, context, summary=summary, report_dir=report_dir)
+
+def _period_title(period):
+    return f"ช่วงวันที่ {describe(*period)}"
+
+# วาด PDF หลายหน้าจากแถว (ประเภท, หมวดหมู่, รายละเอียด, จำนวนเงิน[, วันที่]) คืนจำนวนหน้าที่ได้
+# แต่ละหน้าถูกปิดด้วย showPage ทันทีที่เต็ม ข้อมูลแถวไม่ค้างอยู่ในหน่วยความจำ
+# context (ค่าเริ่มต้น get_context()) เก็บฟอนต์และของที่ใช้ซ้ำข้ามเอกสาร
+# summary: ต่อท้ายด้วยหน้าสรุปกราฟ/งบประมาณ (report_dir: โฟลเดอร์ของ budgets.json และแคชกราฟ ค่าเริ่มต้น REPORT_DIR)
+def render_rows(rows, pdf_path, context=None, subtitle=None, summary=True, report_dir=None):
+    with span("render_pdf"):
+        return _render_rows(rows, pdf_path, context or get_context(), subtitle, summary, report_dir)
+
+def _render_rows(rows, pdf_path, context, subtitle, summary, report_dir):
+    income, expense = _spill_rows(rows)
+    try:
+        c = context.canvas(pdf_path)
+        columns = [_Column(_section_lines(income.items()), X_INCOME),
+                   _Column(_section_lines(expense.items()), X_EXPENSE)]
+
+        page = 1
+        pen, y = _start_page(context, c, page, subtitle)
+        while True:
+            y_end = min(col.draw_page(pen, y, page == 1) for col in columns)
+            if all(col.done for col in columns):
+                break
+            pen.finish()
+            c.showPage()
+            page += 1
+            pen, y = _start_page(context, c, page, subtitle)
+
+        # ส่วนรวมยอด (ต้องการที่ 2 บรรทัด ถ้าไม่พอขึ้นหน้าใหม่)
+        y_total = y_end - 30
+        if y_total - 20 < BOTTOM_MARGIN:
+            pen.finish()
+            c.showPage()
+            page += 1
+            pen, y_total = _start_page(context, c, page, subtitle)
+        _draw_totals(pen, y_total, columns[0].total, columns[1].total)
+        pen.finish()
+        if summary:
+            page = _draw_summary(context, c, page, subtitle,
+                                 {report_core.TYPES[0]: income.totals, report_core.TYPES[1]: expense.totals},
+                                 report_dir)
+
+        with span("canvas.save"):
+            c.save()
+        return page
+    finally:
+        income.close()
+        expense.close()
+
+# สร้าง PDF จาก CSV
+def generate_pdf_from_csv(csv_path, report_title):
+    pdf_path = os.path.join(report_core.REPORT_DIR, report_title + ".pdf")
+    render_pdf(csv_path, pdf_path)
+    return pdf_path
+
+# สร้าง PDF จากรายงานในที่เก็บปัจจุบัน (CSV หรือ SQLite)
+# period = (เลขวันแรก, เลขวันสุดท้าย) จาก dates.period: เฉพาะรายการในช่วง อ่านเฉพาะพาร์ทิชันเดือนที่เกี่ยว
+# ไฟล์ได้ชื่อ <รายงาน>_<วันแรก>_<วันสุดท้าย>.pdf
+def generate_pdf(report_name, period=None):
+    if period is None:
+        pdf_path = os.path.join(report_core.REPORT_DIR, report_name + ".pdf")
+        render_rows(report_core.iter_report(report_name), pdf_path)
+        return pdf_path
+    from date_partitions import range_rows
+    start, end = period
+    suffix = f"_{to_text(start) if start > 1 else 'start'}_{to_text(end) if end < MAX_DAY else 'end'}"
+    pdf_path = os.path.join(report_core.REPORT_DIR, report_name + suffix + ".pdf")
+    render_rows(range_rows(report_name, start, end), pdf_path, subtitle=_period_title(period))
+    return pdf_path
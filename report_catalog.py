@@ -0,0 +1,199 @@
+import csv
+import json
+import os
+import threading
+import report_core
+from dates import row_date
+from money import to_satang
+
+# สมุดรายชื่อรายงาน: ข้อมูลย่อของทุกรายงานสำหรับหน้าเลือกรายงาน ไม่ต้องเปิดไฟล์ทุกครั้งที่เปิดหน้า
+# ต่อรายงาน: ชื่อ, ขนาดไฟล์, mtime, จำนวนแถว, ช่วงวันที่, ยอดรายรับ/รายจ่าย (สตางค์)
+# บันทึกไว้ที่ REPORT_DIR/.catalog.json ใช้ข้ามการเปิดโปรแกรม
+#
+# refresh: os.scandir อ่านรายชื่อไฟล์ทั้งโฟลเดอร์ในครั้งเดียว แล้วเทียบ (mtime_ns, ขนาด) กับที่บันทึกไว้
+# อ่านใหม่เฉพาะไฟล์ที่เปลี่ยน ไฟล์ที่หายไปก็ตัดออก (บน network drive ที่ช้า รายงานที่ไม่เปลี่ยนไม่ถูกเปิดเลย)
+# วันที่: คอลัมน์วันที่ของรายการ (แถว 4 คอลัมน์ของรายงานเดิมไม่มีวันที่)
+
+SIDECAR_NAME = ".catalog.json"
+INCOME = report_core.TYPES[0]
+
+class ReportInfo:
+    __slots__ = ("name", "size", "mtime_ns", "rows", "first_date", "last_date", "income", "expense")
+
+    def __init__(self, name, size=None, mtime_ns=None, rows=0, first_date=None, last_date=None,
+                 income=0, expense=0):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.rows = rows
+        self.first_date = first_date
+        self.last_date = last_date
+        self.income = income
+        self.expense = expense
+
+    # ยอดคงเหลือ (สตางค์) รายงานที่อ่านไม่ได้เป็น None
+    @property
+    def balance(self):
+        if self.income is None:
+            return None
+        return self.income - self.expense
+
+    @property
+    def mtime(self):
+        return self.mtime_ns / 1e9 if self.mtime_ns is not None else None
+
+    def dump(self):
+        return [getattr(self, field) for field in self.__slots__]
+
+    def __repr__(self):
+        return f"ReportInfo({self.name!r}, rows={self.rows}, balance={self.balance})"
+
+# อ่านไฟล์รายงานหนึ่งรอบ ได้จำนวนแถว ยอดรวม และช่วงวันที่
+def scan_report(name, path, st):
+    rows = income = expense = 0
+    first = last = None
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 4:
+                continue
+            rows += 1
+            if row[0] == INCOME:
+                income += to_satang(row[3])
+            else:
+                expense += to_satang(row[3])
+            date = row_date(row)
+            if date:
+                if first is None or date < first:
+                    first = date
+                if last is None or date > last:
+                    last = date
+    return ReportInfo(name, st.st_size, st.st_mtime_ns, rows, first, last, income, expense)
+
+class ReportCatalog:
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+        self.sidecar_path = os.path.join(report_dir, SIDECAR_NAME)
+        self.reports = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.sidecar_path, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        try:
+            self.reports = {fields[0]: ReportInfo(*fields) for fields in stored}
+        except TypeError:
+            return
+        self.loaded = True
+
+    def save(self):
+        with self._lock:
+            stored = [info.dump() for info in self.reports.values()]
+        # ชื่อไฟล์ชั่วคราวไม่ซ้ำกันต่อ process/thread: save พร้อมกันหลายที่ไม่เขียนทับไฟล์ของกันและกัน
+        tmp_path = f"{self.sidecar_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_path, self.sidecar_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # เทียบกับโฟลเดอร์จริง อ่านใหม่เฉพาะไฟล์ที่เปลี่ยน คืนจำนวนรายงานที่อ่านใหม่/ลบออก
+    def refresh(self, task=None):
+        try:
+            with os.scandir(self.report_dir) as it:
+                found = [(e.name[:-4], e.path, e.stat()) for e in it
+                         if e.name.endswith(".csv") and e.is_file()]
+        except FileNotFoundError:
+            found = []
+        with self._lock:
+            current = dict(self.reports)
+        changed = [(name, path, st) for name, path, st in found
+                   if name not in current or current[name].mtime_ns != st.st_mtime_ns
+                   or current[name].size != st.st_size]
+        removed = current.keys() - {name for name, _, _ in found}
+
+        for i, (name, path, st) in enumerate(changed, 1):
+            if task is not None:
+                task.check()
+                task.set_status(f"อ่านรายงานที่เปลี่ยน {i:,}/{len(changed):,}: {name}")
+            try:
+                info = scan_report(name, path, st)
+            except FileNotFoundError:
+                removed.add(name)
+                continue
+            except (OSError, ValueError, UnicodeDecodeError):
+                # อ่านไม่ได้ก็ยังแสดงชื่อ (ยอดเป็น None) จะได้เปิดดูได้
+                info = ReportInfo(name, st.st_size, st.st_mtime_ns, None, income=None, expense=None)
+            with self._lock:
+                self.reports[name] = info
+
+        with self._lock:
+            for name in removed:
+                self.reports.pop(name, None)
+        if changed or removed or not self.loaded:
+            self.loaded = True
+            self.save()
+        return len(changed) + len(removed)
+
+    def entries(self):
+        with self._lock:
+            return sorted(self.reports.values(), key=lambda info: info.name)
+
+# SQLite: ข้อมูลย่อทุกรายงานได้จาก query เดียว (ไม่มีขนาดไฟล์/mtime ต่อรายงาน)
+def _sqlite_entries():
+    return [ReportInfo(name, rows=rows, first_date=first, last_date=last, income=income, expense=expense)
+            for name, rows, first, last, income, expense in report_core._db().catalog()]
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(report_dir=None):
+    report_dir = report_dir or report_core.REPORT_DIR
+    with _catalogs_lock:
+        catalog = _catalogs.get(report_dir)
+        if catalog is None:
+            catalog = _catalogs[report_dir] = ReportCatalog(report_dir)
+        return catalog
+
+# รายการล่าสุด (refresh ก่อน)
+def list_catalog(task=None):
+    if report_core.STORAGE == "sqlite":
+        return _sqlite_entries()
+    catalog = get_catalog()
+    catalog.refresh(task)
+    return catalog.entries()
+
+# รายการที่บันทึกไว้ (ไม่แตะไฟล์รายงาน) ให้หน้าเลือกรายงานขึ้นทันที ครั้งแรกที่ยังไม่มี .catalog.json ค่อย refresh
+def cached_catalog(task=None):
+    if report_core.STORAGE == "sqlite":
+        return _sqlite_entries()
+    catalog = get_catalog()
+    if not catalog.loaded:
+        catalog.refresh(task)
+    return catalog.entries()
+
+# ===== เรียง / กรอง / แบ่งหน้า =====
+SORT_KEYS = {
+    "name": lambda info: info.name,
+    "modified": lambda info: info.mtime_ns or 0,
+    "size": lambda info: info.size or 0,
+    "rows": lambda info: info.rows or 0,
+    "date": lambda info: info.last_date or "",
+    "balance": lambda info: info.balance or 0,
+}
+
+# คืน (จำนวนที่ตรงเงื่อนไขทั้งหมด, รายการในหน้าที่ขอ)
+def query(entries, text="", sort="name", descending=False, offset=0, limit=None):
+    text = text.strip().lower()
+    matched = [info for info in entries if text in info.name.lower()] if text else list(entries)
+    matched.sort(key=SORT_KEYS[sort], reverse=descending)
+    end = None if limit is None else offset + limit
+    return len(matched), matched[offset:end]
@@ -0,0 +1,208 @@
+import csv
+import io
+import os
+from collections import defaultdict
+from diagnostics import span
+from file_lock import LOCK_TIMEOUT, FileLock, read_counter
+from money import to_baht, to_satang
+
+# ส่วนจัดการข้อมูลรายงาน ไม่พึ่ง tkinter และ reportlab
+# ใช้ได้ทั้งจาก UI.py, cli.py และงาน batch ที่ไม่มีหน้าจอ
+
+REPORT_DIR = "reports"
+# ที่เก็บรายงาน: "csv" (หนึ่งไฟล์ต่อรายงาน ค่าเริ่มต้น) หรือ "sqlite" (ledger_db ใน REPORT_DIR)
+STORAGE = os.environ.get("LEDGER_STORAGE", "csv")
+HEADER = ["ประเภท", "หมวดหมู่", "รายละเอียด", "จำนวนเงิน"]
+# รายงานที่บันทึกตั้งแต่มีวันที่รายการมี 5 คอลัมน์ รายงาน 4 คอลัมน์แบบเดิมยังอ่านได้ทุกที่ (วันที่ว่าง)
+# คอลัมน์ที่ 5 ของแถวคือวันที่เสมอ ไม่ว่าหัวตารางจะมีกี่คอลัมน์ (ต่อท้ายแถว 5 คอลัมน์ลงไฟล์เดิมได้)
+DATE_COLUMN = "วันที่"
+DATED_HEADER = HEADER + [DATE_COLUMN]
+TYPES = ["รายรับ", "รายจ่าย"]
+
+CATEGORY_OPTIONS = {
+    "รายรับ": [
+        "กองทุนกรรมการ", "กองทุนการศึกษา", "งานไหว้บรรพบุรุษ (ตรุษจีน)",
+        "งานไหว้พระจันทร์", "สนับสนุนหนังสือทำเนียบ", "ค่าทำป้ายแกะสลัก",
+        "ค่าตั้งป้ายบรรพบุรุษ", "ดอกเบี้ยรับ", "รับบริจาคทั่วไป",
+        "รับบริจาคสนับสนุนโครงการ", "อื่นๆ"
+    ],
+    "รายจ่าย": [
+        "เงินเดือน", "ค่ารถ ค่าล่วงเวลาผจก.", "การดำเนินงานและกิจกรรม",
+        "การศึกษา และเยาวชน", "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง",
+        "ซ่อมแซม ค่าจ้างและค่าแรง", "ค่าสาธารณูปโภค", "อื่นๆ"
+    ]
+}
+
+def report_path(report_name):
+    return os.path.join(REPORT_DIR, report_name + ".csv")
+
+# ===== การเขียนพร้อมกันหลายเครื่อง =====
+# ทุกการเขียนรายงาน (store_report / append_report / create_report / save_if) ถือ report_lock ของรายงานนั้น
+# ไฟล์ล็อกอยู่ที่ REPORT_DIR/.locks/<ชื่อรายงาน>.lock ใช้ได้ทั้งที่เก็บ CSV และ SQLite
+# ล็อกเฉพาะช่วงตรวจรุ่น+เขียน ไม่ล็อกระหว่างเปิดแก้ไข (การแก้ไขพร้อมกันรวมกันตอนบันทึก ดู report_merge)
+LOCK_DIR = ".locks"
+
+class VersionConflict(Exception):
+    pass
+
+def lock_path(report_name):
+    return os.path.join(REPORT_DIR, LOCK_DIR, report_name + ".lock")
+
+def report_lock(report_name, timeout=LOCK_TIMEOUT):
+    return FileLock(lock_path(report_name), timeout)
+
+# บันทึกข้อมูลลง CSV
+# เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย os.replace ถ้าเครื่องดับกลางทางไฟล์เดิมยังอยู่ครบ
+def save_to_csv(report_name, data):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    csv_path = report_path(report_name)
+    tmp_path = csv_path + ".tmp"
+    with span("save_to_csv"):
+        with open(tmp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(DATED_HEADER)
+            writer.writerows(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, csv_path)
+    return csv_path
+
+# ต่อท้ายรายการใหม่ (สร้างไฟล์พร้อมหัวตารางถ้ายังไม่มี)
+# รวมทุกแถวเป็นข้อความก้อนเดียวแล้วเขียนครั้งเดียว ไม่แตะข้อมูลเดิมในไฟล์
+def append_to_csv(report_name, data):
+    csv_path = report_path(report_name)
+    if not os.path.exists(csv_path):
+        return save_to_csv(report_name, data)
+    with span("append_to_csv"):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(data)
+        with open(csv_path, 'a', newline='', encoding='utf-8-sig') as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+    return csv_path
+
+# อ่านรายงานทั้งหมด (เรียงตามชื่อ) หน้าเลือกรายงานใช้ report_catalog ที่มีข้อมูลย่อด้วย
+def list_all_reports():
+    with os.scandir(REPORT_DIR) as it:
+        return sorted(e.name for e in it if e.name.endswith(".csv") and e.is_file())
+
+# อ่าน CSV ทั้งไฟล์ (รวมแถวหัวตาราง) task (ถ้ามี) ใช้ตรวจการยกเลิกและรายงานสถานะจาก worker thread
+def read_csv_rows(path, task=None):
+    rows = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for i, row in enumerate(csv.reader(f)):
+            rows.append(row)
+            if task is not None and i % 10000 == 0:
+                task.check()
+                task.set_status(f"อ่านแล้ว {i:,} แถว")
+    return rows
+
+# ยอดรวมแยกตามประเภทและหมวดหมู่ {ประเภท: {หมวดหมู่: ยอด}} และจำนวนแถว
+# รวมเป็นสตางค์ (int) แล้วค่อยแปลงเป็นบาทตอนคืนค่า ยอดไม่คลาดตามจำนวนแถว
+def summarize(csv_path):
+    totals = {t: defaultdict(int) for t in TYPES}
+    count = 0
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            kind = "รายรับ" if row["ประเภท"] == "รายรับ" else "รายจ่าย"
+            totals[kind][row["หมวดหมู่"]] += to_satang(row["จำนวนเงิน"])
+            count += 1
+    return {t: {k: to_baht(v) for k, v in totals[t].items()} for t in TYPES}, count
+
+# ===== ฟังก์ชันที่ไม่ขึ้นกับที่เก็บ (ใช้ชื่อรายงานไม่มีนามสกุล) =====
+def _db():
+    from ledger_db import get_db
+    return get_db()
+
+def list_reports():
+    if STORAGE == "sqlite":
+        return _db().list_reports()
+    return [f[:-4] for f in list_all_reports()]
+
+def report_exists(report_name):
+    if STORAGE == "sqlite":
+        return _db().exists(report_name)
+    return os.path.exists(report_path(report_name))
+
+# รุ่นของรายงาน เปลี่ยนทุกครั้งที่รายงานถูกเขียน: SQLite = reports.version
+# CSV = [mtime_ns, ขนาด, ตัวนับในไฟล์ล็อก] (ไฟล์ที่ถูกแก้นอกโปรแกรมยังเห็นจาก mtime/ขนาด)
+# ไม่มีรายงาน: CSV -> FileNotFoundError, SQLite -> KeyError
+def report_version(report_name):
+    if STORAGE == "sqlite":
+        return _db().version(report_name)
+    st = os.stat(report_path(report_name))
+    return [st.st_mtime_ns, st.st_size, read_counter(lock_path(report_name))]
+
+# รุ่นของรายงาน หรือ None ถ้ายังไม่มีรายงาน
+def current_version(report_name):
+    try:
+        return report_version(report_name)
+    except (FileNotFoundError, KeyError):
+        return None
+
+# แถวข้อมูลทั้งหมด (ไม่รวมหัวตาราง)
+def load_report(report_name, task=None):
+    if STORAGE == "sqlite":
+        return _db().read_rows(report_name)
+    return read_csv_rows(report_path(report_name), task)[1:]
+
+def iter_report(report_name):
+    if STORAGE == "sqlite":
+        yield from _db().iter_rows(report_name)
+        return
+    with open(report_path(report_name), newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+def store_report(report_name, data):
+    with report_lock(report_name) as lock:
+        if STORAGE == "sqlite":
+            _db().save_rows(report_name, data)
+            return report_name
+        path = save_to_csv(report_name, data)
+        lock.bump()
+        return path
+
+def append_report(report_name, data):
+    with report_lock(report_name) as lock:
+        if STORAGE == "sqlite":
+            _db().append_rows(report_name, data)
+            return report_name
+        path = append_to_csv(report_name, data)
+        lock.bump()
+        return path
+
+# สร้างรายงานใหม่ มีชื่อนี้อยู่แล้ว (รวมถึงมีคนสร้างตัดหน้าไประหว่างนี้) -> FileExistsError
+def create_report(report_name, data):
+    with report_lock(report_name):
+        if report_exists(report_name):
+            raise FileExistsError(report_name)
+        return store_report(report_name, data)
+
+def summarize_report(report_name):
+    if STORAGE == "sqlite":
+        return _db().summarize(report_name)
+    from aggregate_cache import get_cache
+    cache = get_cache()
+    aggregates = cache.get(report_path(report_name))
+    cache.save()
+    return aggregates["category"], aggregates["rows"]
+
+# บันทึกตาม mode/base จาก EditSession.pending() (data = แถวทั้งหมดที่จะอยู่ในรายงาน)
+def save_changes(report_name, data, mode, base):
+    if mode == "append":
+        return append_report(report_name, data[base:])
+    if mode == "rewrite":
+        return store_report(report_name, data)
+    return report_name
+
+# save_changes เฉพาะเมื่อรายงานยังเป็นรุ่น version (None = ต้องยังไม่มีรายงาน) ตรวจและเขียนใต้ล็อกเดียวกัน
+# คืน (ผลของ save_changes, รุ่นหลังบันทึก) ถูกเขียนจากที่อื่นไปก่อน -> VersionConflict
+def save_if(report_name, data, mode, base, version):
+    with report_lock(report_name):
+        if current_version(report_name) != version:
+            raise VersionConflict(report_name)
+        result = save_changes(report_name, data, mode, base)
+        return result, current_version(report_name)
@@ -0,0 +1,527 @@
+import csv
+import datetime
+import importlib.util
+import json
+import os
+import re
+import zipfile
+from decimal import Decimal
+from itertools import islice
+from html import unescape
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+import dates
+import report_core
+from diagnostics import count, span
+from ledger import CATEGORIES, Ledger
+from money import to_text
+from report_core import DATED_HEADER, HEADER, TYPES
+
+# ส่งออก/นำเข้ารายงานเป็นไฟล์รูปแบบอื่น: CSV, XLSX, JSON lines และ Parquet (เมื่อติดตั้ง pyarrow)
+# ทำงานเป็นสายทีละก้อน หน่วยความจำคงที่ตาม BATCH_ROWS ไม่ว่ารายงานจะใหญ่แค่ไหน:
+#   ส่งออก: iter_report (หรือ range_rows เฉพาะช่วงวันที่) -> Ledger ก้อนละ BATCH_ROWS แถว -> writer ของรูปแบบ
+#   นำเข้า: reader ของรูปแบบ -> Ledger ก้อนละ BATCH_ROWS (ตรวจจำนวนเงิน/วันที่ เป็นรูปมาตรฐาน) -> CSV ชั่วคราว -> รายงาน
+# ทั้งส่งออกและนำเข้าเขียนลงไฟล์ชั่วคราวแล้วค่อยแทนที่ (ยกเลิก/ผิดพลาดกลางทาง ไฟล์/รายงานเดิมยังอยู่)
+#
+# เพิ่มรูปแบบ: register(Format(ชื่อ, นามสกุล, คำอธิบาย, writer, reader, requires))
+#   writer(path) -> object ที่มี write(ledger) และ close()
+#   reader(path) -> generator ของแถว [ประเภท, หมวดหมู่, รายละเอียด, จำนวนเงิน, วันที่]
+#   requires: โมดูลเสริมที่ต้องมี (ไม่มี = ยังอยู่ในรายการแต่ใช้ไม่ได้ พร้อมบอกว่าต้องติดตั้งอะไร)
+# คอลัมน์ในทุกรูปแบบใช้ชื่อตาม DATED_HEADER เหมือน CSV ไฟล์นำเข้าสลับลำดับคอลัมน์หรือไม่มีคอลัมน์วันที่ได้
+
+BATCH_ROWS = 50_000
+# writer ที่สร้างข้อความเองเขียนลงไฟล์ทุก WRITE_ROWS แถว (ไม่ต่อข้อความของทั้งก้อนไว้ในหน่วยความจำ)
+WRITE_ROWS = 4096
+
+class Format:
+    def __init__(self, name, extension, label, writer, reader, requires=None):
+        self.name = name
+        self.extension = extension
+        self.label = label
+        self.writer = writer
+        self.reader = reader
+        self.requires = requires
+
+    @property
+    def available(self):
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+    def check(self):
+        if not self.available:
+            raise ModuleNotFoundError(f"ต้องติดตั้ง {self.requires} ก่อนจึงจะใช้ไฟล์ {self.label} ได้")
+
+    def __repr__(self):
+        return f"Format({self.name!r}, {self.extension!r})"
+
+FORMATS = {}
+
+def register(fmt):
+    FORMATS[fmt.name] = fmt
+    return fmt
+
+# รูปแบบจากชื่อ (ถ้าระบุ) หรือจากนามสกุลของ path
+def format_for(path, name=None):
+    if name is not None:
+        if name not in FORMATS:
+            raise ValueError(f"ไม่รู้จักรูปแบบ {name!r} (มี {', '.join(FORMATS)})")
+        return FORMATS[name]
+    extension = os.path.splitext(path)[1].lower()
+    for fmt in FORMATS.values():
+        if fmt.extension == extension:
+            return fmt
+    raise ValueError(f"ไม่รู้จักไฟล์นามสกุล {extension or '(ไม่มี)'} (ใช้ได้: "
+                     + ", ".join(fmt.extension for fmt in FORMATS.values()) + ")")
+
+# ลำดับคอลัมน์ในไฟล์ -> ฟังก์ชันเลือกค่าเป็นแถวตาม DATED_HEADER (ช่องที่ไม่มี/None เป็น "")
+def _picker(header):
+    names = [str(name).strip().lstrip("﻿") for name in header]
+    missing = [name for name in HEADER if name not in names]
+    if missing:
+        raise ValueError(f"ไม่พบคอลัมน์ {', '.join(missing)} (มี: {', '.join(names)})")
+    index = [names.index(name) if name in names else None for name in DATED_HEADER]
+
+    def pick(row):
+        return [row[i] if i is not None and i < len(row) and row[i] is not None else "" for i in index]
+    return pick
+
+# ประเภท/หมวดหมู่/รายละเอียด/วันที่ที่เป็นตัวเลขในไฟล์ (เช่นรายละเอียด 1001 ใน Excel) เป็นข้อความ จำนวนเงินคงไว้ให้ Ledger แปลง
+def _texts(row):
+    for i in (0, 1, 2, 4):
+        value = row[i]
+        if type(value) is not str:
+            row[i] = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+    return row
+
+def ledger_batches(rows, size=BATCH_ROWS, task=None, verb="อ่าน"):
+    rows = iter(rows)
+    done = 0
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        done += len(batch)
+        yield Ledger(batch)
+        if task is not None:
+            task.check()
+            task.set_status(f"{verb}แล้ว {done:,} แถว")
+
+# ===== CSV =====
+class CsvWriter:
+    def __init__(self, path):
+        self.f = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(DATED_HEADER)
+
+    def write(self, ledger):
+        self.writer.writerows(ledger)
+
+    def close(self):
+        self.f.close()
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        pick = _picker(next(reader, HEADER))
+        for row in reader:
+            if row:
+                yield pick(row)
+
+# ===== JSON lines: หนึ่ง object ต่อบรรทัด จำนวนเงินเป็นตัวเลขทศนิยม 2 ตำแหน่ง (ตรงตามสตางค์) วันที่ว่างเป็น null =====
+class JsonLinesWriter:
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8', newline='\n')
+        self.keys = [json.dumps(name, ensure_ascii=False) for name in DATED_HEADER]
+        self.kinds = [json.dumps(kind, ensure_ascii=False) for kind in TYPES]
+        self.categories = {}
+
+    def write(self, ledger):
+        k0, k1, k2, k3, k4 = self.keys
+        kinds, categories, names = self.kinds, self.categories, CATEGORIES.names
+        dumps, day = json.dumps, dates.to_text
+        lines = []
+        for kind, cid, detail, amount, date in zip(ledger.types, ledger.cats, ledger.details, ledger.amounts,
+                                                   ledger.dates):
+            category = categories.get(cid)
+            if category is None:
+                category = categories[cid] = dumps(names[cid], ensure_ascii=False)
+            date = f'"{day(date)}"' if date else "null"
+            lines.append(f'{{{k0}: {kinds[kind]}, {k1}: {category}, {k2}: {dumps(detail, ensure_ascii=False)}, '
+                         f'{k3}: {to_text(amount)}, {k4}: {date}}}\n')
+            if len(lines) == WRITE_ROWS:
+                self.f.write("".join(lines))
+                lines.clear()
+        self.f.write("".join(lines))
+
+    def close(self):
+        self.f.close()
+
+def read_jsonl(path):
+    pick = _picker(DATED_HEADER)
+    with open(path, encoding='utf-8-sig') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                # parse_float=str: จำนวนเงินไม่ผ่าน float
+                value = json.loads(line, parse_float=str)
+            except ValueError:
+                raise ValueError(f"บรรทัด {number} ไม่ใช่ JSON") from None
+            if isinstance(value, dict):
+                yield _texts([value.get(name) if value.get(name) is not None else "" for name in DATED_HEADER])
+            elif isinstance(value, list):
+                yield _texts(pick(value))
+            else:
+                raise ValueError(f"บรรทัด {number} ต้องเป็น object หรือ array")
+
+# ===== XLSX: เขียน zip ของ XML เองทีละก้อน (แบบ write-only ไม่เก็บเซลล์ไว้ในหน่วยความจำ ไม่ต้องมี openpyxl) =====
+# ข้อความเป็น inline string (ไม่มีตาราง shared strings ที่โตตามจำนวนข้อความ) จำนวนเงินเป็นตัวเลข #,##0.00
+# วันที่เป็นเลขวันของ Excel รูปแบบ yyyy-mm-dd ครบ XLSX_SHEET_ROWS แถว (ขีดจำกัดของ Excel) ขึ้นชีตใหม่
+XLSX_SHEET_ROWS = 1_048_576
+XLSX_COMPRESSION = 1
+XLSX_EPOCH = datetime.date(1899, 12, 30).toordinal()
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_SHEET_HEAD = (_XML_HEAD + f'<worksheet xmlns="{_MAIN_NS}"><sheetViews><sheetView workbookViewId="0">'
+               '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+               '<cols><col min="1" max="1" width="10" customWidth="1"/><col min="2" max="2" width="36" customWidth="1"/>'
+               '<col min="3" max="3" width="40" customWidth="1"/><col min="4" max="4" width="15" customWidth="1"/>'
+               '<col min="5" max="5" width="12" customWidth="1"/></cols><sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+_STYLES = (_XML_HEAD + f'<styleSheet xmlns="{_MAIN_NS}">'
+           '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd"/></numFmts>'
+           '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+           '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+           '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+           '<fill><patternFill patternType="gray125"/></fill></fills>'
+           '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+           '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+           '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+           '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+           '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+           '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+           '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>')
+
+def _text_cell(text, style=""):
+    text = escape(_ILLEGAL_XML.sub("", text))
+    space = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ""
+    return f'<c t="inlineStr"{style}><is><t{space}>{text}</t></is></c>'
+
+class XlsxWriter:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=XLSX_COMPRESSION)
+        self.sheet = None
+        self.sheets = 0
+        self.rows = 0
+        self.kinds = [_text_cell(kind) for kind in TYPES]
+        self.categories = {}
+
+    def _next_sheet(self):
+        if self.sheet is not None:
+            self.sheet.write(_SHEET_TAIL.encode())
+            self.sheet.close()
+        self.sheets += 1
+        self.sheet = self.zip.open(f"xl/worksheets/sheet{self.sheets}.xml", 'w')
+        header = "".join(_text_cell(name, ' s="1"') for name in DATED_HEADER)
+        self.sheet.write((_SHEET_HEAD + f'<row r="1">{header}</row>').encode())
+        self.rows = 1
+
+    def write(self, ledger):
+        kinds, categories, names = self.kinds, self.categories, CATEGORIES.names
+        types, cats, details, amounts, days = ledger.types, ledger.cats, ledger.details, ledger.amounts, ledger.dates
+        start = 0
+        while start < len(ledger):
+            if self.sheet is None or self.rows >= XLSX_SHEET_ROWS:
+                self._next_sheet()
+            end = min(len(ledger), start + XLSX_SHEET_ROWS - self.rows)
+            r = self.rows
+            parts = []
+            for i in range(start, end):
+                r += 1
+                category = categories.get(cats[i])
+                if category is None:
+                    category = categories[cats[i]] = _text_cell(names[cats[i]])
+                day = days[i]
+                date = f'<c s="3"><v>{day - XLSX_EPOCH}</v></c>' if day else ""
+                parts.append(f'<row r="{r}">{kinds[types[i]]}{category}{_text_cell(details[i])}'
+                             f'<c s="2"><v>{to_text(amounts[i])}</v></c>{date}</row>')
+                if len(parts) == WRITE_ROWS:
+                    self.sheet.write("".join(parts).encode())
+                    parts.clear()
+            self.sheet.write("".join(parts).encode())
+            self.rows = r
+            start = end
+
+    def close(self):
+        if self.zip.fp is None:
+            return
+        try:
+            if self.sheet is None:
+                self._next_sheet()
+            self.sheet.write(_SHEET_TAIL.encode())
+            self.sheet.close()
+            sheets = range(1, self.sheets + 1)
+            self.zip.writestr("[Content_Types].xml", _XML_HEAD + (
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '<Override PartName="/xl/workbook.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                '<Override PartName="/xl/styles.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                          'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                          for i in sheets) + '</Types>'))
+            self.zip.writestr("_rels/.rels", _XML_HEAD + (
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+            self.zip.writestr("xl/workbook.xml", _XML_HEAD + (
+                f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+                + "".join(f'<sheet name="รายการ{"" if i == 1 else f" {i}"}" sheetId="{i}" r:id="rId{i}"/>'
+                          for i in sheets) + '</sheets></workbook>'))
+            self.zip.writestr("xl/_rels/workbook.xml.rels", _XML_HEAD + (
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                + "".join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                          for i in sheets)
+                + f'<Relationship Id="rId{self.sheets + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+                '</Relationships>'))
+            self.zip.writestr("xl/styles.xml", _STYLES)
+        finally:
+            self.zip.close()
+
+def _column(ref):
+    n = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        n = n * 26 + ord(ch.upper()) - 64
+    return n - 1
+
+def _rels_targets(z, path):
+    try:
+        with z.open(path) as f:
+            return {rel.get("Id"): rel.get("Target") for _, rel in iterparse(f) if rel.tag.endswith("Relationship")}
+    except KeyError:
+        return {}
+
+# ชีตตามลำดับใน workbook.xml
+def _sheet_paths(z):
+    targets = _rels_targets(z, "xl/_rels/workbook.xml.rels")
+    paths = []
+    with z.open("xl/workbook.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == f"{{{_MAIN_NS}}}sheet":
+                target = targets[elem.get(f"{{{_REL_NS}}}id")]
+                paths.append(target.lstrip("/") if target.startswith("/") else "xl/" + target)
+    return paths
+
+# ตาราง shared strings (ไฟล์ที่บันทึกจาก Excel) ไฟล์ที่ส่งออกจากที่นี่ไม่มี
+def _shared_strings(z):
+    strings = []
+    try:
+        f = z.open("xl/sharedStrings.xml")
+    except KeyError:
+        return strings
+    with f:
+        for _, elem in iterparse(f):
+            if elem.tag == f"{{{_MAIN_NS}}}si":
+                strings.append("".join(t.text or "" for t in elem.iter(f"{{{_MAIN_NS}}}t")))
+                elem.clear()
+    return strings
+
+# แถวของชีตเป็น list ค่าตามตำแหน่งคอลัมน์ (ช่องว่างระหว่างเซลล์เป็น None)
+# ชีตเป็น XML โครงสร้างตายตัว (row > c > v หรือ is > t) แยกด้วย regex ทีละก้อนที่ตัดตรงท้ายแถว
+# เร็วกว่า expat/iterparse หลายเท่า (ทั้งสองแบบเรียก Python ทุกแท็ก ราว 14 แท็กต่อแถว) แท็กมี prefix (x:c) ได้
+_ROW = re.compile(r"<(?:\w+:)?row\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?row>)", re.S)
+_CELL = re.compile(r"<(?:\w+:)?c\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)", re.S)
+_CELL_TEXT = re.compile(r"<(?:\w+:)?[tv]\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?[tv]>)", re.S)
+_CELL_REF = re.compile(r"""\br=["']([A-Za-z]+)""")
+_CELL_TYPE = re.compile(r"""\bt=["'](\w+)""")
+
+# ตำแหน่งหลังแท็กปิดแถวสุดท้ายใน buf (0 = ยังไม่มีแถวครบ)
+def _rows_end(buf):
+    i = len(buf)
+    while True:
+        i = buf.rfind(b"row>", 0, i)
+        if i < 0:
+            return 0
+        if buf[buf.rfind(b"<", 0, i) + 1:][:1] == b"/":
+            return i + 4
+
+def _cells(text, strings):
+    row = []
+    for attrs, body in _CELL.findall(text):
+        ref = _CELL_REF.search(attrs)
+        if ref:
+            row.extend([None] * (_column(ref.group(1)) - len(row)))
+        kind = _CELL_TYPE.search(attrs)
+        kind = kind.group(1) if kind else None
+        value = "".join(_CELL_TEXT.findall(body)) if body else None
+        if value and "&" in value:
+            value = unescape(value)
+        if kind == "s" and value:
+            value = strings[int(value)]
+        elif kind == "inlineStr":
+            value = value or ""
+        elif (kind is None or kind == "n") and value:
+            value = float(value) if "." in value or "E" in value or "e" in value else int(value)
+        elif not value:
+            value = None
+        row.append(value)
+    return row
+
+def _sheet_rows(f, strings):
+    buf = b""
+    while chunk := f.read(1 << 18):
+        buf += chunk
+        end = _rows_end(buf)
+        if end:
+            for body in _ROW.findall(buf[:end].decode("utf-8")):
+                yield _cells(body, strings)
+            buf = buf[end:]
+    for body in _ROW.findall(buf.decode("utf-8")):
+        yield _cells(body, strings)
+
+def read_xlsx(path):
+    with zipfile.ZipFile(path) as z:
+        strings = _shared_strings(z)
+        for sheet in _sheet_paths(z):
+            with z.open(sheet) as f:
+                # ทุกชีตขึ้นต้นด้วยหัวตาราง (แถวว่างก่อนหน้าข้ามได้)
+                pick = None
+                for row in _sheet_rows(f, strings):
+                    if not any(value not in (None, "") for value in row):
+                        continue
+                    if pick is None:
+                        pick = _picker(row)
+                        continue
+                    row = pick(row)
+                    # วันที่ที่เป็นตัวเลข = เลขวันของ Excel
+                    if isinstance(row[4], (int, float)):
+                        row[4] = dates.to_text(int(row[4]) + XLSX_EPOCH)
+                    yield _texts(row)
+
+# ===== Parquet (pyarrow): หนึ่ง row group ต่อก้อน จำนวนเงิน decimal(18, 2) วันที่ date32 =====
+PARQUET_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+class ParquetWriter:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([(DATED_HEADER[0], pa.string()), (DATED_HEADER[1], pa.string()),
+                                 (DATED_HEADER[2], pa.string()), (DATED_HEADER[3], pa.decimal128(18, 2)),
+                                 (DATED_HEADER[4], pa.date32())])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="snappy")
+
+    def write(self, ledger):
+        pa, names = self.pa, CATEGORIES.names
+        columns = [
+            pa.array([TYPES[t] for t in ledger.types], pa.string()),
+            pa.array([names[c] for c in ledger.cats], pa.string()),
+            pa.array(ledger.details, pa.string()),
+            pa.array([Decimal(a).scaleb(-2) for a in ledger.amounts], pa.decimal128(18, 2)),
+            pa.array([d - PARQUET_EPOCH if d else None for d in ledger.dates], pa.int32()).cast(pa.date32()),
+        ]
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def read_parquet(path, batch=BATCH_ROWS):
+    import pyarrow.parquet as pq
+    import pyarrow.types as types
+    f = pq.ParquetFile(path)
+    pick = _picker(f.schema_arrow.names)
+    for record_batch in f.iter_batches(batch_size=batch):
+        columns = []
+        for column in record_batch.columns:
+            values = column.to_pylist()
+            if types.is_date(column.type) or types.is_timestamp(column.type):
+                values = [value.isoformat()[:10] if value is not None else None for value in values]
+            columns.append(values)
+        for row in zip(*columns):
+            yield _texts(pick(row))
+
+register(Format("csv", ".csv", "CSV", CsvWriter, read_csv))
+register(Format("xlsx", ".xlsx", "Excel (XLSX)", XlsxWriter, read_xlsx))
+register(Format("jsonl", ".jsonl", "JSON lines", JsonLinesWriter, read_jsonl))
+register(Format("parquet", ".parquet", "Parquet", ParquetWriter, read_parquet, requires="pyarrow"))
+
+def available_formats():
+    return [fmt for fmt in FORMATS.values() if fmt.available]
+
+# ===== สายงาน =====
+# เขียนแถว (iterable ของแถวรายงาน) ลง path คืนจำนวนแถว
+def export_rows(rows, path, fmt=None, task=None, batch=BATCH_ROWS):
+    fmt = format_for(path, fmt)
+    fmt.check()
+    tmp_path = path + ".tmp"
+    written = 0
+    with span("export_" + fmt.name):
+        writer = fmt.writer(tmp_path)
+        try:
+            for ledger in ledger_batches(rows, batch, task, "ส่งออก"):
+                writer.write(ledger)
+                written += len(ledger)
+            writer.close()
+        except BaseException:
+            try:
+                writer.close()
+            finally:
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+    count("rows_exported", written)
+    return written
+
+# ไฟล์ CSV ชั่วคราวที่ครบแล้ว -> รายงาน: ที่เก็บ CSV ใช้ os.replace ใต้ report_lock
+# SQLite อ่านไฟล์ชั่วคราวทีละแถวเข้า save_rows ซึ่งอยู่ใน transaction เดียวอยู่แล้ว
+def _publish_import(report_name, tmp_path, replace):
+    if report_core.STORAGE == "sqlite":
+        (report_core.store_report if replace else report_core.create_report)(report_name, read_csv(tmp_path))
+        return
+    with report_core.report_lock(report_name) as lock:
+        if not replace and report_core.report_exists(report_name):
+            raise FileExistsError(report_name)
+        os.replace(tmp_path, report_core.report_path(report_name))
+        lock.bump()
+
+# ส่งออกรายงาน (period = (เลขวันแรก, เลขวันสุดท้าย) จาก dates.period: เฉพาะรายการในช่วง)
+def export_report(report_name, path, fmt=None, period=None, task=None, batch=BATCH_ROWS):
+    if period is None:
+        rows = report_core.iter_report(report_name)
+    else:
+        from date_partitions import range_rows
+        rows = range_rows(report_name, *period)
+    return export_rows(rows, path, fmt, task, batch)
+
+# นำเข้าไฟล์เป็นรายงานใหม่ (replace=True เขียนทับรายงานเดิม) คืนจำนวนแถว แถวที่จำนวนเงิน/วันที่อ่านไม่ได้ -> ValueError
+# ทุกก้อนที่ตรวจแล้วเขียนต่อกันลง CSV ชั่วคราวข้างรายงาน แล้วค่อยแทนที่รายงานเมื่อก้อนสุดท้ายผ่าน
+# ล้มเหลว/ยกเลิกกลางทาง: ลบไฟล์ชั่วคราว รายงานเดิม (หรือการไม่มีรายงาน) ไม่เปลี่ยน
+def import_report(report_name, path, fmt=None, replace=False, task=None, batch=BATCH_ROWS):
+    fmt = format_for(path, fmt)
+    fmt.check()
+    if not replace and report_core.report_exists(report_name):
+        raise FileExistsError(report_name)
+    os.makedirs(report_core.REPORT_DIR, exist_ok=True)
+    tmp_path = report_core.report_path(report_name) + ".import.tmp"
+    imported = 0
+    try:
+        with span("import_" + fmt.name):
+            writer = CsvWriter(tmp_path)
+            try:
+                for ledger in ledger_batches(fmt.reader(path), batch, task, "นำเข้า"):
+                    writer.write(ledger)
+                    imported += len(ledger)
+                writer.f.flush()
+                os.fsync(writer.f.fileno())
+            finally:
+                writer.close()
+            _publish_import(report_name, tmp_path, replace)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    count("rows_imported", imported)
+    return imported
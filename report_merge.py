@@ -0,0 +1,241 @@
+from diagnostics import count, span
+from ledger import Ledger
+from report_core import VersionConflict
+
+# บันทึกรายงานที่หลายคนแก้ไขพร้อมกัน (optimistic: ไม่ล็อกระหว่างแก้ไข ล็อกเฉพาะตอนตรวจรุ่น+เขียน)
+# EditSession จำรุ่นของรายงานตอนเปิด ตอนบันทึกเรียก save_if ด้วยรุ่นนั้น:
+#   รุ่นยังตรง -> ต่อท้าย/เขียนใหม่แบบเดิม
+#   รุ่นเปลี่ยน -> อ่านรายงานล่าสุด (theirs) แล้วรวมสามทางระดับแถวกับรายงานตอนเปิด (base) และการแก้ไขของเรา
+# กฎต่อแถวเดิมที่เราแก้/ลบ: อีกฝ่ายไม่ได้แตะ -> ใช้ของเรา, อีกฝ่ายทำแบบเดียวกัน -> ผ่าน,
+#   ต่างกัน -> Conflict ให้ผู้ใช้เลือก แถวที่อีกฝ่ายเพิ่ม/แก้/ลบคงไว้ตามนั้น แถวที่เราเพิ่มต่อท้าย
+# ไม่มีการแก้/ลบแถวเดิมหลังรวม (ต่างคนต่างเพิ่มรายการ ซึ่งพบบ่อยที่สุด) -> ต่อท้ายไฟล์ ไม่เขียนใหม่ทั้งไฟล์
+#
+# การจับคู่แถว base กับ theirs (_align) เดินไปพร้อมกันทั้งสองไฟล์: ช่วงที่เหมือนกันเทียบ slice ของคอลัมน์ array
+# (ทำใน C) ตรงที่ต่างกันค้นจุดที่กลับมาตรงกันในหน้าต่างเล็ก ๆ เวลาจึงตามจำนวนจุดที่ต่าง ไม่ใช่ขนาดรายงานยกกำลังสอง
+# และหยุดเดินทันทีที่ผ่านแถวสุดท้ายที่เราแก้
+# store คือ report_core หรือ api_client.ApiClient (current_version / iter_report / save_if ชื่อเดียวกัน)
+
+RETRIES = 5
+CHUNK = 4096
+WINDOW = 64
+ANCHOR = 3
+
+def _columns(ledger):
+    return ledger.types, ledger.cats, ledger.details, ledger.amounts, ledger.dates
+
+def _tuples(ledger, start, end):
+    return list(zip(*(column[start:end] for column in _columns(ledger))))
+
+# จำนวนแถวที่เหมือนกันต่อเนื่องจาก base[i], theirs[j] (ไม่เกิน limit)
+# เทียบ slice ของคอลัมน์ ก้อนเริ่ม 16 แถวแล้วขยายเท่าตัวถึง CHUNK เจอก้อนที่ต่างก็ bisect หาแถวแรกที่ต่าง
+def _run(pairs, i, j, limit):
+    n, step = 0, 16
+    while n < limit:
+        m = min(n + step, limit)
+        if all(x[i + n:i + m] == y[j + n:j + m] for x, y in pairs):
+            n = m
+            step = min(step * 2, CHUNK)
+            continue
+        lo, hi = n, m
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if all(x[i + lo:i + mid] == y[j + lo:j + mid] for x, y in pairs):
+                lo = mid
+            else:
+                hi = mid
+        return lo
+    return n
+
+# หลังแถวที่ต่างกันที่ base[i] / theirs[j]: หาจุดที่กลับมาตรงกันอีก (ANCHOR แถวติดกัน) ที่ใกล้ที่สุด
+# คืน (a, b) = ข้ามไป a แถวใน base และ b แถวใน theirs หรือ None ถ้าหาไม่เจอภายใน budget แถว
+# ค้นในหน้าต่าง WINDOW แถวก่อน ไม่เจอก็ขยายทีละ 4 เท่า (แก้/ลบ/เพิ่มไม่กี่แถวเจอในหน้าต่างแรก)
+def _resync(base, theirs, pairs, i, j, budget):
+    nb, nt = len(base), len(theirs)
+    window = WINDOW
+    while window <= budget:
+        a_end, b_end = min(nb, i + window), min(nt, j + window)
+        positions = {}
+        for y, row in enumerate(_tuples(theirs, j, b_end)):
+            positions.setdefault(row, []).append(y)
+        best = None
+        for x, row in enumerate(_tuples(base, i, a_end)):
+            if best is not None and x >= best[0] + best[1]:
+                break
+            for y in positions.get(row, ()):
+                if best is not None and x + y >= best[0] + best[1]:
+                    break
+                need = min(ANCHOR, nb - i - x, nt - j - y)
+                if _run(pairs, i + x, j + y, need) == need:
+                    best = (x, y)
+                    break
+        if best is not None:
+            return best, window
+        if a_end == nb and b_end == nt:
+            return None, window
+        window *= 4
+    return None, window
+
+# ตำแหน่งใน theirs ของแถว base แต่ละ id ใน wanted (None = อีกฝ่ายลบแถวนั้น)
+# เดินไปพร้อมกันทั้งสองฝั่ง: ข้ามช่วงที่เหมือนกันด้วย _run แล้ว _resync ตรงที่ต่าง
+# ช่วงที่ต่างกันที่ยาวเท่ากันทั้งสองฝั่งถือว่าเป็นแถวเดิมที่ถูกแก้ทีละแถว ไม่เท่ากันถือว่าลบแล้วเพิ่มใหม่
+# รายงานถูกเรียงใหม่ทั้งไฟล์ (ค้นเกิน budget) แถวที่เหลือจับคู่กับแถวที่เหมือนกันทุกช่องแทน
+def _align(base, theirs, wanted):
+    nb, nt = len(base), len(theirs)
+    pairs = list(zip(_columns(base), _columns(theirs)))
+    budget = 4 * (nb + nt) + WINDOW
+    where = {}
+    w = i = j = 0
+    while w < len(wanted) and i < nb and j < nt:
+        k = _run(pairs, i, j, min(nb - i, nt - j))
+        while w < len(wanted) and wanted[w] < i + k:
+            where[wanted[w]] = j + wanted[w] - i
+            w += 1
+        i, j = i + k, j + k
+        if w == len(wanted) or i == nb or j == nt:
+            break
+        found, spent = _resync(base, theirs, pairs, i, j, budget)
+        budget -= spent
+        if found is None:
+            count("merge_fallback")
+            where.update(_match_rows(base, theirs, wanted[w:], i, j))
+            return where
+        a, b = found
+        while w < len(wanted) and wanted[w] < i + a:
+            where[wanted[w]] = j + wanted[w] - i if a == b else None
+            w += 1
+        i, j = i + a, j + b
+    for i in wanted[w:]:
+        where[i] = None
+    return where
+
+def _match_rows(base, theirs, wanted, i, j):
+    positions = {}
+    for y, row in enumerate(_tuples(theirs, j, len(theirs)), j):
+        positions.setdefault(row, []).append(y)
+    for found in positions.values():
+        found.reverse()
+    where = {}
+    for x in wanted:
+        found = positions.get(tuple(column[x] for column in _columns(base)))
+        where[x] = found.pop() if found else None
+    return where
+
+# แถวเดิมที่ทั้งสองฝั่งเปลี่ยนไม่เหมือนกัน ours/theirs เป็นแถว หรือ None ถ้าฝั่งนั้นลบแถวนี้
+# choice: "ours" / "theirs" / None (ยังไม่เลือก)
+class Conflict:
+    __slots__ = ("row_id", "index", "base", "ours", "theirs", "choice")
+
+    def __init__(self, row_id, index, base, ours, theirs, choice=None):
+        self.row_id = row_id
+        self.index = index
+        self.base = base
+        self.ours = ours
+        self.theirs = theirs
+        self.choice = choice
+
+    def __repr__(self):
+        return f"Conflict({self.row_id}, ours={self.ours}, theirs={self.theirs}, choice={self.choice!r})"
+
+class Merge:
+    def __init__(self, theirs, version, added):
+        self.theirs = theirs
+        self.version = version
+        self.added = added
+        self.replace = {}
+        self.drop = set()
+        self.conflicts = []
+
+    @property
+    def unresolved(self):
+        return [c for c in self.conflicts if c.choice is None]
+
+    # แถวที่จะบันทึก พร้อม mode/base สำหรับ save_changes/save_if แบบเดียวกับ EditSession.pending()
+    # เลือกของเราในแถวที่อีกฝ่ายลบ = เพิ่มแถวนั้นกลับต่อท้ายรายงาน
+    def rows(self):
+        replace, drop = dict(self.replace), set(self.drop)
+        extra = Ledger()
+        for c in self.conflicts:
+            if c.choice != "ours":
+                continue
+            if c.ours is None:
+                drop.add(c.index)
+            elif c.theirs is None:
+                extra.append(c.ours)
+            else:
+                replace[c.index] = c.ours
+        rows = self.theirs.copy()
+        base = len(rows)
+        for j, row in replace.items():
+            rows[j] = row
+        if drop:
+            live = bytearray(b"\x01") * base
+            for j in drop:
+                live[j] = 0
+            rows = rows.compress(live)
+        rows.extend(extra)
+        rows.extend(self.added)
+        if replace or drop:
+            return rows, "rewrite", base
+        return rows, ("append" if len(rows) > base else None), base
+
+# รวมการแก้ไขใน session เข้ากับ theirs (รายงานรุ่น version)
+# choices {row_id: (choice, แถวของอีกฝ่ายตอนที่เลือก)}: ใช้ตัดสิน conflict เดิมซ้ำถ้าแถวของอีกฝ่ายยังเหมือนเดิม
+def merge(session, theirs, version, choices=None):
+    with span("merge"):
+        base = session.base_rows()
+        updated, deleted, added = session.changes(base)
+        result = Merge(theirs, version, added)
+        touched = sorted(updated.keys() | set(deleted))
+        where = _align(base, theirs, touched)
+        for i in touched:
+            ours = updated.get(i)
+            j = where[i]
+            theirs_row = None if j is None else theirs.row(j)
+            base_row = base.row(i)
+            if theirs_row == base_row:
+                if ours is None:
+                    result.drop.add(j)
+                else:
+                    result.replace[j] = ours
+            elif theirs_row != ours:
+                choice = (choices or {}).get(i)
+                conflict = Conflict(i, j, base_row, ours, theirs_row)
+                if choice is not None and choice[1] == theirs_row:
+                    conflict.choice = choice[0]
+                result.conflicts.append(conflict)
+        count("merge_conflicts", len(result.conflicts))
+    return result
+
+# (รุ่น, Ledger) ที่ตรงกัน: อ่านรุ่นก่อนและหลังอ่านแถว ถูกเขียนระหว่างอ่านก็อ่านใหม่
+# ยังไม่มีรายงาน (เช่นถูกลบไประหว่างแก้ไข) -> (None, Ledger ว่าง)
+def load_versioned(store, report_name, task=None):
+    for _ in range(RETRIES):
+        version = store.current_version(report_name)
+        if version is None:
+            return None, Ledger()
+        rows = Ledger(store.iter_report(report_name), task)
+        if store.current_version(report_name) == version:
+            return version, rows
+    raise VersionConflict(f"{report_name} ถูกเขียนต่อเนื่องระหว่างอ่าน ลองใหม่อีกครั้ง")
+
+# บันทึก session คืน (ผลของ save_changes, Merge หรือ None ถ้าไม่ต้องรวม)
+# ผลเป็น None = มี conflict ที่ยังไม่เลือก: ผู้ใช้เลือกแล้วใส่ใน choices แล้วเรียกซ้ำ
+# (ระหว่างนั้นมีคนบันทึกอีกก็รวมกับรุ่นใหม่ตามปกติ conflict เดิมที่แถวของอีกฝ่ายไม่เปลี่ยนไม่ต้องเลือกซ้ำ)
+def save_session(store, session, choices=None, task=None):
+    name = session.report_name
+    version, merged = session.version, None
+    for _ in range(RETRIES):
+        rows, mode, base = session.pending() if merged is None else merged.rows()
+        try:
+            saved, _ = store.save_if(name, rows, mode, base, version)
+            return saved, merged
+        except VersionConflict:
+            pass
+        if task is not None:
+            task.check()
+            task.set_status("รายงานถูกแก้ไขจากที่อื่น กำลังรวมการแก้ไข...")
+        version, theirs = load_versioned(store, name, task)
+        merged = merge(session, theirs, version, choices)
+        if merged.unresolved:
+            return None, merged
+    raise VersionConflict(f"{name} ถูกแก้ไขจากที่อื่นต่อเนื่องระหว่างบันทึก ลองบันทึกอีกครั้ง")
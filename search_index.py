@@ -0,0 +1,61 @@
+# ดัชนีค้นหาของหน้าแก้ไขรายงาน
+# - text: ข้อความตัวพิมพ์เล็กของแต่ละแถว (เรียงตาม index ใน data) สร้างครั้งเดียวตอนโหลด
+# - cache: ผลของคำค้นล่าสุด ถ้าพิมพ์ต่อท้ายก็กรองจากผลเดิม ถ้าลบตัวอักษรก็ได้ผลเดิมกลับทันที
+class SearchIndex:
+    CACHE_SIZE = 32
+
+    def __init__(self, rows=()):
+        self.text = []
+        self.cache = {}
+        self.build(rows)
+
+    @staticmethod
+    def normalize(row):
+        return "\t".join(str(v) for v in row).lower()
+
+    def build(self, rows):
+        normalize = self.normalize
+        self.text = [normalize(row) for row in rows]
+        self.cache.clear()
+
+    def append(self, row):
+        i = len(self.text)
+        t = self.normalize(row)
+        self.text.append(t)
+        for query, result in self.cache.items():
+            if query in t:
+                self.cache[query] = result + [i]
+
+    def update(self, index, row):
+        self.text[index] = self.normalize(row)
+        self.cache.clear()
+
+    def delete(self, index):
+        del self.text[index]
+        self.cache.clear()
+
+    # คืน index ของแถวที่ตรงกับคำค้น (เรียงจากน้อยไปมาก) ห้ามแก้ list ที่ได้กลับไป
+    def search(self, query):
+        query = query.lower()
+        if not query:
+            return list(range(len(self.text)))
+        result = self.cache.get(query)
+        if result is not None:
+            return result
+
+        # แถวที่ตรงกับ query ต้องตรงกับทุกคำค้นที่เป็นส่วนหนึ่งของ query ด้วย
+        candidates = None
+        for cached, previous in self.cache.items():
+            if cached in query and (candidates is None or len(previous) < len(candidates)):
+                candidates = previous
+
+        text = self.text
+        if candidates is None:
+            result = [i for i, t in enumerate(text) if query in t]
+        else:
+            result = [i for i in candidates if query in text[i]]
+
+        if len(self.cache) >= self.CACHE_SIZE:
+            del self.cache[next(iter(self.cache))]
+        self.cache[query] = result
+        return result
@@ -0,0 +1,305 @@
+import csv
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+from dates import row_date
+from money import to_satang, to_text
+from report_core import CATEGORY_OPTIONS, TYPES, append_report, iter_report, report_exists
+
+# นำเข้ารายการเดินบัญชีจากไฟล์ที่ธนาคาร/บัตรเครดิต export (CSV, OFX/QFX, QIF)
+# ทำงานเป็นสาย generator: อ่านทีละรายการ -> จัดหมวดหมู่ -> ตัดรายการซ้ำ -> เขียนต่อท้ายทีละก้อน
+# ไม่โหลดไฟล์ทั้งไฟล์ หน่วยความจำขึ้นกับขนาดก้อน (+ 8 ไบต์ต่อแถวที่มีในรายงานอยู่แล้ว) ไม่ใช่ขนาดไฟล์ที่นำเข้า
+#
+# รายการที่อ่านได้: (วันที่ YYYY-MM-DD, ผู้รับ/ผู้จ่าย, จำนวนเงินสตางค์ มีเครื่องหมาย)
+# บวก = เงินเข้า (รายรับ) ลบ = เงินออก (รายจ่าย)
+# บันทึกเป็นแถว 5 คอลัมน์: รายละเอียด = ผู้รับ/ผู้จ่าย, วันที่ = วันที่รายการ
+# นำเข้าไฟล์เดิมซ้ำ (หรือไฟล์ที่ช่วงวันทับกัน) จะไม่ได้รายการซ้ำ
+
+CHUNK_SIZE = 50_000
+READ_SIZE = 1 << 16
+DEFAULT_CATEGORY = "อื่นๆ"
+
+# กฎจับคู่ผู้รับ/ผู้จ่าย -> หมวดหมู่: (คำค้น, ประเภท หรือ None = ทั้งสองแบบ, หมวดหมู่)
+# ใช้กฎแรกที่คำค้นอยู่ในชื่อ (ไม่สนตัวพิมพ์เล็ก/ใหญ่)
+RULES = [
+    ("ดอกเบี้ย", "รายรับ", "ดอกเบี้ยรับ"),
+    ("interest", "รายรับ", "ดอกเบี้ยรับ"),
+    ("บริจาค", "รายรับ", "รับบริจาคทั่วไป"),
+    ("donation", "รายรับ", "รับบริจาคทั่วไป"),
+    ("เงินเดือน", "รายจ่าย", "เงินเดือน"),
+    ("salary", "รายจ่าย", "เงินเดือน"),
+    ("payroll", "รายจ่าย", "เงินเดือน"),
+    ("การไฟฟ้า", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("การประปา", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("electric", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("water", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("internet", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("3bb", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("ais fibre", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("true online", "รายจ่าย", "ค่าสาธารณูปโภค"),
+    ("officemate", "รายจ่าย", "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง"),
+    ("เครื่องเขียน", "รายจ่าย", "เครื่องใช้สำนักงาน และวัสดุสิ้นเปลือง"),
+    ("ซ่อม", "รายจ่าย", "ซ่อมแซม ค่าจ้างและค่าแรง"),
+    ("ค่าแรง", "รายจ่าย", "ซ่อมแซม ค่าจ้างและค่าแรง"),
+]
+
+# ===== วันที่ =====
+_DATE = re.compile(r"(\d{1,4})[/\-.](\d{1,2})[/\-.'](\d{1,4})")
+
+# แปลงวันที่เป็น YYYY-MM-DD order = "dmy" (ธนาคารไทย) หรือ "mdy" ใช้เมื่อปีอยู่ท้าย
+# ปี พ.ศ. (มากกว่า 2400) แปลงเป็น ค.ศ. ปีสองหลักถือเป็น 20xx (หรือ 25xx ถ้าเกิน 40 = พ.ศ.)
+# หนึ่งวันมีหลายรายการ แคชผลไว้
+@lru_cache(maxsize=4096)
+def parse_date(text, order="dmy"):
+    text = text.strip().replace(" ", "")
+    if len(text) >= 8 and text[:8].isdigit():
+        year, month, day = int(text[:4]), int(text[4:6]), int(text[6:8])
+    else:
+        m = _DATE.search(text)
+        if m is None:
+            raise ValueError(f"อ่านวันที่ไม่ได้: {text!r}")
+        a, b, c = m.groups()
+        if len(a) == 4:
+            year, month, day = int(a), int(b), int(c)
+        else:
+            day, month = (int(a), int(b)) if order == "dmy" else (int(b), int(a))
+            year = int(c)
+            if len(c) == 2:
+                year += 2500 if year > 40 else 2000
+    if year > 2400:
+        year -= 543
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        raise ValueError(f"อ่านวันที่ไม่ได้: {text!r}")
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+# ===== ตัวอ่านแต่ละรูปแบบ (generator) =====
+# ชื่อคอลัมน์ที่รู้จักใน CSV (ตัวพิมพ์เล็ก)
+CSV_COLUMNS = {
+    "date": ("date", "วันที่", "transaction date", "posting date", "วันที่ทำรายการ"),
+    "payee": ("description", "payee", "รายการ", "รายละเอียด", "name", "memo", "details"),
+    "amount": ("amount", "จำนวนเงิน", "ยอดเงิน"),
+    "debit": ("debit", "withdrawal", "ถอน", "ถอนเงิน", "เดบิต"),
+    "credit": ("credit", "deposit", "ฝาก", "ฝากเงิน", "เครดิต"),
+}
+
+def _find_columns(header):
+    names = [h.strip().lower() for h in header]
+    found = {}
+    for key, candidates in CSV_COLUMNS.items():
+        for i, name in enumerate(names):
+            if name in candidates:
+                found[key] = i
+                break
+    if "date" not in found or "payee" not in found or \
+            ("amount" not in found and "debit" not in found and "credit" not in found):
+        raise ValueError(f"ไม่พบคอลัมน์วันที่/รายการ/จำนวนเงินในหัวตาราง: {header}")
+    return found
+
+def _cell_satang(row, i):
+    if i is None or i >= len(row) or not row[i].strip():
+        return 0
+    return to_satang(row[i])
+
+def read_csv_statement(path, order="dmy"):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        cols = _find_columns(next(reader))
+        date_i, payee_i = cols["date"], cols["payee"]
+        amount_i, debit_i, credit_i = cols.get("amount"), cols.get("debit"), cols.get("credit")
+        for row in reader:
+            # แถวว่าง/แถวสรุปท้ายไฟล์ที่ไม่มีวันที่ ข้ามไป
+            if len(row) <= max(date_i, payee_i):
+                continue
+            try:
+                date = parse_date(row[date_i], order)
+            except ValueError:
+                continue
+            if amount_i is not None:
+                amount = _cell_satang(row, amount_i)
+            else:
+                amount = _cell_satang(row, credit_i) - abs(_cell_satang(row, debit_i))
+            yield date, row[payee_i].strip(), amount
+
+# OFX 1.x (SGML ไม่มีแท็กปิด) และ OFX 2.x (XML) อ่านเป็นก้อน ๆ แล้วแยกแท็กด้วย regex เดียว
+_OFX_TAG = re.compile(r"<([^>]+)>([^<]*)")
+
+def _ofx_tags(f):
+    rest = ""
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            break
+        data = rest + data
+        # แท็กสุดท้ายอาจถูกตัดกลาง เก็บไว้ต่อกับก้อนถัดไป
+        cut = data.rfind("<")
+        rest, data = data[cut:], data[:cut]
+        for m in _OFX_TAG.finditer(data):
+            yield m.group(1).strip().upper(), m.group(2).strip()
+    for m in _OFX_TAG.finditer(rest):
+        yield m.group(1).strip().upper(), m.group(2).strip()
+
+def _ofx_transaction(txn):
+    payee = txn.get("NAME") or txn.get("PAYEE") or txn.get("MEMO", "")
+    if txn.get("MEMO") and txn["MEMO"] != payee:
+        payee = f"{payee} {txn['MEMO']}"
+    return parse_date(txn["DTPOSTED"]), payee, to_satang(txn["TRNAMT"])
+
+# SGML ไม่บังคับแท็กปิด รายการจบเมื่อเจอ </STMTTRN>, <STMTTRN> ถัดไป หรือ </BANKTRANLIST>
+def read_ofx(path, order="dmy"):
+    with open(path, encoding='utf-8', errors='replace') as f:
+        txn = None
+        for tag, value in _ofx_tags(f):
+            if tag in ("STMTTRN", "/STMTTRN", "/BANKTRANLIST", "/CCSTMTRS", "/STMTRS"):
+                if txn and "DTPOSTED" in txn and "TRNAMT" in txn:
+                    yield _ofx_transaction(txn)
+                txn = {} if tag == "STMTTRN" else None
+            elif txn is not None and value:
+                txn[tag] = value
+
+def read_qif(path, order="dmy"):
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        txn = {}
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("!"):
+                continue
+            code, value = line[0], line[1:].strip()
+            if code == "^":
+                if "D" in txn and ("T" in txn or "U" in txn):
+                    payee = txn.get("P") or txn.get("M", "")
+                    yield parse_date(txn["D"], order), payee, to_satang(txn.get("T") or txn["U"])
+                txn = {}
+            elif code not in txn:
+                txn[code] = value
+
+READERS = {".csv": read_csv_statement, ".ofx": read_ofx, ".qfx": read_ofx, ".qif": read_qif}
+
+def read_statement(path, order="dmy"):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"ไม่รองรับไฟล์ {ext} (รองรับ {', '.join(READERS)})")
+    return READERS[ext](path, order)
+
+# ===== จัดหมวดหมู่ =====
+def load_rules(path):
+    rules = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            keyword, category = row[0], row[-1]
+            kind = row[1] if len(row) > 2 and row[1] in TYPES else None
+            rules.append((keyword, kind, category))
+    return rules
+
+class RuleCategorizer:
+    CACHE_SIZE = 10_000
+
+    # แยกกฎตามประเภทไว้ก่อน (หมวดที่ไม่อยู่ใน CATEGORY_OPTIONS ของประเภทนั้นกลายเป็น "อื่นๆ")
+    # และรวมคำค้นทุกคำเป็น regex เดียว รายการส่วนใหญ่ที่ไม่ตรงกฎใดเลยจึงใช้การค้นครั้งเดียว
+    def __init__(self, rules=RULES):
+        self.rules = {}
+        self.any_keyword = {}
+        for kind in TYPES:
+            kind_rules = []
+            for keyword, rule_kind, category in rules:
+                if rule_kind in (None, kind):
+                    if category.split(">")[0].strip() not in CATEGORY_OPTIONS[kind]:
+                        category = DEFAULT_CATEGORY
+                    kind_rules.append((keyword.lower(), category))
+            self.rules[kind] = kind_rules
+            self.any_keyword[kind] = re.compile("|".join(re.escape(k) for k, _ in kind_rules) or "(?!)")
+        self.cache = {}
+
+    # (ประเภท, หมวดหมู่) ของรายการ ใช้กฎแรกที่คำค้นอยู่ในชื่อ
+    def categorize(self, payee, amount):
+        kind = TYPES[0] if amount > 0 else TYPES[1]
+        key = (kind, payee)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        text = payee.lower()
+        category = DEFAULT_CATEGORY
+        if self.any_keyword[kind].search(text):
+            for keyword, rule_category in self.rules[kind]:
+                if keyword in text:
+                    category = rule_category
+                    break
+        result = (kind, category)
+        if len(self.cache) >= self.CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = result
+        return result
+
+# ===== ตัดรายการซ้ำ =====
+# กุญแจของแถว = hash ของ (ประเภท, วันที่, รายละเอียด, สตางค์) เก็บเรียงใน array('q') (8 ไบต์ต่อแถวที่มีอยู่แล้ว)
+# นับจำนวนด้วย bisect รายการที่ซ้ำกันจริง (เช่นจ่ายร้านเดิมสองครั้งในวันเดียว) ยังนำเข้าได้ครบตามจำนวนในไฟล์
+# hash ของ str สุ่มต่อ process ใช้ได้เพราะ index อยู่ในหน่วยความจำระหว่างนำเข้าครั้งเดียว
+class DedupeIndex:
+    def __init__(self, rows=()):
+        keys = array('q')
+        for row in rows:
+            kind, _, detail, amount = row[:4]
+            try:
+                keys.append(hash((kind, row_date(row), detail, to_satang(amount))))
+            except ValueError:
+                continue
+        self.keys = array('q', sorted(keys))
+        self.seen = {}
+
+    def is_new(self, kind, date, detail, satang):
+        keys = self.keys
+        key = hash((kind, date, detail, satang))
+        lo = bisect_left(keys, key)
+        if lo == len(keys) or keys[lo] != key:
+            return True
+        count = self.seen.get(key, 0) + 1
+        self.seen[key] = count
+        return count > bisect_right(keys, key, lo) - lo
+
+# ===== สายงานนำเข้า =====
+def statement_rows(transactions, categorizer, dedupe, stats):
+    for date, payee, satang in transactions:
+        stats["read"] += 1
+        if satang == 0:
+            stats["skipped"] += 1
+            continue
+        kind, category = categorizer.categorize(payee, satang)
+        magnitude = abs(satang)
+        if not dedupe.is_new(kind, date, payee, magnitude):
+            stats["duplicates"] += 1
+            continue
+        yield [kind, category, payee, to_text(magnitude), date]
+
+def chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# นำเข้าไฟล์ path ต่อท้ายรายงาน report_name (สร้างใหม่ถ้ายังไม่มี) คืนสถิติ
+# ถ้าหยุดกลางทาง ก้อนที่เขียนไปแล้วอยู่ในรายงาน นำเข้าไฟล์เดิมซ้ำจะต่อเฉพาะส่วนที่ขาด
+# learn=True: รายการที่ไม่ตรงกฎใช้หมวดที่เรียนรู้จากรายงานเดิม (categorizer)
+def import_statement(report_name, path, rules=None, order="dmy", task=None, chunk_size=CHUNK_SIZE, learn=False):
+    categorizer = RuleCategorizer(rules if rules is not None else RULES)
+    if learn:
+        from categorizer import ImportCategorizer, get_categorizer
+        categorizer = ImportCategorizer(categorizer, get_categorizer())
+    dedupe = DedupeIndex(iter_report(report_name) if report_exists(report_name) else ())
+    stats = Counter(read=0, imported=0, duplicates=0, skipped=0)
+    rows = statement_rows(read_statement(path, order), categorizer, dedupe, stats)
+    for chunk in chunks(rows, chunk_size):
+        if task is not None:
+            task.check()
+        append_report(report_name, chunk)
+        stats["imported"] += len(chunk)
+        if task is not None:
+            task.set_status(f"นำเข้าแล้ว {stats['imported']:,} รายการ")
+    return dict(stats)
@@ -0,0 +1,168 @@
+import tkinter as tk
+import diagnostics
+
+# ตารางแบบ virtual: สร้าง item ใน Treeview เฉพาะแถวที่มองเห็น + buffer
+# ข้อมูลทั้งหมดเก็บใน list ธรรมดา เลื่อนเมื่อไหร่ค่อยสร้าง item ชุดใหม่
+class VirtualTable:
+    def __init__(self, tree, scrollbar=None, buffer=30):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.buffer = buffer
+        self.rows = []
+        self.keys = None
+        self.offset = 0
+        self.start = 0
+        self.end = 0
+        self.selected = set()
+        self._rendering = False
+        self._pending = None
+
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+        if scrollbar is not None:
+            scrollbar.config(command=self.yview)
+
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        tree.bind("<Button-5>", lambda e: self._scroll_units(3))
+        tree.bind("<ButtonPress-1>", self._on_click, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<Configure>", lambda e: self._schedule_render())
+        tree.bind("<Home>", lambda e: self._jump(0))
+        tree.bind("<End>", lambda e: self._jump(len(self.rows)))
+
+    # rows = ค่าที่จะแสดง, keys = iid (int) ของแต่ละแถว เช่น index ใน data ของหน้าแก้ไข
+    def set_rows(self, rows, keys=None, keep_offset=False):
+        self.rows = rows
+        self.keys = keys
+        if not keep_offset:
+            self.offset = 0
+        self.selected = set()
+        self.render()
+
+    def key_of(self, i):
+        return self.keys[i] if self.keys is not None else i
+
+    # index ใน data ของแถวที่ถูกเลือก (รวมแถวที่เลื่อนพ้นจอไปแล้ว)
+    def selection(self):
+        return sorted(self.selected)
+
+    def visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            height = int(self.tree.cget("height") or 10) * self._row_height()
+        return max(1, height // self._row_height())
+
+    def _row_height(self):
+        value = self.tree.tk.call("ttk::style", "lookup", self.tree.cget("style") or "Treeview", "-rowheight")
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError, tk.TclError):
+            return 20
+
+    def render(self):
+        self._pending = None
+        n = len(self.rows)
+        visible = self.visible_rows()
+        self.offset = max(0, min(self.offset, n - visible))
+        start = max(0, self.offset - self.buffer)
+        end = min(n, self.offset + visible + self.buffer)
+
+        self._rendering = True
+        try:
+            with diagnostics.span("tree_render"):
+                children = self.tree.get_children()
+                if children:
+                    self.tree.delete(*children)
+                for i in range(start, end):
+                    self.tree.insert('', 'end', iid=self.key_of(i), values=self.rows[i])
+            diagnostics.count("tree_inserts", end - start)
+            self.start, self.end = start, end
+            keep = [self.key_of(i) for i in range(start, end) if self.key_of(i) in self.selected]
+            if keep:
+                self.tree.selection_set(keep)
+        finally:
+            self._rendering = False
+        self._place()
+
+    # เลื่อน Treeview ภายในให้แถว offset อยู่บนสุด แล้วอัปเดต scrollbar ตามจำนวนแถวจริง
+    def _place(self):
+        span = self.end - self.start
+        if span:
+            self.tree.yview_moveto((self.offset - self.start) / span)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.scrollbar is None:
+            return
+        n = len(self.rows)
+        if not n:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.offset / n, min(1.0, (self.offset + self.visible_rows()) / n))
+
+    def _schedule_render(self):
+        if self._pending is None:
+            self._pending = self.tree.after_idle(self.render)
+
+    def _move_to(self, offset):
+        n = len(self.rows)
+        visible = self.visible_rows()
+        self.offset = max(0, min(int(offset), n - visible))
+        inside = self.offset >= self.start and self.offset + visible <= self.end
+        if inside and not self._near_edge(visible):
+            self._place()
+        else:
+            self.render()
+
+    # เหลือ buffer ไม่ถึงครึ่งจอ และยังมีข้อมูลต่อ -> ควรสร้าง window ใหม่
+    def _near_edge(self, visible):
+        return (self.offset - self.start < visible // 2 and self.start > 0) or \
+               (self.end - self.offset - visible < visible // 2 and self.end < len(self.rows))
+
+    def _scroll_units(self, units):
+        self._move_to(self.offset + units)
+        return "break"
+
+    def _jump(self, offset):
+        self._move_to(offset)
+        return "break"
+
+    def _on_wheel(self, event):
+        return self._scroll_units(-3 if event.delta > 0 else 3)
+
+    # scrollbar เรียกมาแบบเดียวกับ yview ของ Treeview
+    def yview(self, *args):
+        if not args:
+            return
+        n = len(self.rows)
+        if args[0] == "moveto":
+            self._move_to(float(args[1]) * n)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows()
+            self._move_to(self.offset + step)
+
+    # Treeview เลื่อนเอง (เช่น กดลูกศรลงจนสุดหน้า) -> คำนวณ offset ใหม่จากตำแหน่งใน window
+    def _on_tree_scroll(self, first, last):
+        span = self.end - self.start
+        if self._rendering or not span:
+            return
+        offset = self.start + round(float(first) * span)
+        if offset != self.offset:
+            self.offset = offset
+            self._update_scrollbar()
+            if self._near_edge(self.visible_rows()):
+                self._schedule_render()
+
+    def _on_click(self, event):
+        # คลิกธรรมดา (ไม่กด Shift/Ctrl) ล้างรายการที่เลือกไว้นอกจอด้วย
+        if not event.state & 0x0005:
+            self.selected = set()
+
+    def _on_select(self, event):
+        if self._rendering:
+            return
+        window = {self.key_of(i) for i in range(self.start, self.end)}
+        current = {int(iid) for iid in self.tree.selection()}
+        self.selected = (self.selected - window) | current